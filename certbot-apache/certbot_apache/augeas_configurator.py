@@ -1,6 +1,9 @@
 """Class of Augeas Configurators."""
 import logging
+import os
+import time
 
+from collections import defaultdict
 
 from certbot import errors
 from certbot import reverter
@@ -33,6 +36,9 @@ class AugeasConfigurator(common.Plugin):
 
         self.save_notes = ""
 
+        # Paths Augeas loaded each file from, keyed by the file's real path
+        self._loaded_paths = None
+
         # See if any temporary changes need to be recovered
         # This needs to occur before VirtualHost objects are setup...
         # because this will change the underlying configuration and potential
@@ -52,6 +58,55 @@ class AugeasConfigurator(common.Plugin):
                    augeas.Augeas.ENABLE_SPAN))
         self.recovery_routine()
 
+    def reload_augeas(self, files=None):
+        """Reload the Augeas tree from the configuration files on disk.
+
+        If the files that changed are known and Augeas supports loading
+        single files, only they are parsed again. Subclasses extend this
+        to refresh state derived from the tree.
+
+        :param set files: Files that changed, or None if any file may
+            have changed
+
+        """
+        if files and hasattr(self.aug, "load_file"):
+            try:
+                for filepath in self._get_loaded_paths(files):
+                    self.aug.load_file(filepath)
+                return
+            except Exception:  # pylint: disable=broad-except
+                # A full load recovers from whatever went wrong here
+                logger.debug("Unable to load single files, reloading all "
+                             "files instead", exc_info=True)
+        self._loaded_paths = None
+        self.aug.load()
+
+    def _get_loaded_paths(self, files):
+        """Get all paths Augeas loaded the given files from.
+
+        Files can be loaded more than once through symlinks, e.g. from
+        both sites-available and sites-enabled, and every copy has to be
+        reloaded when one of them is modified.
+
+        :param set files: Paths of the files
+
+        :returns: Paths of the files and of their other copies
+        :rtype: set
+
+        """
+        if self._loaded_paths is None:
+            self._loaded_paths = defaultdict(set)
+            for path in self.aug.match("/augeas/files//path"):
+                # Strip off /files
+                filepath = self.aug.get(path)[6:]
+                self._loaded_paths[os.path.realpath(filepath)].add(filepath)
+
+        loaded_paths = set(files)
+        for filepath in files:
+            loaded_paths.update(
+                self._loaded_paths.get(os.path.realpath(filepath), ()))
+        return loaded_paths
+
     def check_parsing_errors(self, lens):
         """Verify Augeas can parse all of the lens files.
 
@@ -99,6 +154,7 @@ class AugeasConfigurator(common.Plugin):
             checkpoint
 
         """
+        start_time = time.time()
         save_state = self.aug.get("/augeas/save")
         self.aug.set("/augeas/save", "noop")
         # Existing Errors
@@ -145,7 +201,9 @@ class AugeasConfigurator(common.Plugin):
         if save_files:
             for sf in save_files:
                 self.aug.remove("/files/"+sf)
-            self.aug.load()
+            self.reload_augeas(save_files)
+            logger.debug("Saved and reloaded %d files in %.3f seconds",
+                         len(save_files), time.time() - start_time)
         if title and not temporary:
             try:
                 self.reverter.finalize_checkpoint(title)
@@ -180,7 +238,7 @@ class AugeasConfigurator(common.Plugin):
         except errors.ReverterError as err:
             raise errors.PluginError(str(err))
         # Need to reload configuration after these changes take effect
-        self.aug.load()
+        self.reload_augeas()
 
     def revert_challenge_config(self):
         """Used to cleanup challenge configurations.
@@ -192,7 +250,7 @@ class AugeasConfigurator(common.Plugin):
             self.reverter.revert_temporary_config()
         except errors.ReverterError as err:
             raise errors.PluginError(str(err))
-        self.aug.load()
+        self.reload_augeas()
 
     def rollback_checkpoints(self, rollback=1):
         """Rollback saved checkpoints.
@@ -207,7 +265,7 @@ class AugeasConfigurator(common.Plugin):
             self.reverter.rollback_checkpoints(rollback)
         except errors.ReverterError as err:
             raise errors.PluginError(str(err))
-        self.aug.load()
+        self.reload_augeas()
 
     def view_config_changes(self):
         """Show all of the configuration changes that have taken place.
@@ -2,10 +2,13 @@
 # pylint: disable=too-many-lines
 import filecmp
 import fnmatch
+import glob
+import json
 import logging
 import os
 import re
 import socket
+import tempfile
 import time
 
 import zope.component
@@ -13,6 +16,7 @@ import zope.interface
 
 from acme import challenges
 
+from certbot import crypto_util
 from certbot import errors
 from certbot import interfaces
 from certbot import util
@@ -109,6 +113,9 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         add("handle-sites", default=constants.os_constant("handle_sites"),
             help="Let installer handle enabling sites for you." +
                  "(Only Ubuntu/Debian currently)")
+        add("model-cache", action="store_true",
+            help="Cache the parsed virtual hosts in the work directory and "
+                 "reuse them while the configuration files are unchanged.")
         util.add_deprecated_argument(add, argument_name="ctl", nargs=1)
         util.add_deprecated_argument(
             add, argument_name="init-script", nargs=1)
@@ -121,6 +128,10 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
 
         """
         version = kwargs.pop("version", None)
+        # Set when the vhosts were loaded from the model cache and the
+        # configuration wasn't parsed yet, see `_parse_deferred_config`
+        self._parse_deferred = False
+        self._parser = None
         super(ApacheConfigurator, self).__init__(*args, **kwargs)
 
         # Add name_server association dict
@@ -134,6 +145,11 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         self.parser = None
         self.version = version
         self.vhosts = None
+        # Index of the names of vhosts, see `_get_name_index`
+        self._name_index = None
+        # Set when configuration files were added outside of Augeas, e.g.
+        # by a2enmod, so the next reload must look for new files
+        self._files_added = False
         self._enhance_func = {"redirect": self._enable_redirect,
                               "ensure-http-header": self._set_http_header,
                               "staple-ocsp": self._enable_ocsp_stapling}
@@ -149,6 +165,32 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         """Full absolute path to digest of updated SSL configuration file."""
         return os.path.join(self.config.config_dir, constants.UPDATED_MOD_SSL_CONF_DIGEST)
 
+    @property
+    def model_cache(self):
+        """Full absolute path to the cached vhost model."""
+        return os.path.join(self.config.work_dir, constants.MODEL_CACHE)
+
+    @property
+    def aug(self):
+        """Augeas object, the configuration is parsed on first use if the
+        vhosts were loaded from the model cache."""
+        self._parse_deferred_config()
+        return self._aug
+
+    @aug.setter
+    def aug(self, value):
+        self._aug = value
+
+    @property
+    def parser(self):
+        """Apache parser, created on first use if the vhosts were loaded
+        from the model cache."""
+        self._parse_deferred_config()
+        return self._parser
+
+    @parser.setter
+    def parser(self, value):
+        self._parser = value
 
     def prepare(self):
         """Prepare the authenticator/installer.
@@ -190,14 +232,15 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
                 "version 1.2.0 or higher, please make sure you have you have "
                 "those installed.")
 
-        self.parser = parser.ApacheParser(
-            self.aug, self.conf("server-root"), self.conf("vhost-root"),
-            self.version)
-        # Check for errors in parsing files with Augeas
-        self.check_parsing_errors("httpd.aug")
-
-        # Get all of the available vhosts
-        self.vhosts = self.get_virtual_hosts()
+        if self.conf("model-cache") and self._load_model_cache():
+            # Augeas is only loaded once the configuration is needed
+            self._parse_deferred = True
+        else:
+            self._parse_config()
+            # Get all of the available vhosts
+            self.vhosts = self.get_virtual_hosts()
+            if self.conf("model-cache"):
+                self._save_model_cache()
 
         install_ssl_options_conf(self.mod_ssl_conf, self.updated_mod_ssl_conf_digest)
 
@@ -209,6 +252,117 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
             raise errors.PluginError(
                 "Unable to lock %s", self.conf("server-root"))
 
+    def _parse_config(self):
+        """Parse the Apache configuration with Augeas."""
+        self._parser = parser.ApacheParser(
+            self._aug, self.conf("server-root"), self.conf("vhost-root"),
+            self.version)
+        # Check for errors in parsing files with Augeas
+        self.check_parsing_errors("httpd.aug")
+
+    def _parse_deferred_config(self):
+        """Parse the configuration if it was skipped by `prepare`."""
+        if self._parse_deferred:
+            self._parse_deferred = False
+            self._parse_config()
+
+    def _model_cache_config(self):
+        """Options and runtime Defines the cached vhost model depends on.
+
+        :raises .errors.MisconfigurationError: If the runtime Defines
+            can't be determined
+
+        """
+        defines = []
+        if self.version >= (2, 4):
+            # Defines select IfDefine sections and are used in vhost names
+            defines = parser.get_runtime_defines(self.conf("server-root"))
+        return [self.conf("server-root"), self.conf("vhost-root"),
+                list(self.version), bool(self.conf("handle-sites")),
+                defines]
+
+    def _load_model_cache(self):
+        """Load the vhosts from the model cache.
+
+        The cache is only used if the same configuration files would be
+        loaded and none of them changed since it was written.
+
+        :returns: True if the vhosts were loaded
+        :rtype: bool
+
+        """
+        try:
+            with open(self.model_cache) as cache_file:
+                cache = json.load(cache_file)
+            if cache["config"] != self._model_cache_config():
+                return False
+            for incl, filepaths in cache["globs"].items():
+                if sorted(glob.glob(incl)) != filepaths:
+                    return False
+            for filepath, digest in cache["files"].items():
+                if crypto_util.sha256sum(filepath) != digest:
+                    return False
+            vhosts = [_vhost_from_json(vhost) for vhost in cache["vhosts"]]
+        except (IOError, OSError, ValueError, KeyError, TypeError,
+                errors.Error):
+            logger.debug("Unable to use the Apache model cache %s",
+                         self.model_cache, exc_info=True)
+            return False
+
+        logger.debug("Loaded %d vhosts from the Apache model cache",
+                     len(vhosts))
+        self.vhosts = vhosts
+        return True
+
+    def _save_model_cache(self):
+        """Save the vhosts and digests of the loaded files to the model
+        cache."""
+        globs = {}
+        for path in self.aug.match("/augeas/load/Httpd/incl"):
+            incl = self.aug.get(path)
+            globs[incl] = sorted(glob.glob(incl))
+        files = {}
+        tmp_path = None
+        try:
+            for path in self.aug.match("/augeas/files//path"):
+                # Strip the /files prefix
+                filepath = self.aug.get(path)[6:]
+                files[filepath] = crypto_util.sha256sum(filepath)
+            cache = {"config": self._model_cache_config(),
+                     "globs": globs, "files": files,
+                     "vhosts": [_vhost_to_json(vhost)
+                                for vhost in self.vhosts]}
+            # Write a temporary file first, so readers never see part of it
+            tmp_fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.model_cache))
+            with os.fdopen(tmp_fd, "w") as cache_file:
+                json.dump(cache, cache_file)
+            os.rename(tmp_path, self.model_cache)
+        except (IOError, OSError, errors.Error):
+            logger.debug("Unable to save the Apache model cache %s",
+                         self.model_cache, exc_info=True)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def reload_augeas(self, files=None):
+        """Reload the Augeas tree and drop state derived from it.
+
+        :param set files: Files that changed, state derived from other files
+            is kept. If None, all state is dropped.
+
+        """
+        if self._files_added:
+            files = None
+            self._files_added = False
+        super(ApacheConfigurator, self).reload_augeas(files)
+        if self._parser is None:
+            return
+        if files is None:
+            self._parser.reset_index()
+        else:
+            for filepath in files:
+                self._parser.reset_index(parser.get_aug_path(filepath))
+
     def _check_aug_version(self):
         """ Checks that we have recent enough version of libaugeas.
         If augeas version is recent enough, it will support case insensitive
@@ -390,7 +544,14 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
             name = name.lower()
             # fnmatch treats "[seq]" specially and [ or ] characters aren't
             # valid in Apache but Apache doesn't error out if they are present
-            if "[" not in name and fnmatch.fnmatch(target_name, name):
+            if "[" in name:
+                continue
+            suffix = name[1:]
+            if name.startswith("*.") and "*" not in suffix and "?" not in suffix:
+                # Plain suffix wildcards don't need a regular expression
+                if target_name.endswith(suffix):
+                    return True
+            elif fnmatch.fnmatch(target_name, name):
                 return True
         return False
 
@@ -411,21 +572,10 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         # Points 1 - Address name with no SSL
         best_candidate = None
         best_points = 0
-        for vhost in self.vhosts:
-            if vhost.modmacro is True:
-                continue
-            names = vhost.get_names()
-            if target_name in names:
-                points = 3
-            elif self.included_in_wildcard(names, target_name):
-                points = 2
-            elif any(addr.get_addr() == target_name for addr in vhost.addrs):
-                points = 1
-            else:
-                # No points given if names can't be found.
-                # This gets hit but doesn't register
-                continue  # pragma: no cover
-
+        # Vhosts are visited in order so the first one wins a tie
+        matches = self._get_name_index().match(target_name)
+        for i, points in sorted(matches.items()):
+            vhost = self.vhosts[i]
             if vhost.ssl:
                 points += 3
 
@@ -445,6 +595,17 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
 
         return best_candidate
 
+    def _get_name_index(self):
+        """Get the index of vhost names, building it if vhosts changed.
+
+        :rtype: :class:`~certbot_apache.obj.NameIndex`
+
+        """
+        if (self._name_index is None or
+                not self._name_index.is_current(self.vhosts)):
+            self._name_index = obj.NameIndex(self.vhosts)
+        return self._name_index
+
     def _non_default_vhosts(self):
         """Return all non _default_ only vhosts."""
         return [vh for vh in self.vhosts if not all(
@@ -546,6 +707,8 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
 
         if not host.modmacro:
             host.name = servername
+        # Names of an indexed vhost may have changed
+        self._name_index = None
 
     def _create_vhost(self, path):
         """Used by get_virtual_hosts to create vhost objects
@@ -794,11 +957,14 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         """
 
         if self.conf("handle-modules"):
+            mod_names = []
             if self.version >= (2, 4) and ("socache_shmcb_module" not in
                                            self.parser.modules):
-                self.enable_mod("socache_shmcb", temp=temp)
+                mod_names.append("socache_shmcb")
             if "ssl_module" not in self.parser.modules:
-                self.enable_mod("ssl", temp=temp)
+                mod_names.append("ssl")
+            if mod_names:
+                self.enable_mods(mod_names, temp=temp)
 
     def make_addrs_sni_ready(self, addrs):
         """Checks to see if the server is ready for SNI challenges.
@@ -846,7 +1012,7 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         self._copy_create_ssl_vhost_skeleton(nonssl_vhost, ssl_fp)
 
         # Reload augeas to take into account the new vhost
-        self.aug.load()
+        self.reload_augeas()
         # Get Vhost augeas path for new vhost
         new_matches = self.aug.match("/files%s//* [label()=~regexp('%s')]" %
                                      (self._escape(ssl_fp),
@@ -1118,6 +1284,7 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
                 directive_path = self.parser.find_dir(directive, None,
                                                       vh_path, False)
                 self.aug.remove(re.sub(r"/\w*$", "", directive_path[0]))
+                self.parser.reset_index(vh_path)
 
     def _remove_directives(self, vh_path, directives):
         for directive in directives:
@@ -1126,6 +1293,7 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
                 directive_path = self.parser.find_dir(directive, None,
                                                       vh_path, False)
                 self.aug.remove(re.sub(r"/\w*$", "", directive_path[0]))
+                self.parser.reset_index(vh_path)
 
     def _add_dummy_ssl_directives(self, vh_path):
         self.parser.add_dir(vh_path, "SSLCertificateFile",
@@ -1293,6 +1461,7 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         if stapling_cache_aug_path:
             self.aug.remove(
                     re.sub(r"/\w*$", "", stapling_cache_aug_path[0]))
+            self.parser.reset_index(stapling_cache_aug_path[0])
 
         self.parser.add_dir_to_ifmodssl(ssl_vhost_aug_path,
                 "SSLStaplingCache",
@@ -1501,6 +1670,7 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
                 # Search for past redirection rule, delete it, set the new one
                 if arg_vals in constants.OLD_REWRITE_HTTPS_ARGS:
                     self.aug.remove(dir_path)
+                    self.parser.reset_index(dir_path)
                     self._set_https_redirection_rewrite_rule(vhost)
                     self.save()
                     raise errors.PluginEnhancementAlreadyPresent(
@@ -1556,7 +1726,7 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
 
         redirect_filepath = self._write_out_redirect(ssl_vhost, text)
 
-        self.aug.load()
+        self.reload_augeas()
         # Make a new vhost data structure and add it to the lists
         new_vhost = self._create_vhost(parser.get_aug_path(self._escape(redirect_filepath)))
         self.vhosts.append(new_vhost)
@@ -1713,6 +1883,7 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
                             (self.parser.root, os.path.basename(vhost.filep)))
             self.reverter.register_file_creation(False, enabled_path)
             os.symlink(vhost.filep, enabled_path)
+            self._files_added = True
             vhost.enabled = True
             logger.info("Enabling available site: %s", vhost.filep)
             self.save_notes += "Enabled site %s\n" % vhost.filep
@@ -1729,6 +1900,25 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         :param str mod_name: Name of the module to enable. (e.g. 'ssl')
         :param bool temp: Whether or not this is a temporary action.
 
+        :raises .errors.NotSupportedError: If the filesystem layout is not
+            supported.
+        :raises .errors.MisconfigurationError: If a2enmod or a2dismod cannot be
+            run.
+
+        """
+        self.enable_mods([mod_name], temp)
+
+    def enable_mods(self, mod_names, temp=False):
+        """Enables modules in Apache.
+
+        The modules and their missing dependencies are enabled by a single
+        a2enmod run and added to the parser's modules without rescanning
+        the configuration.
+
+        :param list mod_names: Names of the modules to enable in the order
+            they need to be enabled. (e.g. ['socache_shmcb', 'ssl'])
+        :param bool temp: Whether or not this is a temporary action.
+
         :raises .errors.NotSupportedError: If the filesystem layout is not
             supported.
         :raises .errors.MisconfigurationError: If a2enmod or a2dismod cannot be
@@ -1741,32 +1931,38 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         if not os.path.isdir(avail_path) or not os.path.isdir(enabled_path):
             raise errors.NotSupportedError(
                 "Unsupported directory layout. You may try to enable mod %s "
-                "and try again." % mod_name)
-
-        deps = _get_mod_deps(mod_name)
-
-        # Enable all dependencies
-        for dep in deps:
-            if (dep + "_module") not in self.parser.modules:
-                self._enable_mod_debian(dep, temp)
-                self._add_parser_mod(dep)
-
-                note = "Enabled dependency of %s module - %s" % (mod_name, dep)
-                if not temp:
-                    self.save_notes += note + os.linesep
-                logger.debug(note)
-
-        # Enable actual module
-        self._enable_mod_debian(mod_name, temp)
-        self._add_parser_mod(mod_name)
-
-        if not temp:
-            self.save_notes += "Enabled %s module in Apache\n" % mod_name
-        logger.info("Enabled Apache %s module", mod_name)
+                "and try again." % ", ".join(mod_names))
+
+        to_enable = []
+        for mod_name in mod_names:
+            # Enable all dependencies
+            for dep in _get_mod_deps(mod_name):
+                if ((dep + "_module") not in self.parser.modules and
+                        dep not in to_enable):
+                    to_enable.append(dep)
+
+                    note = "Enabled dependency of %s module - %s" % (
+                        mod_name, dep)
+                    if not temp:
+                        self.save_notes += note + os.linesep
+                    logger.debug(note)
+            # Enable actual module
+            if mod_name not in to_enable:
+                to_enable.append(mod_name)
+
+        self._enable_mod_debian(to_enable, temp)
+        for mod_name in to_enable:
+            self._add_parser_mod(mod_name)
+
+        for mod_name in mod_names:
+            if not temp:
+                self.save_notes += "Enabled %s module in Apache\n" % mod_name
+            logger.info("Enabled Apache %s module", mod_name)
 
         # Modules can enable additional config files. Variables may be defined
         # within these new configuration sections.
         # Reload is not necessary as DUMP_RUN_CFG uses latest config.
+        parser.reset_cmd_output()
         self.parser.update_runtime_variables()
 
     def _add_parser_mod(self, mod_name):
@@ -1774,8 +1970,12 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
         self.parser.modules.add(mod_name + "_module")
         self.parser.modules.add("mod_" + mod_name + ".c")
 
-    def _enable_mod_debian(self, mod_name, temp):
-        """Assumes mods-available, mods-enabled layout."""
+    def _enable_mod_debian(self, mod_names, temp):
+        """Assumes mods-available, mods-enabled layout.
+
+        :param list mod_names: Modules to enable in order
+
+        """
         # Generate reversal command.
         # Try to be safe here... check that we can probably reverse before
         # applying enmod command
@@ -1784,9 +1984,11 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
                 "Unable to find a2dismod, please make sure a2enmod and "
                 "a2dismod are configured correctly for certbot.")
 
+        # Modules are disabled in reverse, i.e. before their dependencies
         self.reverter.register_undo_command(
-            temp, [self.conf("dismod"), mod_name])
-        util.run_script([self.conf("enmod"), mod_name])
+            temp, [self.conf("dismod")] + list(reversed(mod_names)))
+        util.run_script([self.conf("enmod")] + list(mod_names))
+        self._files_added = True
 
     def restart(self):
         """Runs a config test and reloads the Apache server.
@@ -1823,7 +2025,8 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
     def get_version(self):
         """Return version of Apache Server.
 
-        Version is returned as tuple. (ie. 2.4.7 = (2, 4, 7))
+        Version is returned as tuple. (ie. 2.4.7 = (2, 4, 7)). The output
+        of the version command is reused, see `.parser.get_cmd_output`.
 
         :returns: version
         :rtype: tuple
@@ -1832,7 +2035,9 @@ class ApacheConfigurator(augeas_configurator.AugeasConfigurator):
 
         """
         try:
-            stdout, _ = util.run_script(constants.os_constant("version_cmd"))
+            stdout = parser.get_cmd_output(
+                constants.os_constant("version_cmd"), self.conf("server-root"),
+                lambda cmd: util.run_script(cmd)[0])
         except errors.SubprocessError:
             raise errors.PluginError(
                 "Unable to run %s -v" %
@@ -1930,6 +2135,36 @@ def _get_mod_deps(mod_name):
     return deps.get(mod_name, [])
 
 
+def _vhost_to_json(vhost):
+    """Serialize a vhost for the model cache.
+
+    :param vhost: Virtual host
+    :type vhost: :class:`~certbot_apache.obj.VirtualHost`
+
+    :rtype: dict
+
+    """
+    return {"filep": vhost.filep, "path": vhost.path,
+            "addrs": sorted(str(addr) for addr in vhost.addrs),
+            "ssl": vhost.ssl, "enabled": vhost.enabled, "name": vhost.name,
+            "aliases": sorted(vhost.aliases), "modmacro": vhost.modmacro}
+
+
+def _vhost_from_json(data):
+    """Deserialize a vhost saved by `_vhost_to_json`.
+
+    :param dict data: Serialized virtual host
+
+    :rtype: :class:`~certbot_apache.obj.VirtualHost`
+
+    """
+    return obj.VirtualHost(
+        data["filep"], data["path"],
+        set(obj.Addr.fromstring(addr) for addr in data["addrs"]),
+        data["ssl"], data["enabled"], data["name"], set(data["aliases"]),
+        data["modmacro"])
+
+
 def get_file_path(vhost_path):
     """Get file path from augeas_vhost_path.
 
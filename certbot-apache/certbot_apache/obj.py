@@ -1,6 +1,9 @@
 """Module contains classes used by the Apache Configurator."""
+import fnmatch
 import re
 
+from collections import defaultdict
+
 from certbot.plugins import common
 
 
@@ -255,3 +258,93 @@ class VirtualHost(object):  # pylint: disable=too-few-public-methods
                 return False
 
         return True
+
+
+class NameIndex(object):
+    """Index of the names and addresses of virtual hosts.
+
+    Names are matched like in :meth:`VirtualHost.get_names` and
+    :meth:`certbot_apache.configurator.ApacheConfigurator.included_in_wildcard`
+    without comparing the target with every name. Wildcards of the form
+    ``*.example.com`` are stored in a trie of their reversed labels, other
+    patterns are still matched with :func:`fnmatch.fnmatch`.
+
+    :ivar list vhosts: Indexed virtual hosts, vhosts from mod_macro are
+        skipped
+
+    """
+
+    def __init__(self, vhosts):
+        self.vhosts = vhosts
+        self.size = len(vhosts)
+        # Each map is from a name or address to indices in vhosts
+        self._names = defaultdict(set)
+        self._lower_names = defaultdict(set)
+        self._addrs = defaultdict(set)
+        # Nested dicts of labels, the None key holds the indices
+        self._wildcards = {}
+        self._patterns = []
+
+        for i, vhost in enumerate(vhosts):
+            if vhost.modmacro is True:
+                continue
+            for name in vhost.get_names():
+                self._add_name(name, i)
+            for addr in vhost.addrs:
+                self._addrs[addr.get_addr()].add(i)
+
+    def _add_name(self, name, i):
+        self._names[name].add(i)
+        name = name.lower()
+        # fnmatch treats "[seq]" specially, these names are never matched
+        if "[" in name:
+            return
+        suffix = name[2:]
+        if name.startswith("*.") and "*" not in suffix and "?" not in suffix:
+            node = self._wildcards
+            for label in reversed(suffix.split(".")):
+                node = node.setdefault(label, {})
+            node.setdefault(None, set()).add(i)
+        elif "*" in name or "?" in name:
+            self._patterns.append((name, i))
+        else:
+            self._lower_names[name].add(i)
+
+    def is_current(self, vhosts):
+        """Is the index up to date for vhosts?
+
+        Vhosts are only ever appended to the list, changes to the names of
+        indexed vhosts aren't detected.
+
+        """
+        return self.vhosts is vhosts and self.size == len(vhosts)
+
+    def match(self, target_name):
+        """Find the vhosts matching target_name.
+
+        :param str target_name: domain name
+
+        :returns: Indices of matching vhosts mapped to 3 if target_name is
+            one of its names, 2 if it matches a wildcard and 1 if it is
+            one of its addresses
+        :rtype: dict
+
+        """
+        points = dict.fromkeys(self._addrs.get(target_name, ()), 1)
+
+        target_name_lower = target_name.lower()
+        wildcard = set(self._lower_names.get(target_name_lower, ()))
+        labels = target_name_lower.split(".")
+        node = self._wildcards
+        # A wildcard must cover at least one label
+        for label in reversed(labels[1:]):
+            node = node.get(label)
+            if node is None:
+                break
+            wildcard.update(node.get(None, ()))
+        wildcard.update(i for pattern, i in self._patterns
+                        if fnmatch.fnmatch(target_name_lower, pattern))
+        points.update(dict.fromkeys(wildcard, 2))
+
+        points.update(dict.fromkeys(self._names.get(target_name, ()), 3))
+        return points
@@ -1,5 +1,6 @@
 """ApacheParser is a member object of the ApacheConfigurator class."""
 import fnmatch
+import heapq
 import logging
 import os
 import re
@@ -8,12 +9,17 @@ import sys
 
 import six
 
+from collections import defaultdict
+
 from certbot import errors
 
 from certbot_apache import constants
 
 logger = logging.getLogger(__name__)
 
+# Output of Apache control commands, see get_cmd_output
+_CMD_OUTPUT = {}
+
 
 class ApacheParser(object):
     """Class handles the fine details of parsing the Apache Configuration.
@@ -26,6 +32,12 @@ class ApacheParser(object):
     :ivar dict loc: Location to place directives, root - configuration origin,
         default - user config file, name - NameVirtualHost,
 
+    The directives of every searched file are indexed the first time
+    `find_dir` looks at them. The index maps lowercased directive names to
+    their Augeas paths and the IfModule/IfDefine arguments they are nested
+    in. It is dropped for a file whenever the parser modifies it and
+    entirely whenever Augeas is reloaded, see `reset_index`.
+
     """
     arg_var_interpreter = re.compile(r"\$\{[^ \}]*}")
     fnmatch_chars = set(["*", "?", "\\", "[", "]"])
@@ -39,14 +51,17 @@ class ApacheParser(object):
         # This only handles invocation parameters and Define directives!
         self.parser_paths = {}
         self.variables = {}
+        self._dir_index = {}
+        self._dir_index_keys = defaultdict(set)
+        self.root = os.path.abspath(root)
         if version >= (2, 4):
             self.update_runtime_variables()
 
         self.aug = aug
         # Find configuration root and make sure augeas can parse it.
-        self.root = os.path.abspath(root)
         self.loc = {"root": self._find_config_root()}
-        self._parse_file(self.loc["root"])
+        # Augeas is loaded by standardize_excl below
+        self._parse_file(self.loc["root"], load=False)
 
         self.vhostroot = os.path.abspath(vhostroot)
 
@@ -57,6 +72,7 @@ class ApacheParser(object):
         # https://httpd.apache.org/docs/2.4/mod/core.html#ifmodule
         # This needs to come before locations are set.
         self.modules = set()
+        self._load_includes(get_aug_path(self.loc["root"]))
         self.init_modules()
 
         # Set up rest of locations
@@ -126,35 +142,15 @@ class ApacheParser(object):
 
         self.variables = variables
 
-    def _get_runtime_cfg(self):  # pylint: disable=no-self-use
+    def _get_runtime_cfg(self):
         """Get runtime configuration info.
 
+        The output is reused during the run, see `get_cmd_output`.
+
         :returns: stdout from DUMP_RUN_CFG
 
         """
-        try:
-            proc = subprocess.Popen(
-                constants.os_constant("define_cmd"),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True)
-            stdout, stderr = proc.communicate()
-
-        except (OSError, ValueError):
-            logger.error(
-                "Error running command %s for runtime parameters!%s",
-                constants.os_constant("define_cmd"), os.linesep)
-            raise errors.MisconfigurationError(
-                "Error accessing loaded Apache parameters: %s",
-                constants.os_constant("define_cmd"))
-        # Small errors that do not impede
-        if proc.returncode != 0:
-            logger.warning("Error in checking parameter list: %s", stderr)
-            raise errors.MisconfigurationError(
-                "Apache is unable to check whether or not the module is "
-                "loaded because Apache is misconfigured.")
-
-        return stdout
+        return get_runtime_cfg(self.root)
 
     def filter_args_num(self, matches, args):  # pylint: disable=no-self-use
         """Filter out directives with specific number of arguments.
@@ -212,6 +208,7 @@ class ApacheParser(object):
         else:
             for i, arg in enumerate(args):
                 self.aug.set("%s/arg[%d]" % (nvh_path, i + 1), arg)
+        self.reset_index(aug_conf_path)
 
     def _get_ifmod(self, aug_conf_path, mod):
         """Returns the path to <IfMod mod> and creates one if it doesn't exist.
@@ -249,6 +246,7 @@ class ApacheParser(object):
                     "%s/directive[last()]/arg[%d]" % (aug_conf_path, i), value)
         else:
             self.aug.set(aug_conf_path + "/directive[last()]/arg", args)
+        self.reset_index(aug_conf_path)
 
     def find_dir(self, directive, arg=None, start=None, exclude=True):
         """Finds directive in the configuration.
@@ -283,26 +281,7 @@ class ApacheParser(object):
         if not start:
             start = get_aug_path(self.loc["root"])
 
-        # No regexp code
-        # if arg is None:
-        #     matches = self.aug.match(start +
-        # "//*[self::directive='" + directive + "']/arg")
-        # else:
-        #     matches = self.aug.match(start +
-        # "//*[self::directive='" + directive +
-        #   "']/* [self::arg='" + arg + "']")
-
-        # includes = self.aug.match(start +
-        # "//* [self::directive='Include']/* [label()='arg']")
-
-        regex = "(%s)|(%s)|(%s)" % (case_i(directive),
-                                    case_i("Include"),
-                                    case_i("IncludeOptional"))
-        matches = self.aug.match(
-            "%s//*[self::directive=~regexp('%s')]" % (start, regex))
-
-        if exclude:
-            matches = self._exclude_dirs(matches)
+        directive = directive.lower()
 
         if arg is None:
             arg_suffix = "/arg"
@@ -313,15 +292,16 @@ class ApacheParser(object):
 
         # TODO: Wildcards should be included in alphabetical order
         # https://httpd.apache.org/docs/2.4/mod/core.html#include
-        for match in matches:
-            dir_ = self.aug.get(match).lower()
+        for match, dir_, filters in self._find_indexed(start, directive):
+            if exclude and not self._pass_filters(filters):
+                continue
             if dir_ == "include" or dir_ == "includeoptional":
                 ordered_matches.extend(self.find_dir(
                     directive, arg,
                     self._get_include_path(self.get_arg(match + "/arg")),
                     exclude))
             # This additionally allows Include
-            if dir_ == directive.lower():
+            if dir_ == directive:
                 ordered_matches.extend(self.aug.match(match + arg_suffix))
 
         return ordered_matches
@@ -352,49 +332,131 @@ class ApacheParser(object):
 
         return value
 
-    def _exclude_dirs(self, matches):
-        """Exclude directives that are not loaded into the configuration."""
-        filters = [("ifmodule", self.modules), ("ifdefine", self.variables)]
+    def _find_indexed(self, start, directive):
+        """Find directives named directive, Include or IncludeOptional.
 
-        valid_matches = []
+        :param str start: Augeas path to begin looking
+        :param str directive: Lowercased directive name
 
-        for match in matches:
-            for filter_ in filters:
-                if not self._pass_filter(match, filter_):
-                    break
+        :returns: Augeas paths of the directives in the order they appear
+            in the configuration, with their lowercased names and filters
+        :rtype: `list` of `tuple`
+
+        """
+        names = set([directive, "include", "includeoptional"])
+        found = []
+        for root in self.aug.match(start):
+            key = _get_file_aug_path(root)
+            if key is None:
+                # Not within a single file, e.g. an included directory
+                key = root
+                index = self._build_index(root)
+            elif key in self._dir_index:
+                index = self._dir_index[key]
             else:
-                valid_matches.append(match)
-        return valid_matches
+                index = self._dir_index[key] = self._build_index(key)
+                self._dir_index_keys[
+                    os.path.realpath(key[len("/files"):])].add(key)
+
+            entries = heapq.merge(*[index[name] for name in names
+                                    if name in index])
+            prefix = root + "/"
+            found.extend(entry[1:] for entry in entries
+                         if key == root or entry[1].startswith(prefix))
+        return found
 
-    def _pass_filter(self, match, filter_):
-        """Determine if directive passes a filter.
+    def _build_index(self, aug_path):
+        """Index all directives under aug_path.
 
-        :param str match: Augeas path
-        :param list filter: list of tuples of form
-            [("lowercase if directive", set of relevant parameters)]
+        :param str aug_path: Augeas path to index
+
+        :returns: Mapping of lowercased directive names to `list` of
+            `tuple` of document position, Augeas path, lowercased name
+            and the filters returned by `_get_filters`
+        :rtype: dict
+
+        """
+        index = defaultdict(list)
+        filter_args = {}
+        matches = self.aug.match("%s//directive" % aug_path)
+        for position, match in enumerate(matches):
+            name = self.aug.get(match).lower()
+            index[name].append(
+                (position, match, name,
+                 self._get_filters(match, filter_args)))
+        return index
+
+    def _get_filters(self, match, filter_args):
+        """Get the IfModule and IfDefine sections a directive is nested in.
+
+        :param str match: Augeas path of the directive
+        :param dict filter_args: Arguments of previously seen sections by
+            their Augeas path, updated in place
+
+        :returns: `tuple` of `tuple` of lowercase section name and argument
+        :rtype: tuple
 
         """
         match_l = match.lower()
-        last_match_idx = match_l.find(filter_[0])
+        filters = []
+        for section in ("ifmodule", "ifdefine"):
+            last_match_idx = match_l.find(section)
+
+            while last_match_idx != -1:
+                end_of_if = match_l.find("/", last_match_idx)
+                section_path = match[:end_of_if]
+                if section_path not in filter_args:
+                    # This should be aug.get (vars are not used e.g.
+                    # parser.aug_get)
+                    filter_args[section_path] = self.aug.get(
+                        section_path + "/arg")
+                filters.append((section, filter_args[section_path]))
 
-        while last_match_idx != -1:
-            # Check args
-            end_of_if = match_l.find("/", last_match_idx)
-            # This should be aug.get (vars are not used e.g. parser.aug_get)
-            expression = self.aug.get(match[:end_of_if] + "/arg")
+                last_match_idx = match_l.find(section, end_of_if)
+        return tuple(filters)
+
+    def _pass_filters(self, filters):
+        """Determine if a directive is loaded into the configuration.
+
+        :param tuple filters: IfModule and IfDefine sections the directive
+            is nested in, as returned by `_get_filters`
+
+        """
+        for section, expression in filters:
+            if section == "ifmodule":
+                parameters = self.modules
+            else:
+                parameters = self.variables
 
             if expression.startswith("!"):
                 # Strip off "!"
-                if expression[1:] in filter_[1]:
+                if expression[1:] in parameters:
                     return False
             else:
-                if expression not in filter_[1]:
+                if expression not in parameters:
                     return False
 
-            last_match_idx = match_l.find(filter_[0], end_of_if)
-
         return True
 
+    def reset_index(self, aug_path=None):
+        """Drop the directive index after the Augeas tree was modified.
+
+        :param str aug_path: Augeas path that was modified. Only the index
+            of the file containing it, or of any other path to that file, is
+            dropped. The whole index is if this is None or the file cannot
+            be determined.
+
+        """
+        file_aug_path = _get_file_aug_path(aug_path) if aug_path else None
+        if file_aug_path is None:
+            self._dir_index = {}
+            self._dir_index_keys = defaultdict(set)
+            return
+
+        realpath = os.path.realpath(file_aug_path[len("/files"):])
+        for key in self._dir_index_keys.pop(realpath, ()):
+            self._dir_index.pop(key, None)
+
     def _get_include_path(self, arg):
         """Converts an Apache Include directive into Augeas path.
 
@@ -416,21 +478,10 @@ class ApacheParser(object):
         #     logger.error("Error: Invalid regexp characters in %s", arg)
         #     return []
 
-        # Remove beginning and ending quotes
-        arg = arg.strip("'\"")
-
-        # Standardize the include argument based on server root
-        if not arg.startswith("/"):
-            # Normpath will condense ../
-            arg = os.path.normpath(os.path.join(self.root, arg))
-        else:
-            arg = os.path.normpath(arg)
+        arg = self._normalize_include(arg)
 
         # Attempts to add a transform to the file if one does not already exist
-        if os.path.isdir(arg):
-            self._parse_file(os.path.join(arg, "*"))
-        else:
-            self._parse_file(arg)
+        self._parse_include(arg)
 
         # Argument represents an fnmatch regular expression, convert it
         # Split up the path and convert each into an Augeas accepted regex
@@ -448,6 +499,78 @@ class ApacheParser(object):
 
         return get_aug_path(arg)
 
+    def _normalize_include(self, arg):
+        """Standardizes an Include directive argument.
+
+        :param str arg: Argument of Include directive
+
+        :returns: Normalized absolute path without surrounding quotes
+        :rtype: str
+
+        """
+        # Remove beginning and ending quotes
+        arg = arg.strip("'\"")
+
+        # Standardize the include argument based on server root
+        if not arg.startswith("/"):
+            # Normpath will condense ../
+            return os.path.normpath(os.path.join(self.root, arg))
+        return os.path.normpath(arg)
+
+    def _parse_include(self, arg, load=True):
+        """Parse the files named by a normalized Include argument.
+
+        :param str arg: Normalized argument of Include directive
+        :param bool load: Whether to reload Augeas if a transform is added
+
+        :returns: True if a new transform was added
+        :rtype: bool
+
+        """
+        if os.path.isdir(arg):
+            return self._parse_file(os.path.join(arg, "*"), load)
+        return self._parse_file(arg, load)
+
+    def _load_includes(self, start):
+        """Parse all files included from start with as few loads as possible.
+
+        Following includes through `find_dir` reloads Augeas every time a
+        new file is discovered. Instead, Include and IncludeOptional
+        directives are followed level by level, adding transforms for
+        every include found at one level of nesting before a single
+        ``aug.load()``. Directives excluded by the current modules and
+        defines are skipped, so the same files end up parsed as if they
+        were discovered through `find_dir`.
+
+        :param str start: Augeas path to begin looking for includes
+
+        """
+        visited = set()
+        pending = [start]
+
+        while pending:
+            includes = []
+            load = False
+            for path in pending:
+                for match, _, filters in self._find_indexed(path, "include"):
+                    if not self._pass_filters(filters):
+                        continue
+                    arg = self._normalize_include(self.get_arg(match + "/arg"))
+                    if self._parse_include(arg, load=False):
+                        load = True
+                    includes.append(arg)
+
+            if load:
+                self.aug.load()
+                self.reset_index()
+
+            pending = []
+            for arg in includes:
+                path = self._get_include_path(arg)
+                if path not in visited:
+                    visited.add(path)
+                    pending.append(path)
+
     def fnmatch_to_re(self, clean_fn_match):  # pylint: disable=no-self-use
         """Method converts Apache's basic fnmatch to regular expression.
 
@@ -470,13 +593,18 @@ class ApacheParser(object):
             # Since Python 3.6, it returns a different pattern like (?s:.*\.load)\Z
             return fnmatch.translate(clean_fn_match)[4:-3]
 
-    def _parse_file(self, filepath):
+    def _parse_file(self, filepath, load=True):
         """Parse file with Augeas
 
         Checks to see if file_path is parsed by Augeas
         If filepath isn't parsed, the file is added and Augeas is reloaded
 
         :param str filepath: Apache config file path
+        :param bool load: Whether to reload Augeas if a transform is added,
+            callers adding several transforms may load once afterwards
+
+        :returns: True if a new transform was added
+        :rtype: bool
 
         """
         use_new, remove_old = self._check_path_actions(filepath)
@@ -492,7 +620,11 @@ class ApacheParser(object):
                 if remove_old:
                     self._remove_httpd_transform(filepath)
                 self._add_httpd_transform(filepath)
-                self.aug.load()
+                if load:
+                    self.aug.load()
+                    self.reset_index()
+                return True
+        return False
 
     def _check_path_actions(self, filepath):
         """Determine actions to take with a new augeas path
@@ -596,6 +728,7 @@ class ApacheParser(object):
             self.aug.set("/augeas/load/Httpd/excl[%d]" % i, excluded)
 
         self.aug.load()
+        self.reset_index()
 
     def _set_locations(self):
         """Set default location for directives.
@@ -618,12 +751,139 @@ class ApacheParser(object):
 
     def _find_config_root(self):
         """Find the Apache Configuration Root file."""
-        location = ["apache2.conf", "httpd.conf", "conf/httpd.conf"]
-        for name in location:
-            if os.path.isfile(os.path.join(self.root, name)):
-                return os.path.join(self.root, name)
+        config_root = find_config_root(self.root)
+        if config_root is None:
+            raise errors.NoInstallationError(
+                "Could not find configuration root")
+        return config_root
+
+
+def find_config_root(server_root):
+    """Find the Apache Configuration Root file.
+
+    :param str server_root: Apache server root directory
+
+    :returns: Path to the file or None if it wasn't found
+    :rtype: str
+
+    """
+    location = ["apache2.conf", "httpd.conf", "conf/httpd.conf"]
+    for name in location:
+        if os.path.isfile(os.path.join(server_root, name)):
+            return os.path.join(server_root, name)
+    return None
+
+
+def get_cmd_output(cmd, server_root, run):
+    """Get the output of an Apache control command.
+
+    The output is reused for the rest of the run as long as the command
+    resolves to the same binary and the configuration root file wasn't
+    modified, so e.g. renewing many lineages runs apachectl once.
+
+    :param list cmd: Command and its arguments
+    :param str server_root: Apache server root directory
+    :param callable run: Runs the command and returns its output, it is
+        only called if there is no output to reuse
+
+    :returns: Output of the command
+
+    """
+    config_root = find_config_root(server_root)
+    try:
+        mtime = os.stat(config_root).st_mtime if config_root else None
+    except OSError:
+        mtime = None
+    key = (tuple(cmd), _find_binary(cmd[0]), config_root, mtime)
+    if key not in _CMD_OUTPUT:
+        _CMD_OUTPUT[key] = run(cmd)
+    return _CMD_OUTPUT[key]
+
+
+def get_runtime_cfg(server_root):
+    """Get the runtime configuration dump (DUMP_RUN_CFG) of Apache.
+
+    The output is reused during the run, see `get_cmd_output`.
+
+    :param str server_root: Apache server root directory
+
+    :returns: stdout from DUMP_RUN_CFG
+
+    :raises .errors.MisconfigurationError: If the command fails
+
+    """
+    return get_cmd_output(constants.os_constant("define_cmd"),
+                          server_root, _run_define_cmd)
+
+
+def get_runtime_defines(server_root):
+    """Get the variables Apache defines at runtime, e.g. from envvars.
+
+    :param str server_root: Apache server root directory
+
+    :returns: sorted ``NAME`` or ``NAME=value`` definitions
+    :rtype: list
+
+    :raises .errors.MisconfigurationError: If the command fails
+
+    """
+    return sorted(re.findall(r"Define: ([^ \n]*)",
+                             get_runtime_cfg(server_root)))
+
+
+def reset_cmd_output():
+    """Forget the output of Apache control commands.
+
+    This is needed when the configuration changed without modifying the
+    configuration root file, e.g. after enabling a module.
+
+    """
+    _CMD_OUTPUT.clear()
+
+
+def _find_binary(name):
+    """Find the path to the binary name like the shell would."""
+    if os.path.dirname(name):
+        return os.path.abspath(name)
+    for path in os.environ.get("PATH", "").split(os.pathsep):
+        candidate = os.path.join(path, name)
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    return None
 
-        raise errors.NoInstallationError("Could not find configuration root")
+
+def _run_define_cmd(cmd):
+    """Run cmd to dump the runtime configuration.
+
+    :param list cmd: define_cmd
+
+    :returns: stdout of the command
+
+    :raises .errors.MisconfigurationError: If the command fails
+
+    """
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True)
+        stdout, stderr = proc.communicate()
+
+    except (OSError, ValueError):
+        logger.error(
+            "Error running command %s for runtime parameters!%s",
+            cmd, os.linesep)
+        raise errors.MisconfigurationError(
+            "Error accessing loaded Apache parameters: %s", cmd)
+    # Small errors that do not impede
+    if proc.returncode != 0:
+        logger.warning("Error in checking parameter list: %s", stderr)
+        raise errors.MisconfigurationError(
+            "Apache is unable to check whether or not the module is "
+            "loaded because Apache is misconfigured.")
+
+    return stdout
 
 
 def case_i(string):
@@ -649,3 +909,22 @@ def get_aug_path(file_path):
 
     """
     return "/files%s" % file_path
+
+
+def _get_file_aug_path(aug_path):
+    """Return the Augeas path of the file containing aug_path.
+
+    :param str aug_path: Augeas path
+
+    :returns: Augeas path of the file or None if it cannot be determined
+    :rtype: str
+
+    """
+    if not aug_path.startswith("/files/"):
+        return None
+
+    file_path = aug_path[len("/files"):]
+    while file_path and not os.path.isfile(file_path):
+        file_path = file_path.rpartition("/")[0]
+
+    return get_aug_path(file_path) if file_path else None
@@ -71,6 +71,51 @@ class AugeasConfiguratorTest(util.ApacheTest):
         self.config.recovery_routine()
         self.assertEqual(mock_load.call_count, 1)
 
+    def test_reload_augeas_resets_index(self):
+        # pylint: disable=protected-access
+        self.config.parser.find_dir("Listen")
+        self.assertTrue(self.config.parser._dir_index)
+
+        self.config.reload_augeas()
+        self.assertEqual(self.config.parser._dir_index, {})
+
+    def test_reload_augeas_single_files(self):
+        vhost = self.vh_truth[0]
+        enabled = os.path.join(self.config_path, "sites-enabled",
+                               os.path.basename(vhost.filep))
+        with mock.patch.object(self.config.aug, "load") as mock_load:
+            with mock.patch.object(self.config.aug, "load_file",
+                                   create=True) as mock_load_file:
+                self.config.reload_augeas(set([vhost.filep]))
+
+        self.assertFalse(mock_load.called)
+        self.assertEqual(
+            set(call[0][0] for call in mock_load_file.call_args_list),
+            set([vhost.filep, enabled]))
+
+    def test_reload_augeas_single_files_error(self):
+        for error in (RuntimeError, IOError, ValueError):
+            with mock.patch.object(self.config.aug, "load") as mock_load:
+                with mock.patch.object(self.config.aug, "load_file",
+                                       create=True) as mock_load_file:
+                    mock_load_file.side_effect = error
+                    self.config.reload_augeas(
+                        set([self.vh_truth[0].filep]))
+
+            self.assertEqual(mock_load.call_count, 1)
+
+    def test_reload_augeas_files_added(self):
+        # pylint: disable=protected-access
+        self.config._files_added = True
+        with mock.patch.object(self.config.aug, "load") as mock_load:
+            with mock.patch.object(self.config.aug, "load_file",
+                                   create=True) as mock_load_file:
+                self.config.reload_augeas(set([self.vh_truth[0].filep]))
+
+        self.assertEqual(mock_load.call_count, 1)
+        self.assertFalse(mock_load_file.called)
+        self.assertFalse(self.config._files_added)
+
     def test_recovery_routine_error(self):
         self.config.reverter.recovery_routine = mock.Mock(
             side_effect=errors.ReverterError)
@@ -1,5 +1,7 @@
 # pylint: disable=too-many-public-methods,too-many-lines
 """Test for certbot_apache.configurator."""
+import glob
+import json
 import os
 import shutil
 import socket
@@ -46,7 +48,7 @@ class MultipleVhostsTest(util.ApacheTest):
 
         def mocked_deploy_cert(*args, **kwargs):
             """a helper to mock a deployed cert"""
-            with mock.patch("certbot_apache.configurator.ApacheConfigurator.enable_mod"):
+            with mock.patch("certbot_apache.configurator.ApacheConfigurator.enable_mods"):
                 config.real_deploy_cert(*args, **kwargs)
         self.config.deploy_cert = mocked_deploy_cert
         return self.config
@@ -213,6 +215,98 @@ class MultipleVhostsTest(util.ApacheTest):
             vhs = self.config.get_virtual_hosts()
             self.assertEqual(len(vhs), 8)
 
+    def _get_cached_configurator(self, defines=None):
+        return util.get_apache_configurator(
+            self.config_path, self.vhost_path, self.config_dir,
+            self.work_dir, model_cache=True, defines=defines)
+
+    def test_model_cache(self):
+        config = self._get_cached_configurator()
+        self.assertTrue(os.path.isfile(config.model_cache))
+
+        with mock.patch("certbot_apache.configurator.parser."
+                        "ApacheParser") as mock_parser:
+            cached = self._get_cached_configurator()
+        self.assertFalse(mock_parser.called)
+        self.assertEqual(set(cached.vhosts), set(config.vhosts))
+
+    def test_model_cache_deferred_parse(self):
+        self._get_cached_configurator()
+        cached = self._get_cached_configurator()
+        # pylint: disable=protected-access
+        self.assertTrue(cached._parse_deferred)
+        self.assertEqual(len(cached.parser.find_dir("Listen", "80")), 1)
+        self.assertFalse(cached._parse_deferred)
+        self.assertEqual(
+            set(cached.get_virtual_hosts()), set(cached.vhosts))
+
+    def test_model_cache_file_changed(self):
+        self._get_cached_configurator()
+        with open(self.vh_truth[0].filep, "a") as vhost_file:
+            vhost_file.write("\n# changed\n")
+
+        cached = self._get_cached_configurator()
+        # pylint: disable=protected-access
+        self.assertFalse(cached._parse_deferred)
+        self.assertTrue(cached._parser is not None)
+
+    def test_model_cache_defines_changed(self):
+        self._get_cached_configurator(defines=["ENABLE_A"])
+        cached = self._get_cached_configurator(defines=["ENABLE_B"])
+        # pylint: disable=protected-access
+        self.assertTrue(cached._parser is not None)
+
+        cached = self._get_cached_configurator(defines=["ENABLE_B"])
+        self.assertTrue(cached._parser is None)
+
+    def test_model_cache_config_changed(self):
+        config = self._get_cached_configurator()
+        with open(config.model_cache) as cache_file:
+            cache = json.load(cache_file)
+        cache["config"][3] = not cache["config"][3]
+        with open(config.model_cache, "w") as cache_file:
+            json.dump(cache, cache_file)
+
+        cached = self._get_cached_configurator()
+        # pylint: disable=protected-access
+        self.assertTrue(cached._parser is not None)
+
+    def test_model_cache_glob_changed(self):
+        config = self._get_cached_configurator()
+        with open(config.model_cache) as cache_file:
+            globs = json.load(cache_file)["globs"]
+        incl = [incl for incl in globs
+                if incl.endswith("*") and globs[incl]][0]
+        with open(globs[incl][0] + ".new", "w") as new_file:
+            new_file.write("# new\n")
+
+        cached = self._get_cached_configurator()
+        # pylint: disable=protected-access
+        self.assertTrue(cached._parser is not None)
+
+    def test_model_cache_save(self):
+        config = self._get_cached_configurator()
+        self.assertTrue(os.path.isfile(config.model_cache))
+        self.assertEqual(glob.glob(os.path.join(self.work_dir, "tmp*")), [])
+
+    @mock.patch("certbot_apache.configurator.os.rename")
+    def test_model_cache_save_error(self, mock_rename):
+        mock_rename.side_effect = OSError
+        config = self._get_cached_configurator()
+        self.assertTrue(mock_rename.called)
+        self.assertFalse(os.path.exists(config.model_cache))
+        self.assertEqual(glob.glob(os.path.join(self.work_dir, "tmp*")), [])
+
+    def test_model_cache_invalid(self):
+        with open(os.path.join(self.work_dir, constants.MODEL_CACHE),
+                  "w") as cache_file:
+            cache_file.write("{")
+
+        cached = self._get_cached_configurator()
+        # pylint: disable=protected-access
+        self.assertTrue(cached._parser is not None)
+        self.assertEqual(len(cached.vhosts), 8)
+
     @mock.patch("certbot_apache.display_ops.select_vhost")
     def test_choose_vhost_none_avail(self, mock_select):
         mock_select.return_value = None
@@ -283,6 +377,18 @@ class MultipleVhostsTest(util.ApacheTest):
         self.config.vhosts.append(ssl_vh)
         self.assertEqual(self.config._find_best_vhost("zombo.com"), ssl_vh)
 
+    def test_find_best_vhost_reuses_index(self):
+        # pylint: disable=protected-access
+        with mock.patch("certbot_apache.configurator.obj.NameIndex",
+                        wraps=obj.NameIndex) as mock_index:
+            self.config._find_best_vhost("certbot.demo")
+            self.config._find_best_vhost("encryption-example.demo")
+            self.assertEqual(mock_index.call_count, 1)
+
+            self.config.vhosts.append(self.vh_truth[0])
+            self.config._find_best_vhost("certbot.demo")
+            self.assertEqual(mock_index.call_count, 2)
+
     def test_find_best_vhost_default(self):
         # pylint: disable=protected-access
         # Assume only the two default vhosts.
@@ -334,6 +440,28 @@ class MultipleVhostsTest(util.ApacheTest):
 
         self.assertTrue(mock_run_script.called)
 
+    @mock.patch("certbot.util.run_script")
+    @mock.patch("certbot.util.exe_exists")
+    @mock.patch("certbot_apache.parser.ApacheParser.update_runtime_variables")
+    def test_enable_mods(self, mock_update, mock_exe_exists, mock_run_script):
+        mock_exe_exists.return_value = True
+        self.config.parser.modules.discard("mime_module")
+        self.config.parser.modules.add("setenvif_module")
+        mock_register = mock.Mock()
+        self.config.reverter.register_undo_command = mock_register
+
+        self.config.enable_mods(["socache_shmcb", "ssl"], temp=True)
+
+        enmod = self.config.conf("enmod")
+        dismod = self.config.conf("dismod")
+        mock_run_script.assert_called_once_with(
+            [enmod, "socache_shmcb", "mime", "ssl"])
+        mock_register.assert_called_once_with(
+            True, [dismod, "ssl", "mime", "socache_shmcb"])
+        self.assertEqual(mock_update.call_count, 1)
+        for mod_name in ("socache_shmcb_module", "mod_mime.c", "ssl_module"):
+            self.assertTrue(mod_name in self.config.parser.modules)
+
     def test_enable_mod_unsupported_dirs(self):
         shutil.rmtree(os.path.join(self.config.parser.root, "mods-enabled"))
         self.assertRaises(
@@ -499,7 +627,7 @@ class MultipleVhostsTest(util.ApacheTest):
 
     def test_prepare_server_https(self):
         mock_enable = mock.Mock()
-        self.config.enable_mod = mock_enable
+        self.config.enable_mods = mock_enable
 
         mock_find = mock.Mock()
         mock_add_dir = mock.Mock()
@@ -511,14 +639,13 @@ class MultipleVhostsTest(util.ApacheTest):
 
         self.config.prepare_server_https("443")
         # Changing the order these modules are enabled breaks the reverter
-        self.assertEqual(mock_enable.call_args_list[0][0][0], "socache_shmcb")
-        self.assertEqual(mock_enable.call_args[0][0], "ssl")
-        self.assertEqual(mock_enable.call_args[1], {"temp": False})
+        mock_enable.assert_called_once_with(
+            ["socache_shmcb", "ssl"], temp=False)
 
         self.config.prepare_server_https("8080", temp=True)
         # Changing the order these modules are enabled breaks the reverter
-        self.assertEqual(mock_enable.call_args_list[2][0][0], "socache_shmcb")
-        self.assertEqual(mock_enable.call_args[0][0], "ssl")
+        self.assertEqual(
+            mock_enable.call_args[0][0], ["socache_shmcb", "ssl"])
         # Enable mod is temporary
         self.assertEqual(mock_enable.call_args[1], {"temp": True})
 
@@ -535,7 +662,7 @@ class MultipleVhostsTest(util.ApacheTest):
         self.config.parser.find_dir = mock_find
         self.config.parser.get_arg = mock_get
         self.config.parser.add_dir_to_ifmodssl = mock_add_dir
-        self.config.enable_mod = mock_enable
+        self.config.enable_mods = mock_enable
 
         # Test Listen statements with specific ip listeed
         self.config.prepare_server_https("443")
@@ -573,7 +700,7 @@ class MultipleVhostsTest(util.ApacheTest):
         self.config.parser.find_dir = mock_find
         self.config.parser.get_arg = mock_get
         self.config.parser.add_dir_to_ifmodssl = mock_add_dir
-        self.config.enable_mod = mock_enable
+        self.config.enable_mods = mock_enable
 
         self.config.prepare_server_https("443")
         self.assertEqual(mock_add_dir.call_count, 1)
@@ -590,7 +717,7 @@ class MultipleVhostsTest(util.ApacheTest):
         self.config.parser.find_dir = mock_find
         self.config.parser.get_arg = mock_get
         self.config.parser.add_dir_to_ifmodssl = mock_add_dir
-        self.config.enable_mod = mock_enable
+        self.config.enable_mods = mock_enable
 
         # Test Listen statements with specific ip listeed
         self.config.prepare_server_https("443")
@@ -780,19 +907,26 @@ class MultipleVhostsTest(util.ApacheTest):
         mock_script.return_value = (
             "Server Version: Apache/2.4.2 (Debian)", "")
         self.assertEqual(self.config.get_version(), (2, 4, 2))
+        # The output is reused until it is reset
+        self.assertEqual(self.config.get_version(), (2, 4, 2))
+        self.assertEqual(mock_script.call_count, 1)
+        parser.reset_cmd_output()
 
         mock_script.return_value = (
             "Server Version: Apache/2 (Linux)", "")
         self.assertEqual(self.config.get_version(), (2,))
+        parser.reset_cmd_output()
 
         mock_script.return_value = (
             "Server Version: Apache (Debian)", "")
         self.assertRaises(errors.PluginError, self.config.get_version)
+        parser.reset_cmd_output()
 
         mock_script.return_value = (
             "Server Version: Apache/2.3{0} Apache/2.4.7".format(
                 os.linesep), "")
         self.assertRaises(errors.PluginError, self.config.get_version)
+        parser.reset_cmd_output()
 
         mock_script.side_effect = errors.SubprocessError("Can't find program")
         self.assertRaises(errors.PluginError, self.config.get_version)
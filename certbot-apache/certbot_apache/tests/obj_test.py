@@ -136,5 +136,60 @@ class AddrTest(unittest.TestCase):
         self.assertTrue(self.addr != self.addr1)
 
 
+class NameIndexTest(unittest.TestCase):
+    """Test the NameIndex class."""
+
+    def setUp(self):
+        from certbot_apache.obj import Addr
+        from certbot_apache.obj import VirtualHost
+
+        self.vhosts = [
+            VirtualHost("fp", "vhp0", set([Addr.fromstring("*:80")]),
+                        False, True, "example.com", set(["*.example.com"])),
+            VirtualHost("fp", "vhp1", set([Addr.fromstring("*:80")]),
+                        False, True, "Example.org", set(["www.ex?mple.*"])),
+            VirtualHost("fp", "vhp2", set([Addr.fromstring("10.0.0.1:80")]),
+                        False, True, None, set(["*.b.example.com", "[x]"])),
+            VirtualHost("fp", "vhp3", set([Addr.fromstring("*:80")]),
+                        False, True, "macro.com", modmacro=True),
+        ]
+
+    def _match(self, target_name):
+        from certbot_apache.obj import NameIndex
+        return NameIndex(self.vhosts).match(target_name)
+
+    def test_exact(self):
+        self.assertEqual(self._match("example.com"), {0: 3})
+
+    def test_case_insensitive_wildcard(self):
+        self.assertEqual(self._match("example.org"), {1: 2})
+        self.assertEqual(self._match("Example.org"), {1: 3})
+
+    def test_suffix_wildcard(self):
+        self.assertEqual(self._match("a.example.com"), {0: 2})
+        self.assertEqual(self._match("a.B.example.com"), {0: 2, 2: 2})
+        self.assertEqual(self._match(".b.example.com"), {0: 2, 2: 2})
+        self.assertEqual(self._match("b.example.com"), {0: 2})
+
+    def test_pattern(self):
+        self.assertEqual(self._match("www.example.net"), {1: 2})
+
+    def test_addr(self):
+        self.assertEqual(self._match("10.0.0.1"), {2: 1})
+
+    def test_skipped(self):
+        self.assertEqual(self._match("[x]"), {2: 3})
+        self.assertEqual(self._match("x"), {})
+        self.assertEqual(self._match("macro.com"), {})
+
+    def test_is_current(self):
+        from certbot_apache.obj import NameIndex
+        index = NameIndex(self.vhosts)
+        self.assertTrue(index.is_current(self.vhosts))
+        self.assertFalse(index.is_current(list(self.vhosts)))
+        self.vhosts.append(self.vhosts[0])
+        self.assertFalse(index.is_current(self.vhosts))
+
+
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
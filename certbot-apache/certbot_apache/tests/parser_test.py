@@ -46,6 +46,16 @@ class BasicParserTest(util.ParserTest):
 
         self.assertTrue(matches)
 
+    def test_parse_file_no_load(self):
+        # pylint: disable=protected-access
+        file_path = os.path.join(
+            self.config_path, "not-parsed-by-default", "certbot.conf")
+
+        with mock.patch.object(self.parser.aug, "load") as mock_load:
+            self.assertTrue(self.parser._parse_file(file_path, load=False))
+            self.assertFalse(self.parser._parse_file(file_path))
+        self.assertFalse(mock_load.called)
+
     def test_find_dir(self):
         test = self.parser.find_dir("Listen", "80")
         # This will only look in enabled hosts
@@ -54,6 +64,33 @@ class BasicParserTest(util.ParserTest):
         self.assertEqual(len(test), 1)
         self.assertEqual(len(test2), 4)
 
+    def test_find_dir_uses_index(self):
+        self.parser.find_dir("Listen")
+        with mock.patch.object(self.parser.aug, "match",
+                               wraps=self.parser.aug.match) as mock_match:
+            self.assertEqual(len(self.parser.find_dir("Listen", "80")), 1)
+
+        for call in mock_match.call_args_list:
+            self.assertFalse("//directive" in call[0][0])
+
+    def test_find_dir_case_insensitive(self):
+        self.assertEqual(self.parser.find_dir("listen"),
+                         self.parser.find_dir("LISTEN"))
+
+    def test_reset_index(self):
+        # pylint: disable=protected-access
+        from certbot_apache.parser import get_aug_path
+        root = get_aug_path(self.parser.loc["root"])
+        self.parser.find_dir("Listen")
+        self.assertTrue(root in self.parser._dir_index)
+
+        self.parser.reset_index(root + "/directive[1]")
+        self.assertFalse(root in self.parser._dir_index)
+        self.assertTrue(self.parser._dir_index)
+
+        self.parser.reset_index()
+        self.assertEqual(self.parser._dir_index, {})
+
     def test_add_dir(self):
         aug_default = "/files" + self.parser.loc["default"]
         self.parser.add_dir(aug_default, "AddDirective", "test")
@@ -148,6 +185,23 @@ class BasicParserTest(util.ParserTest):
         self.assertRaises(
             errors.PluginError, self.parser.update_runtime_variables)
 
+    @mock.patch("certbot_apache.parser._run_define_cmd")
+    def test_update_runtime_vars_cached(self, mock_run):
+        from certbot_apache.parser import reset_cmd_output
+        mock_run.return_value = "Define: DUMP_RUN_CFG\nDefine: TEST"
+        self.parser.update_runtime_variables()
+        self.parser.update_runtime_variables()
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(self.parser.variables, {"TEST": ""})
+
+        os.utime(self.parser.loc["root"], (0, 0))
+        self.parser.update_runtime_variables()
+        self.assertEqual(mock_run.call_count, 2)
+
+        reset_cmd_output()
+        self.parser.update_runtime_variables()
+        self.assertEqual(mock_run.call_count, 3)
+
     @mock.patch("certbot_apache.constants.os_constant")
     @mock.patch("certbot_apache.parser.subprocess.Popen")
     def test_update_runtime_vars_bad_ctl(self, mock_popen, mock_const):
@@ -186,6 +240,20 @@ class ParserInitTest(util.ApacheTest):
             ApacheParser, self.aug, os.path.relpath(self.config_path),
             "/dummy/vhostpath", version=(2, 2, 22))
 
+    def test_init_loads_once_per_include_level(self):
+        from certbot_apache.parser import ApacheParser
+        with mock.patch.object(
+                self.aug, "load", wraps=self.aug.load) as mock_load:
+            with mock.patch("certbot_apache.parser.ApacheParser."
+                            "update_runtime_variables"):
+                parser = ApacheParser(
+                    self.aug, self.config_path, self.vhost_path)
+            # Includes were already parsed, so this doesn't load again
+            self.assertEqual(len(parser.find_dir("Listen", "80")), 1)
+
+        # The root, its includes and the vhost root
+        self.assertEqual(mock_load.call_count, 3)
+
     def test_root_normalized(self):
         from certbot_apache.parser import ApacheParser
 
@@ -59,7 +59,7 @@ class TlsSniPerformTest(util.ApacheTest):
         # Make sure that register_undo_command was called into temp directory.
         self.assertEqual(True, mock_register.call_args[0][0])
 
-        mock_setup_cert.assert_called_once_with(achall)
+        mock_setup_cert.assert_called_once_with(achall, mock.ANY)
 
         # Check to make sure challenge config path is included in apache config
         self.assertEqual(
@@ -81,16 +81,18 @@ class TlsSniPerformTest(util.ApacheTest):
         # pylint: disable=protected-access
         self.sni._setup_challenge_cert = mock_setup_cert
 
-        with mock.patch("certbot_apache.configurator.ApacheConfigurator.enable_mod"):
+        with mock.patch("certbot_apache.configurator.ApacheConfigurator.enable_mods"):
             sni_responses = self.sni.perform()
 
         self.assertEqual(mock_setup_cert.call_count, 2)
 
         # Make sure calls made to mocked function were correct
         self.assertEqual(
-            mock_setup_cert.call_args_list[0], mock.call(self.achalls[0]))
+            mock_setup_cert.call_args_list[0],
+            mock.call(self.achalls[0], mock.ANY))
         self.assertEqual(
-            mock_setup_cert.call_args_list[1], mock.call(self.achalls[1]))
+            mock_setup_cert.call_args_list[1],
+            mock.call(self.achalls[1], mock.ANY))
 
         self.assertEqual(
             len(self.sni.configurator.parser.find_dir(
@@ -100,6 +102,47 @@ class TlsSniPerformTest(util.ApacheTest):
         for i in xrange(2):
             self.assertEqual(sni_responses[i], acme_responses[i])
 
+        # All challenge certs share one key
+        cert_keys = set(call[0][1] for call in mock_setup_cert.call_args_list)
+        self.assertEqual(len(cert_keys), 1)
+
+    @mock.patch("certbot.plugins.common.TLSSNI01._setup_challenge_cert")
+    def test_perform_saves(self, mock_setup_cert):
+        self.sni.configurator.parser.modules.add("ssl_module")
+        for achall in self.achalls:
+            self.sni.add_chall(achall)
+        mock_setup_cert.side_effect = [
+            achall.response(self.auth_key) for achall in self.achalls]
+
+        with mock.patch.object(self.sni.configurator, "save") as mock_save:
+            self.sni.perform()
+        # Before setting up the challenges, before making the addresses
+        # SNI ready and after
+        self.assertEqual(mock_save.call_count, 3)
+
+    @mock.patch("certbot.plugins.common.TLSSNI01._setup_challenge_cert")
+    def test_perform_apache_2_2(self, mock_setup_cert):
+        config = util.get_apache_configurator(
+            self.config_path, self.vhost_path, self.config_dir,
+            self.work_dir, version=(2, 2, 22))
+        config.config.tls_sni_01_port = 443
+        config.parser.modules.add("ssl_module")
+        from certbot_apache import tls_sni_01
+        sni = tls_sni_01.ApacheTlsSni01(config)
+        for achall in self.achalls:
+            sni.add_chall(achall)
+        mock_setup_cert.side_effect = [
+            achall.response(self.auth_key) for achall in self.achalls]
+
+        with mock.patch("certbot_apache.configurator."
+                        "ApacheConfigurator.enable_mods"):
+            sni.perform()
+
+        # The Include survives make_addrs_sni_ready reloading Augeas
+        self.assertEqual(
+            len(config.parser.find_dir("Include", sni.challenge_conf)), 1)
+        self.assertTrue(config.is_name_vhost(obj.Addr.fromstring("*:443")))
+
     def test_mod_config(self):
         z_domains = []
         for achall in self.achalls:
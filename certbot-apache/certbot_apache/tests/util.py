@@ -74,10 +74,12 @@ class ParserTest(ApacheTest):  # pytlint: disable=too-few-public-methods
 
 def get_apache_configurator(
         config_path, vhost_path,
-        config_dir, work_dir, version=(2, 4, 7), conf=None):
+        config_dir, work_dir, version=(2, 4, 7), conf=None,
+        model_cache=False, defines=None):
     """Create an Apache Configurator with the specified options.
 
     :param conf: Function that returns binary paths. self.conf in Configurator
+    :param list defines: Runtime Defines seen by the model cache
 
     """
     backups = os.path.join(work_dir, "backups")
@@ -86,10 +88,14 @@ def get_apache_configurator(
         apache_vhost_root=vhost_path,
         apache_le_vhost_ext=constants.os_constant("le_vhost_ext"),
         apache_challenge_location=config_path,
+        apache_model_cache=model_cache,
         backup_dir=backups,
         config_dir=config_dir,
         temp_checkpoint_dir=os.path.join(work_dir, "temp_checkpoints"),
         in_progress_dir=os.path.join(backups, "IN_PROGRESS"),
+        checkpoint_store=False,
+        keep_checkpoints=None,
+        checkpoint_max_age=None,
         work_dir=work_dir)
 
     with mock.patch("certbot_apache.configurator.util.run_script"):
@@ -98,15 +104,18 @@ def get_apache_configurator(
             mock_exe_exists.return_value = True
             with mock.patch("certbot_apache.parser.ApacheParser."
                             "update_runtime_variables"):
-                config = configurator.ApacheConfigurator(
-                    config=mock_le_config,
-                    name="apache",
-                    version=version)
-                # This allows testing scripts to set it a bit more quickly
-                if conf is not None:
-                    config.conf = conf  # pragma: no cover
-
-                config.prepare()
+                with mock.patch("certbot_apache.parser."
+                                "get_runtime_defines") as mock_defines:
+                    mock_defines.return_value = defines or []
+                    config = configurator.ApacheConfigurator(
+                        config=mock_le_config,
+                        name="apache",
+                        version=version)
+                    # This allows testing scripts to set it a bit more quickly
+                    if conf is not None:
+                        config.conf = conf  # pragma: no cover
+
+                    config.prepare()
 
     return config
 
@@ -3,6 +3,8 @@
 import os
 import logging
 
+import OpenSSL
+
 from certbot.plugins import common
 from certbot.errors import PluginError, MissingCommandlineFlag
 
@@ -69,14 +71,17 @@ class ApacheTlsSni01(common.TLSSNI01):
         self.configurator.prepare_server_https(
             str(self.configurator.config.tls_sni_01_port), True)
 
-        responses = []
-
-        # Create all of the challenge certs
-        for achall in self.achalls:
-            responses.append(self._setup_challenge_cert(achall))
+        # Create all of the challenge certs. They share a key, generating
+        # one per challenge dominates the time taken for large orders.
+        cert_key = OpenSSL.crypto.PKey()
+        cert_key.generate_key(OpenSSL.crypto.TYPE_RSA, 2048)
+        responses = [self._setup_challenge_cert(achall, cert_key)
+                     for achall in self.achalls]
 
         # Setup the configuration
         addrs = self._mod_config()
+        # Before Apache 2.4, make_addrs_sni_ready parses the new Include,
+        # which reloads Augeas and would lose the unsaved changes
         self.configurator.save("Don't lose mod_config changes", True)
         self.configurator.make_addrs_sni_ready(addrs)
 
@@ -95,15 +100,16 @@ class ApacheTlsSni01(common.TLSSNI01):
 
         """
         addrs = set()
-        config_text = "<IfModule mod_ssl.c>\n"
+        config_text = ["<IfModule mod_ssl.c>\n"]
 
         for achall in self.achalls:
             achall_addrs = self._get_addrs(achall)
             addrs.update(achall_addrs)
 
-            config_text += self._get_config_text(achall, achall_addrs)
+            config_text.append(self._get_config_text(achall, achall_addrs))
 
-        config_text += "</IfModule>\n"
+        config_text.append("</IfModule>\n")
+        config_text = "".join(config_text)
 
         self._conf_include_check(self.configurator.parser.loc["default"])
         self.configurator.reverter.register_file_creation(
@@ -1,4 +1,5 @@
 """Nginx Configuration"""
+import hashlib
 import logging
 import os
 import re
@@ -30,6 +31,10 @@ from certbot_nginx import parser
 
 logger = logging.getLogger(__name__)
 
+# Digests of the configurations that passed "nginx -t" during this run,
+# keyed by the nginx binary and main configuration file
+_VALIDATED_CONFIGS = {}
+
 REDIRECT_BLOCK = [[
     ['\n    ', 'if', ' ', '($scheme', ' ', '!=', ' ', '"https") '],
     [['\n        ', 'return', ' ', '301', ' ', 'https://$host$request_uri'],
@@ -121,6 +126,9 @@ class NginxConfigurator(common.Plugin):
         # Add number of outstanding challenges
         self._chall_out = 0
 
+        # Files saved in the temporary (challenge) checkpoint
+        self._temp_save_files = set()
+
         # These will be set in the prepare function
         self.parser = None
         self.version = version
@@ -152,11 +160,18 @@ class NginxConfigurator(common.Plugin):
         if not util.exe_exists(self.conf('ctl')):
             raise errors.NoInstallationError
 
+        # Parse the configuration first, so that config_test can tell
+        # whether it was already validated earlier in this run
+        try:
+            self.parser = parser.NginxParser(self.conf('server-root'))
+        except errors.NoInstallationError:
+            self.parser = None
+
         # Make sure configuration is valid
         self.config_test()
 
-
-        self.parser = parser.NginxParser(self.conf('server-root'))
+        if self.parser is None:
+            self.parser = parser.NginxParser(self.conf('server-root'))
 
         install_ssl_options_conf(self.mod_ssl_conf, self.updated_mod_ssl_conf_digest)
 
@@ -210,7 +225,7 @@ class NginxConfigurator(common.Plugin):
     #######################
     # Vhost parsing methods
     #######################
-    def choose_vhost(self, target_name):
+    def choose_vhost(self, target_name, vhost_list=None):
         """Chooses a virtual host based on the given domain name.
 
         .. note:: This makes the vhost SSL-enabled if it isn't already. Follows
@@ -224,6 +239,10 @@ class NginxConfigurator(common.Plugin):
             hostname. Currently we just ignore this.
 
         :param str target_name: domain name
+        :param list vhost_list: vhosts previously returned by
+            :meth:`NginxParser.get_vhosts`, so that callers choosing vhosts
+            for many names only collect them once. If the chosen vhost has
+            to be made SSL, the list is refreshed in place.
 
         :returns: ssl vhost associated with name
         :rtype: :class:`~certbot_nginx.obj.VirtualHost`
@@ -231,7 +250,7 @@ class NginxConfigurator(common.Plugin):
         """
         vhost = None
 
-        matches = self._get_ranked_matches(target_name)
+        matches = self._get_ranked_matches(target_name, vhost_list)
         vhost = self._select_best_name_match(matches)
         if not vhost:
             # No matches. Raise a misconfiguration error.
@@ -241,20 +260,25 @@ class NginxConfigurator(common.Plugin):
             # Note: if we are enhancing with ocsp, vhost should already be ssl.
             if not vhost.ssl:
                 self._make_server_ssl(vhost)
+                if vhost_list is not None:
+                    # Other server blocks may listen on the new ssl address
+                    vhost_list[:] = self.parser.get_vhosts()
 
         return vhost
 
-    def _get_ranked_matches(self, target_name):
+    def _get_ranked_matches(self, target_name, vhost_list=None):
         """Returns a ranked list of vhosts that match target_name.
         The ranking gives preference to SSL vhosts.
 
         :param str target_name: The name to match
+        :param list vhost_list: vhosts to rank, defaults to all vhosts
         :returns: list of dicts containing the vhost, the matching name, and
             the numerical rank
         :rtype: list
 
         """
-        vhost_list = self.parser.get_vhosts()
+        if vhost_list is None:
+            vhost_list = self.parser.get_vhosts()
         return self._rank_matches_by_name_and_ssl(vhost_list, target_name)
 
     def _select_best_name_match(self, matches):
@@ -587,16 +611,63 @@ class NginxConfigurator(common.Plugin):
         """
         nginx_restart(self.conf('ctl'), self.nginx_conf)
 
-    def config_test(self):  # pylint: disable=no-self-use
+    def config_test(self):
         """Check the configuration of Nginx for errors.
 
+        The check is skipped if the exact same configuration files already
+        passed it earlier in this run, e.g. for another lineage during
+        renewal.
+
         :raises .errors.MisconfigurationError: If config_test fails
 
         """
+        key = (self.conf('ctl'), self.nginx_conf)
+        digest = self._config_digest()
+        if digest is not None and _VALIDATED_CONFIGS.get(key) == digest:
+            logger.debug("Skipping nginx configuration test, the same "
+                         "configuration was already validated")
+            return
+
+        start = time.time()
         try:
             util.run_script([self.conf('ctl'), "-c", self.nginx_conf, "-t"])
         except errors.SubprocessError as err:
             raise errors.MisconfigurationError(str(err))
+        finally:
+            logger.debug("nginx configuration test took %.3f seconds",
+                         time.time() - start)
+
+        if digest is not None:
+            _VALIDATED_CONFIGS[key] = digest
+
+    def _config_digest(self):
+        """Computes a digest of the configuration files on disk.
+
+        Besides the parsed files, this covers the included files the
+        parser couldn't parse or didn't follow and the other files nginx
+        -t reads, like certificates, keys and DH parameters.
+
+        :returns: hex digest of the files, or None if the configuration
+            files couldn't be read
+        :rtype: str
+
+        """
+        if self.parser is None:
+            return None
+        try:
+            files = [(filename, crypto_util.sha256sum(filename))
+                     for filename in sorted(
+                         set(self.parser.parsed) | self.parser.unparsed)]
+        except IOError:
+            return None
+        for filename in sorted(self.parser.get_referenced_files()):
+            try:
+                digest = crypto_util.sha256sum(filename)
+            except IOError:
+                # nginx -t reports the missing file itself
+                digest = None
+            files.append((filename, digest))
+        return hashlib.sha256(repr(files).encode('utf-8')).hexdigest()
 
     def _verify_setup(self):
         """Verify the setup to ensure safe operating environment.
@@ -692,13 +763,15 @@ class NginxConfigurator(common.Plugin):
             checkpoint
 
         """
-        save_files = set(self.parser.parsed.keys())
+        # Only checkpoint the files that filedump will actually write
+        save_files = self.parser.get_dirty_files()
 
         try:  # TODO: make a common base for Apache and Nginx plugins
             # Create Checkpoint
             if temporary:
                 self.reverter.add_to_temp_checkpoint(
                     save_files, self.save_notes)
+                self._temp_save_files.update(save_files)
                 # how many comments does it take
             else:
                 self.reverter.add_to_checkpoint(save_files,
@@ -743,7 +816,11 @@ class NginxConfigurator(common.Plugin):
             self.reverter.revert_temporary_config()
         except errors.ReverterError as err:
             raise errors.PluginError(str(err))
-        self.parser.load()
+        # Only the challenge files changed on disk, so there's no need to
+        # parse the whole configuration again
+        self.parser.reload(
+            self._temp_save_files | self.parser.get_dirty_files())
+        self._temp_save_files = set()
 
     def rollback_checkpoints(self, rollback=1):
         """Rollback saved checkpoints.
@@ -74,7 +74,7 @@ class RawNginxDumper(object):
             if isinstance(b0, str):
                 yield b0
                 continue
-            item = copy.deepcopy(b0)
+            item = list(b0) # popped from below, but the sublists aren't modified
             if spacey(item[0]):
                 yield item.pop(0) # indentation
                 if not item:
@@ -108,7 +108,9 @@ def loads(source):
     :rtype: list
 
     """
-    return UnspacedList(RawNginxParser(source).as_list())
+    tree = UnspacedList(RawNginxParser(source).as_list())
+    _record_spans(tree, source, 0)
+    return tree
 
 
 def load(_file):
@@ -125,12 +127,15 @@ def load(_file):
 def dumps(blocks):
     """Dump to a string.
 
+    Subtrees that haven't been modified since they were loaded are copied
+    verbatim from the source text instead of being serialised again.
+
     :param UnspacedList block: The parsed tree
     :param int indentation: The number of spaces to indent
     :rtype: str
 
     """
-    return str(RawNginxDumper(blocks.spaced))
+    return ''.join(_iter_spliced(blocks))
 
 
 def dump(blocks, _file):
@@ -145,19 +150,133 @@ def dump(blocks, _file):
     return _file.write(dumps(blocks))
 
 
+def _children_by_spaced(entries):
+    """Map the ids of spaced sublists of entries to their UnspacedLists"""
+    return dict((id(child.spaced), child) for child in entries
+                if isinstance(child, UnspacedList))
+
+
+def _is_block(spaced_item):
+    """Is the spaced item a block, i.e. a [head, body] pair?"""
+    return len(spaced_item) == 2 and isinstance(spaced_item[0], list)
+
+
+def _iter_spliced(entries):
+    """Iterates the dumped content of an UnspacedList of entries.
+
+    This yields the same text as :class:`RawNginxDumper`, but clean
+    subtrees with a recorded span are copied from their source and only
+    modified blocks are serialised again.
+
+    """
+    text = entries.source_text()
+    if text is not None:
+        yield text
+        return
+    children = _children_by_spaced(entries)
+    for b0 in entries.spaced:
+        child = children.get(id(b0)) if isinstance(b0, list) else None
+        text = child.source_text() if child is not None else None
+        if text is not None:
+            yield text
+        elif child is not None and _is_block(b0):
+            body = _children_by_spaced(child).get(id(b0[1]))
+            yield "".join(b0[0]) + '{'
+            if body is not None:
+                for line in _iter_spliced(body):
+                    yield line
+            else:
+                for line in RawNginxDumper(b0[1]):
+                    yield line
+            yield '}'
+        else:
+            for line in RawNginxDumper([b0]):
+                yield line
+
+
+def _match_source(source, pos, text):
+    """Returns the position after text if source contains it at pos, else None"""
+    if source.startswith(text, pos):
+        return pos + len(text)
+    return None
+
+
+def _record_spans(entries, source, pos):
+    """Record the source span of entries and of each of its subtrees.
+
+    Spans are only recorded for subtrees whose dumped text is identical to
+    the source text they were parsed from, so that splicing the source in
+    never changes the output of :func:`dumps`.
+
+    :param UnspacedList entries: a freshly parsed list of entries
+    :param str source: the text entries was parsed from
+    :param int pos: offset of entries in source
+    :returns: offset of the end of entries in source, or None if the
+        dumped entries would differ from the source
+    :rtype: int
+
+    """
+    start = pos
+    children = _children_by_spaced(entries)
+    for b0 in entries.spaced:
+        if not isinstance(b0, list):
+            pos = _match_source(source, pos, b0)
+        else:
+            child = children.get(id(b0))
+            if child is None:
+                return None
+            child_start = pos
+            if _is_block(b0):
+                body = _children_by_spaced(child).get(id(b0[1]))
+                if body is None:
+                    return None
+                pos = _match_source(source, pos, "".join(b0[0]) + '{')
+                if pos is not None:
+                    pos = _record_spans(body, source, pos)
+                if pos is not None:
+                    pos = _match_source(source, pos, '}')
+            else:
+                pos = _match_source(source, pos, "".join(RawNginxDumper([b0])))
+            if pos is None:
+                return None
+            child.span = (source, child_start, pos)
+        if pos is None:
+            return None
+    entries.span = (source, start, pos)
+    return pos
+
+
 spacey = lambda x: (isinstance(x, str) and x.isspace()) or x == ''
 
 class UnspacedList(list):
-    """Wrap a list [of lists], making any whitespace entries magically invisible"""
+    """Wrap a list [of lists], making any whitespace entries magically invisible
+
+    :ivar list spaced: the list including its whitespace entries
+    :ivar bool dirty: whether this list was modified after being created
+    :ivar tuple span: ``(source, start, end)`` locating this list in the
+        text it was loaded from, or None
+
+    """
+    # Parsed trees contain one of these per directive, so avoid a __dict__
+    __slots__ = ('spaced', 'dirty', 'span')
 
     def __init__(self, list_source):
-        # ensure our argument is not a generator, and duplicate any sublists
-        self.spaced = copy.deepcopy(list(list_source))
+        # ensure our argument is not a generator. Sublists are duplicated
+        # below, and strings are immutable, so a shallow copy suffices
+        source = list(list_source)
+        self.spaced = source[:]
         self.dirty = False
+        self.span = None
+
+        # whitespace after the start of a comment is part of the comment
+        try:
+            comment_start = source.index("#")
+        except ValueError:
+            comment_start = len(source)
 
         # Turn self into a version of the source list that has spaces removed
         # and all sub-lists also UnspacedList()ed
-        list.__init__(self, list_source)
+        list.__init__(self, source)
         for i, entry in reversed(list(enumerate(self))):
             if isinstance(entry, list):
                 sublist = UnspacedList(entry)
@@ -165,7 +284,7 @@ class UnspacedList(list):
                 self.spaced[i] = sublist.spaced
             elif spacey(entry):
                 # don't delete comments
-                if "#" not in self[:i]:
+                if i <= comment_start:
                     list.__delitem__(self, i)
 
     def _coerce(self, inbound):
@@ -246,6 +365,29 @@ class UnspacedList(list):
             return True
         return any((isinstance(x, list) and x.is_dirty() for x in self))
 
+    def mark_clean(self):
+        """Recursively reset the dirty flag, e.g. after the tree was written"""
+        if not self.is_dirty():
+            return
+        # The source text of a modified list is stale
+        self.span = None
+        self.dirty = False
+        for x in self:
+            if isinstance(x, UnspacedList):
+                x.mark_clean()
+
+    def source_text(self):
+        """The text this list was loaded from, if it hasn't been modified since
+
+        :returns: source text or None
+        :rtype: str
+
+        """
+        if self.span is None or self.is_dirty():
+            return None
+        source, start, end = self.span
+        return source[start:end]
+
     def _spaced_position(self, idx):
         "Convert from indexes in the unspaced list to positions in the spaced one"
         pos = spaces = 0
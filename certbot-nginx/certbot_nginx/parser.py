@@ -1,11 +1,12 @@
 """NginxParser is a member object of the NginxConfigurator class."""
-import copy
 import glob
 import logging
 import os
 import pyparsing
 import re
 
+import six
+
 from certbot import errors
 
 from certbot_nginx import obj
@@ -14,6 +15,13 @@ from certbot_nginx import nginxparser
 
 logger = logging.getLogger(__name__)
 
+# Directives naming a file nginx reads when loading the configuration
+FILE_DIRECTIVES = (
+    'include', 'load_module', 'ssl_certificate', 'ssl_certificate_key',
+    'ssl_client_certificate', 'ssl_crl', 'ssl_dhparam', 'ssl_password_file',
+    'ssl_session_ticket_key', 'ssl_stapling_file', 'ssl_trusted_certificate',
+)
+
 
 class NginxParser(object):
     """Class handles the fine details of parsing the Nginx Configuration.
@@ -21,11 +29,13 @@ class NginxParser(object):
     :ivar str root: Normalized absolute path to the server root
         directory. Without trailing slash.
     :ivar dict parsed: Mapping of file paths to parsed trees
+    :ivar set unparsed: Paths of included files that couldn't be parsed
 
     """
 
     def __init__(self, root):
         self.parsed = {}
+        self.unparsed = set()
         self.root = os.path.abspath(root)
         self.config_root = self._find_config_root()
 
@@ -39,18 +49,36 @@ class NginxParser(object):
 
         """
         self.parsed = {}
+        self.unparsed = set()
         self._parse_recursively(self.config_root)
 
-    def _parse_recursively(self, filepath):
+    def reload(self, filepaths):
+        """Parses the given files again, e.g. after they were reverted.
+
+        Unlike :meth:`load`, this keeps the trees of all other files.
+
+        :param set filepaths: Paths of parsed files that changed on disk
+
+        """
+        for filepath in filepaths:
+            if not os.path.isfile(filepath):
+                self.parsed.pop(filepath, None)
+                self.unparsed.discard(filepath)
+            elif filepath in self.parsed:
+                self._parse_recursively(filepath, override=True)
+
+    def _parse_recursively(self, filepath, override=False):
         """Parses nginx config files recursively by looking at 'include'
         directives inside 'http' and 'server' blocks. Note that this only
         reads Nginx files that potentially declare a virtual host.
 
         :param str filepath: The path to the files to parse, as a glob
+        :param bool override: Whether to parse filepath again if it has
+            already been parsed. Included files are never parsed again.
 
         """
         filepath = self.abs_path(filepath)
-        trees = self._parse_files(filepath)
+        trees = self._parse_files(filepath, override)
         for tree in trees:
             for entry in tree:
                 if _is_include_directive(entry):
@@ -170,7 +198,11 @@ class NginxParser(object):
         :rtype: list
 
         """
-        result = copy.deepcopy(block)  # Copy the list to keep self.parsed idempotent
+        # Copy the list to keep self.parsed idempotent. The entries are
+        # shared with self.parsed rather than deep copied, so the result
+        # must not be modified in place.
+        result = nginxparser.UnspacedList([])
+        result.extend(block)
         for directive in block:
             if _is_include_directive(directive):
                 included_files = glob.glob(
@@ -202,11 +234,13 @@ class NginxParser(object):
                 with open(item) as _file:
                     parsed = nginxparser.load(_file)
                     self.parsed[item] = parsed
+                    self.unparsed.discard(item)
                     trees.append(parsed)
             except IOError:
                 logger.warning("Could not open file: %s", item)
             except pyparsing.ParseException as err:
                 logger.debug("Could not parse file: %s due to %s", item, err)
+                self.unparsed.add(item)
         return trees
 
     def _find_config_root(self):
@@ -240,10 +274,49 @@ class NginxParser(object):
                 logger.debug('Writing nginx conf tree to %s:\n%s', filename, out)
                 with open(filename, 'w') as _file:
                     _file.write(out)
+                if not ext:
+                    # The file on disk now matches the tree
+                    tree.mark_clean()
 
             except IOError:
                 logger.error("Could not open file for writing: %s", filename)
 
+    def get_dirty_files(self):
+        """Returns the parsed files that have been modified.
+
+        These are exactly the files a lazy :meth:`filedump` will write.
+
+        :returns: file paths whose parsed trees are dirty
+        :rtype: set
+
+        """
+        return set(filename for filename, tree in six.iteritems(self.parsed)
+                   if tree.is_dirty())
+
+    def get_referenced_files(self):
+        """Returns the other files nginx reads along with the parsed files.
+
+        These are the files named by directives in FILE_DIRECTIVES, such
+        as certificates and keys, and included files that weren't parsed,
+        e.g. because they are included in a context the parser doesn't
+        follow.
+
+        :returns: absolute paths of the files
+        :rtype: set
+
+        """
+        paths = set()
+        def add_path(entry, _):
+            """Adds the files named by a FILE_DIRECTIVES entry."""
+            path = self.abs_path(entry[1])
+            if entry[0] == 'include':
+                paths.update(glob.glob(path))
+            else:
+                paths.add(path)
+        for tree in six.itervalues(self.parsed):
+            _do_for_subarray(tree, _is_file_directive, add_path)
+        return paths.difference(self.parsed, self.unparsed)
+
     def parse_server(self, server):
         """Parses a list of server directives, accounting for global address sslishness.
 
@@ -458,6 +531,18 @@ def _is_ssl_on_directive(entry):
             len(entry) == 2 and entry[0] == 'ssl' and
             entry[1] == 'on')
 
+def _is_file_directive(entry):
+    """Checks if an nginx parsed entry names a file nginx reads.
+
+    :param list entry: the parsed entry
+    :returns: Whether it's a directive in FILE_DIRECTIVES
+    :rtype: bool
+
+    """
+    return (isinstance(entry, list) and
+            len(entry) == 2 and entry[0] in FILE_DIRECTIVES and
+            isinstance(entry[1], str))
+
 def _add_directives(block, directives, replace):
     """Adds or replaces directives in a config block.
 
@@ -518,6 +603,7 @@ def _comment_out_directive(block, location, include_location):
         insert_location = 1
     new_dir[0].spaced.insert(insert_location, "# ") # comment out the line
     new_dir[0].spaced.append(";") # directly add in the ;, because now dumping won't work properly
+    new_dir[0].dirty = True # the spaced list was modified behind UnspacedList's back
     dumped = nginxparser.dumps(new_dir)
     new_dir = nginxparser.loads(dumped) # reload into an UnspacedList
 
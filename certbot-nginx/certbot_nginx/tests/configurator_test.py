@@ -127,6 +127,23 @@ class NginxConfiguratorTest(util.NginxTest):
                             ['#', parser.COMMENT]]]],
                          parsed[0])
 
+    @mock.patch("certbot.reverter.Reverter.add_to_checkpoint")
+    def test_save_checkpoints_dirty_files_only(self, mock_add_to_checkpoint):
+        filep = self.config.parser.abs_path('sites-enabled/example.com')
+        mock_vhost = obj.VirtualHost(filep,
+                                     None, None, None,
+                                     set(['.example.com', 'example.*']),
+                                     None, [0])
+        self.config.parser.add_server_directives(
+            mock_vhost,
+            [['listen', ' ', '5001', ' ', 'ssl']],
+            replace=False)
+        self.config.save()
+        self.assertEqual(set([filep]), mock_add_to_checkpoint.call_args[0][0])
+
+        self.config.save()
+        self.assertEqual(set(), mock_add_to_checkpoint.call_args[0][0])
+
     def test_choose_vhost(self):
         localhost_conf = set(['localhost', r'~^(www\.)?(example|bar)\.'])
         server_conf = set(['somename', 'another.alias', 'alias'])
@@ -385,6 +402,71 @@ class NginxConfiguratorTest(util.NginxTest):
     def test_config_test(self, _):
         self.config.config_test()
 
+    @mock.patch("certbot.util.run_script")
+    def test_config_test_skips_validated_config(self, mock_run_script):
+        self.config.config_test()
+        self.config.config_test()
+        self.assertEqual(1, mock_run_script.call_count)
+
+        with open(self.config.parser.abs_path('server.conf'), 'a') as f:
+            f.write('\n')
+        self.config.config_test()
+        self.assertEqual(2, mock_run_script.call_count)
+
+    @mock.patch("certbot.util.run_script")
+    def test_config_test_checks_ssl_files(self, mock_run_script):
+        cert = self.config.parser.abs_path('snakeoil.cert')
+        with open(cert, 'w') as f:
+            f.write('cert')
+        self.config.config_test()
+        self.config.config_test()
+        self.assertEqual(1, mock_run_script.call_count)
+
+        with open(cert, 'w') as f:
+            f.write('renewed cert')
+        self.config.config_test()
+        self.assertEqual(2, mock_run_script.call_count)
+
+    @mock.patch("certbot.util.run_script")
+    def test_config_test_checks_unfollowed_includes(self, mock_run_script):
+        location = self.config.parser.abs_path('location.conf')
+        with open(location, 'w') as f:
+            f.write('ssl_trusted_certificate chain.pem;\n')
+        with open(self.config.parser.abs_path(
+                'sites-enabled/example.com'), 'w') as f:
+            f.write('server { location / { include location.conf; } }\n')
+        self.config.parser.load()
+        self.config.config_test()
+        self.config.config_test()
+        self.assertEqual(1, mock_run_script.call_count)
+
+        with open(location, 'a') as f:
+            f.write('ssl_stapling on;\n')
+        self.config.config_test()
+        self.assertEqual(2, mock_run_script.call_count)
+
+    @mock.patch("certbot.util.run_script")
+    def test_config_test_checks_unparsed_files(self, mock_run_script):
+        broken = self.config.parser.abs_path('sites-enabled/broken')
+        with open(broken, 'w') as f:
+            f.write('server {\n')
+        self.config.parser.load()
+        self.config.config_test()
+        self.config.config_test()
+        self.assertEqual(1, mock_run_script.call_count)
+
+        with open(broken, 'a') as f:
+            f.write('}\n')
+        self.config.config_test()
+        self.assertEqual(2, mock_run_script.call_count)
+
+    @mock.patch("certbot.util.run_script")
+    def test_config_test_unreadable_config(self, mock_run_script):
+        os.remove(self.config.parser.abs_path('server.conf'))
+        self.config.config_test()
+        self.config.config_test()
+        self.assertEqual(2, mock_run_script.call_count)
+
     @mock.patch("certbot.reverter.Reverter.recovery_routine")
     def test_recovery_routine_throws_error_from_reverter(self, mock_recovery_routine):
         mock_recovery_routine.side_effect = errors.ReverterError("foo")
@@ -405,6 +487,27 @@ class NginxConfiguratorTest(util.NginxTest):
         mock_revert_temporary_config.side_effect = errors.ReverterError("foo")
         self.assertRaises(errors.PluginError, self.config.revert_challenge_config)
 
+    @mock.patch("certbot_nginx.parser.NginxParser.load")
+    def test_revert_challenge_config_reloads_saved_files(self, mock_load):
+        filep = self.config.parser.abs_path('sites-enabled/example.com')
+        original = util.filter_comments(self.config.parser.parsed[filep])
+        mock_vhost = obj.VirtualHost(filep,
+                                     None, None, None,
+                                     set(['.example.com', 'example.*']),
+                                     None, [0])
+        self.config.parser.add_server_directives(
+            mock_vhost,
+            [['listen', ' ', '5001', ' ', 'ssl']],
+            replace=False)
+        self.config.save(temporary=True)
+
+        self.config.revert_challenge_config()
+
+        self.assertFalse(mock_load.called)
+        self.assertEqual(original,
+                         util.filter_comments(self.config.parser.parsed[filep]))
+        self.assertEqual(set(), self.config.parser.get_dirty_files())
+
     @mock.patch("certbot.reverter.Reverter.add_to_checkpoint")
     def test_save_throws_error_from_reverter(self, mock_add_to_checkpoint):
         mock_add_to_checkpoint.side_effect = errors.ReverterError("foo")
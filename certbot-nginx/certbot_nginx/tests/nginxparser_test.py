@@ -7,7 +7,7 @@ import unittest
 from pyparsing import ParseException
 
 from certbot_nginx.nginxparser import (
-    RawNginxParser, loads, load, dumps, dump, UnspacedList)
+    RawNginxParser, RawNginxDumper, loads, load, dumps, dump, UnspacedList)
 from certbot_nginx.tests import util
 
 
@@ -64,6 +64,33 @@ class TestRawNginxParser(unittest.TestCase):
                          '        types {\n'
                          '            image/jpeg jpg;}}}'.split('\n'))
 
+    def test_dump_splices_unmodified_blocks(self):
+        source = ('user www-data;\n'
+                  'server {\n'
+                  '    listen 80;\n'
+                  '    location /  {  root /srv ;}\n'
+                  '}\n'
+                  'server { listen 81; }\n')
+        parsed = loads(source)
+        self.assertEqual(dumps(parsed), source)
+        self.assertEqual(parsed[2].source_text(), '\nserver { listen 81; }')
+
+        parsed[1][1].append(['\n    ', 'server_name', ' ', 'foo.com'])
+        self.assertEqual(parsed.source_text(), None)
+        self.assertEqual(parsed[1].source_text(), None)
+        self.assertEqual(parsed[1][1][1].source_text(),
+                         '\n    location /  {  root /srv ;}')
+        dumped = dumps(parsed)
+        self.assertEqual(dumped, str(RawNginxDumper(parsed.spaced)))
+        self.assertEqual(dumped, source.replace(
+            ';}\n}', ';}\n\n    server_name foo.com;}'))
+
+    def test_dump_without_spans(self):
+        parsed = loads('server { listen 80; }\n')
+        parsed.span = None
+        parsed[0].span = None
+        self.assertEqual(dumps(parsed), 'server { listen 80; }\n')
+
     def test_parse_from_file(self):
         with open(util.get_data_filename('foo.conf')) as handle:
             parsed = util.filter_comments(load(handle))
@@ -364,6 +391,14 @@ class TestUnspacedList(unittest.TestCase):
         self.assertEqual(self.ul, ["things", "quirk"])
         self.assertEqual(self.ul2, ["y"])
 
+    def test_construction_copies_sublists(self):
+        source = [['\n', 'a', ' ', 'b'], ' ', ['#', ' c ']]
+        ul = UnspacedList(source)
+        source[0].append('c')
+        source.append('d')
+        self.assertEqual(ul, [['a', 'b'], ['#', ' c ']])
+        self.assertEqual(ul.spaced, [['\n', 'a', ' ', 'b'], ' ', ['#', ' c ']])
+
     def test_append(self):
         ul3 = copy.deepcopy(self.ul)
         ul3.append("wise")
@@ -437,6 +472,22 @@ class TestUnspacedList(unittest.TestCase):
         ul4[1][2] = 5
         self.assertEqual(True, ul4.is_dirty())
 
+    def test_mark_clean(self):
+        ul4 = UnspacedList([[1], [2, 3, 4]])
+        ul4[1][2] = 5
+        ul4.append([6])
+        ul4.mark_clean()
+        self.assertEqual(False, ul4.is_dirty())
+
+    def test_mark_clean_drops_stale_spans(self):
+        ul = loads('a b;\nserver { listen 80; }')
+        ul[1][1].append(['listen', ' ', '81'])
+        ul.mark_clean()
+        self.assertEqual(None, ul.source_text())
+        self.assertEqual(None, ul[1].source_text())
+        self.assertEqual('a b;', ul[0].source_text())
+        self.assertEqual(dumps(ul), 'a b;\nserver { listen 80; listen 81;}')
+
 
 if __name__ == '__main__':
     unittest.main()  # pragma: no cover
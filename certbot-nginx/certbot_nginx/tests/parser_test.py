@@ -61,6 +61,55 @@ class NginxParserTest(util.NginxTest): #pylint: disable=too-many-public-methods
                          nparser.parsed[nparser.abs_path(
                              'sites-enabled/example.com')])
 
+    def test_reload(self):
+        nparser = parser.NginxParser(self.config_path)
+        example = nparser.abs_path('sites-enabled/example.com')
+        sslon = nparser.abs_path('sites-enabled/sslon.com')
+        default = nparser.abs_path('sites-enabled/default')
+        sslon_tree = nparser.parsed[sslon]
+        with open(example, 'w') as f:
+            f.write('server { server_name reloaded.example.com; }\n')
+        os.remove(default)
+
+        nparser.reload(set([example, default]))
+
+        self.assertEqual([[['server'], [['server_name', 'reloaded.example.com']]]],
+                         nparser.parsed[example])
+        self.assertTrue(nparser.parsed[sslon] is sslon_tree)
+        self.assertFalse(default in nparser.parsed)
+
+    def test_load_unparsed(self):
+        broken = os.path.join(self.config_path, 'sites-enabled', 'broken')
+        with open(broken, 'w') as f:
+            f.write('server {\n')
+        nparser = parser.NginxParser(self.config_path)
+        self.assertTrue(broken in nparser.unparsed)
+        self.assertFalse(broken in nparser.parsed)
+
+        os.remove(broken)
+        nparser.reload(set([broken]))
+        self.assertFalse(broken in nparser.unparsed)
+
+    def test_get_referenced_files(self):
+        nparser = parser.NginxParser(self.config_path)
+        self.assertEqual(set(nparser.abs_path(x) for x in
+                             ['cert.pem', 'cert.key',
+                              'snakeoil.cert', 'snakeoil.key']),
+                         nparser.get_referenced_files())
+
+        location = nparser.abs_path('location.conf')
+        with open(location, 'w') as f:
+            f.write('ssl_dhparam dhparam.pem;\n')
+        with open(nparser.abs_path('sites-enabled/example.com'), 'w') as f:
+            f.write('server {\n'
+                    '  ssl_trusted_certificate chain.pem;\n'
+                    '  location / { include location.conf; }\n'
+                    '}\n')
+        nparser.load()
+        referenced = nparser.get_referenced_files()
+        self.assertTrue(nparser.abs_path('chain.pem') in referenced)
+        self.assertTrue(location in referenced)
+
     def test_abs_path(self):
         nparser = parser.NginxParser(self.config_path)
         self.assertEqual('/etc/nginx/*', nparser.abs_path('/etc/nginx/*'))
@@ -82,6 +131,22 @@ class NginxParserTest(util.NginxTest): #pylint: disable=too-many-public-methods
                                         ['server_name', 'example.*']]]],
                          parsed[0])
 
+    def test_filedump_marks_clean(self):
+        nparser = parser.NginxParser(self.config_path)
+        filep = nparser.abs_path('sites-enabled/example.com')
+        nparser.parsed[filep][0][1].append(['listen', ' ', '5001'])
+        nparser.filedump('test')
+        self.assertEqual(set([filep]), nparser.get_dirty_files())
+        nparser.filedump(ext='')
+        self.assertEqual(set(), nparser.get_dirty_files())
+
+    def test_get_dirty_files(self):
+        nparser = parser.NginxParser(self.config_path)
+        self.assertEqual(set(), nparser.get_dirty_files())
+        filep = nparser.abs_path('sites-enabled/example.com')
+        nparser.parsed[filep][0][1].append(['listen', ' ', '5001'])
+        self.assertEqual(set([filep]), nparser.get_dirty_files())
+
     def test__do_for_subarray(self):
         # pylint: disable=protected-access
         mylists = [([[2], [3], [2]], [[0], [2]]),
@@ -121,6 +121,20 @@ class TlsSniPerformTest(util.NginxTest):
         for i in six.moves.range(4):
             self.assertEqual(sni_responses[i], acme_responses[i])
 
+    @mock.patch("certbot_nginx.configurator.NginxConfigurator.save")
+    def test_perform_collects_vhosts_once(self, unused_mock_save):
+        self.sni.add_chall(self.achalls[0])
+        self.sni.add_chall(self.achalls[3])
+        self.sni._setup_challenge_cert = mock.MagicMock()  # pylint: disable=protected-access
+
+        nparser = self.sni.configurator.parser
+        with mock.patch.object(nparser, "get_vhosts",
+                               wraps=nparser.get_vhosts) as mock_get_vhosts:
+            self.sni.perform()
+
+        # sslon.com is already ssl, www.example.com has to be made ssl
+        self.assertEqual(2, mock_get_vhosts.call_count)
+
     def test_mod_config(self):
         self.sni.add_chall(self.achalls[0])
         self.sni.add_chall(self.achalls[2])
@@ -63,6 +63,9 @@ def get_nginx_configurator(
                     backup_dir=backups,
                     temp_checkpoint_dir=os.path.join(work_dir, "temp_checkpoints"),
                     in_progress_dir=os.path.join(backups, "IN_PROGRESS"),
+                    checkpoint_store=False,
+                    keep_checkpoints=None,
+                    checkpoint_max_age=None,
                     server="https://acme-server.org:443/new",
                     tls_sni_01_port=5001,
                 ),
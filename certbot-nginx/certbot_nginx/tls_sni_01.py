@@ -51,8 +51,10 @@ class NginxTlsSni01(common.TLSSNI01):
         default_addr = "{0} ssl".format(
             self.configurator.config.tls_sni_01_port)
 
+        # Collect the server blocks once for all of the challenges
+        vhosts = self.configurator.parser.get_vhosts()
         for achall in self.achalls:
-            vhost = self.configurator.choose_vhost(achall.domain)
+            vhost = self.configurator.choose_vhost(achall.domain, vhosts)
             if vhost is None:
                 logger.error(
                     "No nginx vhost exists with server_name matching: %s. "
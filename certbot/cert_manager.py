@@ -1,11 +1,16 @@
 """Tools for managing certificates."""
+import collections
 import datetime
+import itertools
 import logging
+import multiprocessing
 import os
 import pytz
 import traceback
 import zope.component
 
+from multiprocessing.pool import ThreadPool
+
 from certbot import crypto_util
 from certbot import errors
 from certbot import interfaces
@@ -17,6 +22,12 @@ from certbot.display import util as display_util
 
 logger = logging.getLogger(__name__)
 
+# Number of revocation checks the certificates report runs at once
+OCSP_WORKERS = 10
+# Seconds to wait for each revocation check before reporting the cert
+# without it
+OCSP_CHECK_TIMEOUT = 2 * ocsp.OCSP_TIMEOUT
+
 ###################
 # Commands
 ###################
@@ -33,7 +44,7 @@ def update_live_symlinks(config):
     :type config: :class:`certbot.configuration.NamespaceConfig`
 
     """
-    for renewal_file in storage.renewal_conf_files(config):
+    for renewal_file in storage.iter_renewal_conf_files(config):
         storage.RenewableCert(renewal_file, config, update_symlinks=True)
 
 def rename_lineage(config):
@@ -69,18 +80,8 @@ def certificates(config):
     :param config: Configuration.
     :type config: :class:`certbot.configuration.NamespaceConfig`
     """
-    parsed_certs = []
     parse_failures = []
-    for renewal_file in storage.renewal_conf_files(config):
-        try:
-            renewal_candidate = storage.RenewableCert(renewal_file, config)
-            crypto_util.verify_renewable_cert(renewal_candidate)
-            parsed_certs.append(renewal_candidate)
-        except Exception as e:  # pylint: disable=broad-except
-            logger.warning("Renewal configuration file %s produced an "
-                           "unexpected error: %s. Skipping.", renewal_file, e)
-            logger.debug("Traceback was:\n%s", traceback.format_exc())
-            parse_failures.append(renewal_file)
+    parsed_certs = _iter_parsed_certs(config, parse_failures)
 
     # Describe all the certs
     _describe_certs(config, parsed_certs, parse_failures)
@@ -164,66 +165,144 @@ def _get_certname(config, verb):
         certname = choices[index]
     return certname
 
+def _iter_parsed_certs(config, parse_failures):
+    """Parse and verify lineages one at a time as they are consumed.
+
+    Lineages excluded by --cert-name are skipped without being parsed.
+    Renewal configuration files that can't be used are appended to
+    parse_failures.
+
+    """
+    for renewal_file in storage.iter_renewal_conf_files(config):
+        if (config.certname and
+                storage.lineagename_for_filename(renewal_file) != config.certname):
+            continue
+        try:
+            renewal_candidate = storage.RenewableCert(renewal_file, config)
+            crypto_util.verify_renewable_cert(renewal_candidate)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Renewal configuration file %s produced an "
+                           "unexpected error: %s. Skipping.", renewal_file, e)
+            logger.debug("Traceback was:\n%s", traceback.format_exc())
+            parse_failures.append(renewal_file)
+        else:
+            yield renewal_candidate
+
 def _report_lines(msgs):
     """Format a results report for a category of single-line renewal outcomes"""
     return "  " + "\n  ".join(str(msg) for msg in msgs)
 
 def _report_human_readable(config, parsed_certs):
-    """Format a results report for a parsed cert"""
+    """Format a results report for a parsed cert
+
+    Revocation is checked for several certs at once, keeping a bounded
+    number of checks in flight so the report is still made in order.
+
+    """
     certinfo = []
-    checker = ocsp.RevocationChecker()
-    for cert in parsed_certs:
-        if config.certname and cert.lineagename != config.certname:
-            continue
-        if config.domains and not set(config.domains).issubset(cert.names()):
-            continue
-        now = pytz.UTC.fromutc(datetime.datetime.utcnow())
-
-        reasons = []
-        if cert.is_test_cert:
-            reasons.append('TEST_CERT')
-        if cert.target_expiry <= now:
-            reasons.append('EXPIRED')
-        if checker.ocsp_revoked(cert.cert, cert.chain):
-            reasons.append('REVOKED')
-
-        if reasons:
-            status = "INVALID: " + ", ".join(reasons)
-        else:
-            diff = cert.target_expiry - now
-            if diff.days == 1:
-                status = "VALID: 1 day"
-            elif diff.days < 1:
-                status = "VALID: {0} hour(s)".format(diff.seconds // 3600)
-            else:
-                status = "VALID: {0} days".format(diff.days)
-
-        valid_string = "{0} ({1})".format(cert.target_expiry, status)
-        certinfo.append("  Certificate Name: {0}\n"
-                        "    Domains: {1}\n"
-                        "    Expiry Date: {2}\n"
-                        "    Certificate Path: {3}\n"
-                        "    Private Key Path: {4}".format(
-                            cert.lineagename,
-                            ",".join(cert.names()),
-                            valid_string,
-                            cert.fullchain,
-                            cert.privkey))
+    checker = ocsp.RevocationChecker(cache_dir=config.ocsp_cache_dir)
+    pool = ThreadPool(OCSP_WORKERS)
+    try:
+        checks = collections.deque()
+        for cert in parsed_certs:
+            if config.certname and cert.lineagename != config.certname:
+                continue
+            if config.domains and not set(config.domains).issubset(cert.names()):
+                continue
+            checks.append((cert, pool.apply_async(
+                checker.ocsp_revoked, (cert.cert, cert.chain))))
+            if len(checks) > 2 * OCSP_WORKERS:
+                certinfo.append(_report_cert(*checks.popleft()))
+        while checks:
+            certinfo.append(_report_cert(*checks.popleft()))
+    finally:
+        pool.terminate()
     return "\n".join(certinfo)
 
+def _report_cert(cert, revocation):
+    """Format the report for a cert once its revocation check is done
+
+    The OCSP_CHECK_TIMEOUT is measured from when this waits for the
+    result, not from when the check was queued, so a check still queued
+    behind slow ones may time out without having run at all.
+
+    :param cert: the cert to describe
+    :type cert: :class:`certbot.storage.RenewableCert`
+    :param revocation: result of the cert's OCSP check, the cert's
+        status is reported as unknown if it times out
+    :type revocation: :class:`multiprocessing.pool.AsyncResult`
+
+    """
+    timed_out = False
+    try:
+        revoked = revocation.get(OCSP_CHECK_TIMEOUT)
+    except multiprocessing.TimeoutError:
+        logger.info("OCSP check for %s timed out, reporting its "
+                    "revocation status as unknown", cert.cert)
+        revoked = False
+        timed_out = True
+    now = pytz.UTC.fromutc(datetime.datetime.utcnow())
+
+    reasons = []
+    if cert.is_test_cert:
+        reasons.append('TEST_CERT')
+    if cert.target_expiry <= now:
+        reasons.append('EXPIRED')
+    if revoked:
+        reasons.append('REVOKED')
+
+    if reasons:
+        status = "INVALID: " + ", ".join(reasons)
+    else:
+        diff = cert.target_expiry - now
+        if diff.days == 1:
+            status = "1 day"
+        elif diff.days < 1:
+            status = "{0} hour(s)".format(diff.seconds // 3600)
+        else:
+            status = "{0} days".format(diff.days)
+        if timed_out:
+            status = "UNKNOWN: {0}, OCSP check timed out".format(status)
+        else:
+            status = "VALID: " + status
+
+    valid_string = "{0} ({1})".format(cert.target_expiry, status)
+    return ("  Certificate Name: {0}\n"
+            "    Domains: {1}\n"
+            "    Expiry Date: {2}\n"
+            "    Certificate Path: {3}\n"
+            "    Private Key Path: {4}".format(
+                cert.lineagename,
+                ",".join(cert.names()),
+                valid_string,
+                cert.fullchain,
+                cert.privkey))
+
 def _describe_certs(config, parsed_certs, parse_failures):
-    """Print information about the certs we know about"""
+    """Print information about the certs we know about
+
+    parsed_certs may be an iterator which adds to parse_failures as it
+    is consumed, so each lineage is only held while it's described.
+
+    """
     out = []
 
     notify = out.append
 
-    if not parsed_certs and not parse_failures:
+    parsed_certs = iter(parsed_certs)
+    first_cert = next(parsed_certs, None)
+    report = None
+    if first_cert is not None:
+        report = _report_human_readable(
+            config, itertools.chain([first_cert], parsed_certs))
+
+    if report is None and not parse_failures:
         notify("No certs found.")
     else:
-        if parsed_certs:
+        if report is not None:
             match = "matching " if config.certname or config.domains else ""
             notify("Found the following {0}certs:".format(match))
-            notify(_report_human_readable(config, parsed_certs))
+            notify(report)
         if parse_failures:
             notify("\nThe following renewal configuration files "
                "were invalid:")
@@ -243,7 +322,7 @@ def _search_lineages(cli_config, func, initial_rv):
     util.make_or_verify_dir(configs_dir, mode=0o755, uid=os.geteuid())
 
     rv = initial_rv
-    for renewal_file in storage.renewal_conf_files(cli_config):
+    for renewal_file in storage.iter_renewal_conf_files(cli_config):
         try:
             candidate_lineage = storage.RenewableCert(renewal_file, cli_config)
         except (errors.CertStorageError, IOError):
@@ -940,6 +940,13 @@ def prepare_and_parse_args(plugins, args, detect_defaults=False):  # pylint: dis
         "automation", "--version", action="version",
         version="%(prog)s {0}".format(certbot.__version__),
         help="show program's version number and exit")
+    helpful.add(
+        "renew", "--renew-revoked", action="store_true",
+        default=flag_default("renew_revoked"),
+        help="Also renew certificates that are not yet due if OCSP says they "
+             "have been revoked. Uncached OCSP responses are fetched one "
+             "lineage at a time, which can slow down renew considerably if "
+             "a responder is unreachable.")
     helpful.add(
         ["automation", "renew"],
         "--force-renewal", "--renew-by-default",
@@ -1070,6 +1077,23 @@ def prepare_and_parse_args(plugins, args, detect_defaults=False):  # pylint: dis
         "security", "--strict-permissions", action="store_true",
         help="Require that all configuration files are owned by the current "
              "user; only needed if your config is somewhere unsafe like /tmp/")
+    helpful.add(
+        "paths", "--checkpoint-store", action="store_true",
+        default=flag_default("checkpoint_store"),
+        help="Keep a single copy of each distinct version of the files saved "
+             "in configuration checkpoints, hardlinking it into every "
+             "checkpoint that needs it instead of copying it again")
+    helpful.add(
+        "paths", "--keep-checkpoints", type=positive_int, metavar="N",
+        default=flag_default("keep_checkpoints"),
+        help="Only keep the N most recent configuration checkpoints; older "
+             "ones are removed and can no longer be rolled back (default: "
+             "keep all)")
+    helpful.add(
+        "paths", "--checkpoint-max-age", type=positive_int, metavar="DAYS",
+        default=flag_default("checkpoint_max_age"),
+        help="Remove configuration checkpoints older than DAYS days "
+             "(default: keep all)")
     helpful.add(
         ["manual", "standalone", "certonly", "renew"],
         "--preferred-challenges", dest="pref_challs",
@@ -1422,3 +1446,23 @@ def nonnegative_int(value):
     if int_value < 0:
         raise argparse.ArgumentTypeError("value must be non-negative")
     return int_value
+
+
+def positive_int(value):
+    """Converts value to an int and checks that it is positive.
+
+    This function should used as the type parameter for argparse
+    arguments.
+
+    :param str value: value provided on the command line
+
+    :returns: integer representation of value
+    :rtype: int
+
+    :raises argparse.ArgumentTypeError: if value isn't a positive integer
+
+    """
+    int_value = nonnegative_int(value)
+    if int_value == 0:
+        raise argparse.ArgumentTypeError("value must be positive")
+    return int_value
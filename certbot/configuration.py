@@ -25,6 +25,7 @@ class NamespaceConfig(object):
       - `csr_dir`
       - `in_progress_dir`
       - `key_dir`
+      - `ocsp_cache_dir`
       - `temp_checkpoint_dir`
 
     And the following paths are dynamically resolved using
@@ -72,6 +73,11 @@ class NamespaceConfig(object):
     def backup_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(self.namespace.work_dir, constants.BACKUP_DIR)
 
+    @property
+    def checkpoint_store_dir(self):  # pylint: disable=missing-docstring
+        return os.path.join(
+            self.namespace.work_dir, constants.CHECKPOINT_STORE_DIR)
+
     @property
     def csr_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(self.namespace.config_dir, constants.CSR_DIR)
@@ -84,6 +90,10 @@ class NamespaceConfig(object):
     def key_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(self.namespace.config_dir, constants.KEY_DIR)
 
+    @property
+    def ocsp_cache_dir(self):  # pylint: disable=missing-docstring
+        return os.path.join(self.namespace.work_dir, constants.OCSP_CACHE_DIR)
+
     @property
     def temp_checkpoint_dir(self):  # pylint: disable=missing-docstring
         return os.path.join(
@@ -34,6 +34,10 @@ CLI_DEFAULTS = dict(
     auth_cert_path="./cert.pem",
     auth_chain_path="./chain.pem",
     strict_permissions=False,
+    renew_revoked=False,
+    checkpoint_store=False,
+    keep_checkpoints=None,
+    checkpoint_max_age=None,
     debug_challenges=False,
 )
 STAGING_URI = "https://acme-staging.api.letsencrypt.org/directory"
@@ -88,6 +92,10 @@ ACCOUNTS_DIR = "accounts"
 BACKUP_DIR = "backups"
 """Directory (relative to `IConfig.work_dir`) where backups are kept."""
 
+CHECKPOINT_STORE_DIR = "checkpoint_store"
+"""Directory (relative to `IConfig.work_dir`) where the contents of
+checkpointed files are stored when `IConfig.checkpoint_store` is set."""
+
 CSR_DIR = "csr"
 """See `.IConfig.csr_dir`."""
 
@@ -101,6 +109,10 @@ KEY_DIR = "keys"
 LIVE_DIR = "live"
 """Live directory, relative to `IConfig.config_dir`."""
 
+OCSP_CACHE_DIR = "ocsp"
+"""Directory (relative to `IConfig.work_dir`) where OCSP responses are
+cached."""
+
 TEMP_CHECKPOINT_DIR = "temp_checkpoint"
 """Temporary checkpoint directory (relative to `IConfig.work_dir`)."""
 
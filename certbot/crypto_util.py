@@ -4,13 +4,15 @@
     is capable of handling the signatures.
 
 """
+import collections
+import datetime
 import hashlib
 import logging
 import os
 
 import OpenSSL
 import pyrfc3339
-import six
+import pytz
 import zope.component
 from cryptography.hazmat.backends import default_backend
 from cryptography import x509
@@ -22,6 +24,12 @@ from certbot import errors
 from certbot import interfaces
 from certbot import util
 
+try:
+    from collections import OrderedDict
+except ImportError:  # pragma: no cover
+    # OrderedDict was added in Python 2.7
+    from ordereddict import OrderedDict  # pylint: disable=import-error
+
 
 logger = logging.getLogger(__name__)
 
@@ -385,6 +393,59 @@ def dump_pyopenssl_chain(chain, filetype=OpenSSL.crypto.FILETYPE_PEM):
     return b"".join(_dump_cert(cert) for cert in chain)
 
 
+CertSummary = collections.namedtuple(
+    "CertSummary", "not_before not_after names serial issuer key_type")
+"""Details of a certificate file read by :func:`cert_summary`."""
+
+# Names of public key types, by OpenSSL's EVP_PKEY type. pyOpenSSL
+# doesn't name EVP_PKEY_EC.
+_KEY_TYPES = {OpenSSL.crypto.TYPE_RSA: "RSA", OpenSSL.crypto.TYPE_DSA: "DSA",
+              408: "EC"}
+# Most recently used summaries, by cert path and the file's stat details
+_CERT_SUMMARIES = OrderedDict()
+_CERT_SUMMARIES_SIZE = 128
+
+
+def cert_summary(cert_path):
+    """Load the cert at cert_path once and summarize it.
+
+    Summaries of recently used files are kept until the file changes,
+    so the dates and names of a lineage's cert can be asked for
+    repeatedly without rereading it.
+
+    :param str cert_path: path to a cert in PEM format
+
+    :returns: the cert's notBefore and notAfter, a tuple of its names
+        with the CN first, its serial number, its issuer as a string
+        such as "/C=US/CN=Issuer", and the type of its public key
+    :rtype: `CertSummary`
+
+    """
+    st = os.stat(cert_path)
+    key = (cert_path, st.st_mtime, st.st_size, st.st_ino)
+    summary = _CERT_SUMMARIES.pop(key, None)
+    if summary is None:
+        # pylint: disable=redefined-outer-name
+        with open(cert_path) as f:
+            x509 = OpenSSL.crypto.load_certificate(
+                OpenSSL.crypto.FILETYPE_PEM, f.read())
+        issuer = "".join(
+            "/{0}={1}".format(name.decode(), value.decode("utf-8"))
+            for name, value in x509.get_issuer().get_components())
+        key_type = x509.get_pubkey().type()
+        summary = CertSummary(
+            not_before=_parse_asn1_time(x509.get_notBefore()),
+            not_after=_parse_asn1_time(x509.get_notAfter()),
+            names=tuple(_get_names_from_loaded_cert_or_req(x509)),
+            serial=x509.get_serial_number(),
+            issuer=issuer,
+            key_type=_KEY_TYPES.get(key_type, str(key_type)))
+        while len(_CERT_SUMMARIES) >= _CERT_SUMMARIES_SIZE:
+            _CERT_SUMMARIES.popitem(last=False)
+    _CERT_SUMMARIES[key] = summary
+    return summary
+
+
 def notBefore(cert_path):
     """When does the cert at cert_path start being valid?
 
@@ -394,7 +455,7 @@ def notBefore(cert_path):
     :rtype: :class:`datetime.datetime`
 
     """
-    return _notAfterBefore(cert_path, OpenSSL.crypto.X509.get_notBefore)
+    return cert_summary(cert_path).not_before
 
 
 def notAfter(cert_path):
@@ -406,35 +467,28 @@ def notAfter(cert_path):
     :rtype: :class:`datetime.datetime`
 
     """
-    return _notAfterBefore(cert_path, OpenSSL.crypto.X509.get_notAfter)
+    return cert_summary(cert_path).not_after
 
 
-def _notAfterBefore(cert_path, method):
-    """Internal helper function for finding notbefore/notafter.
+def _parse_asn1_time(timestamp):
+    """Internal helper function for parsing notBefore/notAfter.
 
-    :param str cert_path: path to a cert in PEM format
-    :param function method: one of ``OpenSSL.crypto.X509.get_notBefore``
-        or ``OpenSSL.crypto.X509.get_notAfter``
+    :param bytes timestamp: the ASN.1 GeneralizedTime from pyOpenSSL
 
-    :returns: the notBefore or notAfter value from the cert at cert_path
+    :returns: the time as an aware datetime
     :rtype: :class:`datetime.datetime`
 
     """
-    # pylint: disable=redefined-outer-name
-    with open(cert_path) as f:
-        x509 = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM,
-                                               f.read())
     # pyopenssl always returns bytes
-    timestamp = method(x509)
-    reformatted_timestamp = [timestamp[0:4], b"-", timestamp[4:6], b"-",
-                             timestamp[6:8], b"T", timestamp[8:10], b":",
-                             timestamp[10:12], b":", timestamp[12:]]
-    timestamp_str = b"".join(reformatted_timestamp)
-    # pyrfc3339 uses "native" strings. That is, bytes on Python 2 and unicode
-    # on Python 3
-    if six.PY3:
-        timestamp_str = timestamp_str.decode('ascii')
-    return pyrfc3339.parse(timestamp_str)
+    timestamp = timestamp.decode('ascii')
+    try:
+        return datetime.datetime.strptime(
+            timestamp, "%Y%m%d%H%M%SZ").replace(tzinfo=pytz.UTC)
+    except ValueError:
+        # Not in UTC, so let pyrfc3339 handle the offset
+        return pyrfc3339.parse("{0}-{1}-{2}T{3}:{4}:{5}".format(
+            timestamp[0:4], timestamp[4:6], timestamp[6:8],
+            timestamp[8:10], timestamp[10:12], timestamp[12:]))
 
 
 def sha256sum(filename):
@@ -214,12 +214,16 @@ class IConfig(zope.interface.Interface):
     accounts_dir = zope.interface.Attribute(
         "Directory where all account information is stored.")
     backup_dir = zope.interface.Attribute("Configuration backups directory.")
+    checkpoint_store_dir = zope.interface.Attribute(
+        "Directory where the contents of checkpointed files are stored.")
     csr_dir = zope.interface.Attribute(
         "Directory where newly generated Certificate Signing Requests "
         "(CSRs) are saved.")
     in_progress_dir = zope.interface.Attribute(
         "Directory used before a permanent checkpoint is finalized.")
     key_dir = zope.interface.Attribute("Keys storage.")
+    ocsp_cache_dir = zope.interface.Attribute(
+        "Directory where OCSP responses are cached.")
     temp_checkpoint_dir = zope.interface.Attribute(
         "Temporary checkpoint directory.")
 
@@ -256,6 +260,20 @@ class IConfig(zope.interface.Interface):
         "user; only needed if your config is somewhere unsafe like /tmp/."
         "This is a boolean")
 
+    renew_revoked = zope.interface.Attribute(
+        "Renew certificates that are not yet due if OCSP says they have "
+        "been revoked. This is a boolean")
+
+    checkpoint_store = zope.interface.Attribute(
+        "Store each distinct version of a checkpointed file once and "
+        "hardlink it into checkpoints. This is a boolean")
+    keep_checkpoints = zope.interface.Attribute(
+        "Number of configuration checkpoints to keep, or None to keep "
+        "all of them.")
+    checkpoint_max_age = zope.interface.Attribute(
+        "Age in days after which configuration checkpoints are removed, "
+        "or None to keep them regardless of age.")
+
 class IInstaller(IPlugin):
     """Generic Certbot Installer Interface.
 
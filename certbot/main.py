@@ -638,7 +638,15 @@ def _csr_get_and_save_cert(config, le_client):
     return cert_path, fullchain_path
 
 def renew_cert(config, plugins, lineage):
-    """Renew & save an existing cert. Do not install it."""
+    """Renew & save an existing cert. Do not install it.
+
+    The server isn't reloaded here so that renewing many lineages reloads
+    each server once, see `.renewal.handle_renewal_request`.
+
+    :returns: Installer that must be restarted to use the new cert, if any
+    :rtype: `.IInstaller` or `None`
+
+    """
     try:
         # installers are used in auth mode to determine domain names
         installer, auth = plug_sel.choose_configurator_plugins(config, plugins, "certonly")
@@ -650,17 +658,11 @@ def renew_cert(config, plugins, lineage):
 
     _get_and_save_cert(le_client, config, lineage=lineage)
 
-    notify = zope.component.getUtility(interfaces.IDisplay).notification
     if installer is None:
+        notify = zope.component.getUtility(interfaces.IDisplay).notification
         notify("new certificate deployed without reload, fullchain is {0}".format(
                lineage.fullchain), pause=False)
-    else:
-        # In case of a renewal, reload server to pick up new certificate.
-        # In principle we could have a configuration option to inhibit this
-        # from happening.
-        installer.restart()
-        notify("new certificate deployed with reload of {0} server; fullchain is {1}".format(
-               config.installer, lineage.fullchain), pause=False)
+    return installer
 
 def certonly(config, plugins):
     """Authenticate & obtain cert, but do not install it.
@@ -1,19 +1,67 @@
 """Tools for checking certificate revocation."""
+import binascii
+import datetime
 import logging
+import os
 import re
+import tempfile
+import threading
 
 from subprocess import Popen, PIPE
 
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature, UnsupportedAlgorithm
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+import requests
+
 from certbot import errors
 from certbot import util
 
+try:
+    # Only cryptography>=2.5 can build OCSP requests and check the
+    # signature of OCSP responses
+    from cryptography.x509 import ocsp  # pylint: disable=ungrouped-imports
+    getattr(ocsp.OCSPResponse, "signature_hash_algorithm")
+except (ImportError, AttributeError):  # pragma: no cover
+    ocsp = None  # pylint: disable=invalid-name
+
+try:
+    # Only cryptography>=2.6 supports EdDSA keys
+    from cryptography.hazmat.primitives.asymmetric import ed448, ed25519
+    _EDDSA_PUBLIC_KEYS = (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey)
+except ImportError:  # pragma: no cover
+    _EDDSA_PUBLIC_KEYS = ()
+
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for an OCSP responder
+OCSP_TIMEOUT = 10
+# Allowed clock skew between us and the OCSP responder, like OpenSSL
+_OCSP_SKEW = datetime.timedelta(minutes=5)
+
 class RevocationChecker(object):
-    "This class figures out OCSP checking on this system, and performs it."
+    """This class figures out OCSP checking on this system, and performs it.
 
-    def __init__(self):
+    OCSP requests are made in process with cryptography, reusing HTTP
+    connections to responders. If cryptography is too old for that, or
+    enforce_openssl_binary_usage is set, the openssl binary is used.
+
+    If cache_dir is given, responses are kept there by issuer and serial
+    number and reused until their nextUpdate. This is only done when
+    checking with cryptography.
+
+    """
+
+    def __init__(self, enforce_openssl_binary_usage=False, cache_dir=None):
         self.broken = False
+        self.use_openssl_binary = enforce_openssl_binary_usage or not ocsp
+        self.cache_dir = cache_dir
+
+        if not self.use_openssl_binary:
+            self._local = threading.local()
+            return
 
         if not util.exe_exists("openssl"):
             logger.info("openssl not installed, can't check revocation")
@@ -30,6 +78,23 @@ class RevocationChecker(object):
             self.host_args = lambda host: ["Host", host]
 
 
+    @property
+    def session(self):
+        """The requests.Session of the calling thread.
+
+        Sessions aren't thread-safe, so each thread checking revocation
+        with this checker gets its own.
+
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    @session.setter
+    def session(self, session):
+        self._local.session = session
+
     def ocsp_revoked(self, cert_path, chain_path):
         """Get revoked status for a particular cert version.
 
@@ -48,6 +113,12 @@ class RevocationChecker(object):
         url, host = self.determine_ocsp_server(cert_path)
         if not host:
             return False
+        if self.use_openssl_binary:
+            return self._check_ocsp_openssl_bin(cert_path, chain_path, host, url)
+        return self._check_ocsp_cryptography(cert_path, chain_path, url)
+
+
+    def _check_ocsp_openssl_bin(self, cert_path, chain_path, host, url):
         # jdkasten thanks "Bulletproof SSL and TLS - Ivan Ristic" for documenting this!
         cmd = ["openssl", "ocsp",
                "-no_nonce",
@@ -57,6 +128,7 @@ class RevocationChecker(object):
                "-CAfile", chain_path,
                "-verify_other", chain_path,
                "-trust_other",
+               "-timeout", str(OCSP_TIMEOUT),
                "-header"] + self.host_args(host)
         logger.debug("Querying OCSP for %s", cert_path)
         logger.debug(" ".join(cmd))
@@ -69,7 +141,115 @@ class RevocationChecker(object):
         return _translate_ocsp_query(cert_path, output, err)
 
 
+    def _check_ocsp_cryptography(self, cert_path, chain_path, url):
+        try:
+            cert = _load_cert(cert_path)
+            issuer = _load_cert(chain_path)
+        except (IOError, ValueError):
+            logger.info("Cannot load %s and its chain to check OCSP", cert_path)
+            return False
+
+        request = ocsp.OCSPRequestBuilder().add_certificate(
+            cert, issuer, hashes.SHA1()).build()
+        response_ocsp = self._cached_response(request, issuer)
+        if response_ocsp is None:
+            response_ocsp = self._query_responder(cert_path, url, request, issuer)
+            if response_ocsp is None:
+                return False
+
+        status = response_ocsp.certificate_status
+        logger.debug("OCSP status for %s is %s", cert_path, status)
+        if status == ocsp.OCSPCertStatus.UNKNOWN:
+            logger.info("Revocation status for %s is unknown", cert_path)
+        return status == ocsp.OCSPCertStatus.REVOKED
+
+
+    def _query_responder(self, cert_path, url, request, issuer):
+        """Ask the OCSP responder at url about a cert.
+
+        :returns: the checked response, or None if there's no usable one
+        :rtype: `cryptography.x509.ocsp.OCSPResponse` or NoneType
+
+        """
+        logger.debug("Querying OCSP for %s at %s", cert_path, url)
+        try:
+            response = self.session.post(
+                url, data=request.public_bytes(serialization.Encoding.DER),
+                headers={"Content-Type": "application/ocsp-request"},
+                timeout=OCSP_TIMEOUT)
+        except requests.exceptions.RequestException:
+            logger.info("OCSP check failed for %s (are we offline?)", cert_path)
+            logger.debug("Traceback was:", exc_info=True)
+            return None
+        if response.status_code != 200:
+            logger.info("OCSP check failed for %s (HTTP status %d)",
+                        cert_path, response.status_code)
+            return None
+
+        try:
+            response_ocsp = ocsp.load_der_ocsp_response(response.content)
+        except ValueError:
+            logger.info("Unable to parse the OCSP response for %s", cert_path)
+            return None
+        try:
+            _check_ocsp_response(response_ocsp, request, issuer)
+        except (errors.Error, InvalidSignature, UnsupportedAlgorithm) as error:
+            logger.info("Revocation status for %s is unknown", cert_path)
+            logger.debug("Invalid OCSP response: %s", str(error) or "bad signature")
+            return None
+
+        if self.cache_dir is not None and response_ocsp.next_update is not None:
+            self._save_response(request, response.content)
+        return response_ocsp
+
+
+    def _cache_path(self, request):
+        """Where the response to request is cached."""
+        return os.path.join(self.cache_dir, "{0}-{1:x}.der".format(
+            binascii.hexlify(request.issuer_key_hash).decode("ascii"),
+            request.serial_number))
+
+
+    def _cached_response(self, request, issuer):
+        """Find a cached response to request that is still current.
+
+        :returns: the checked response, or None if there's no usable one
+        :rtype: `cryptography.x509.ocsp.OCSPResponse` or NoneType
+
+        """
+        if self.cache_dir is None:
+            return None
+        path = self._cache_path(request)
+        try:
+            with open(path, "rb") as f:
+                response_ocsp = ocsp.load_der_ocsp_response(f.read())
+            _check_ocsp_response(response_ocsp, request, issuer)
+        except (IOError, ValueError, errors.Error,
+                InvalidSignature, UnsupportedAlgorithm):
+            return None
+        if (response_ocsp.next_update is None or
+                response_ocsp.next_update <= datetime.datetime.utcnow()):
+            return None
+        logger.debug("Using the OCSP response cached in %s", path)
+        return response_ocsp
+
+
+    def _save_response(self, request, content):
+        """Cache the DER encoded response to request."""
+        try:
+            util.make_or_verify_dir(self.cache_dir, 0o755, os.geteuid())
+            # Write a temporary file first, so readers never see part of it
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.rename(temp_path, self._cache_path(request))
+        except (IOError, OSError):
+            logger.debug("Unable to cache the OCSP response in %s",
+                         self.cache_dir, exc_info=True)
+
+
     def determine_ocsp_server(self, cert_path):
+        # pylint: disable=no-self-use
         """Extract the OCSP server host from a certificate.
 
         :param str cert_path: Path to the cert we're checking OCSP for
@@ -78,10 +258,13 @@ class RevocationChecker(object):
 
         """
         try:
-            url, _err = util.run_script(
-                ["openssl", "x509", "-in", cert_path, "-noout", "-ocsp_uri"],
-                log=logger.debug)
-        except errors.SubprocessError:
+            extension = _load_cert(cert_path).extensions.get_extension_for_class(
+                x509.AuthorityInformationAccess)
+            url = next(
+                description.access_location.value
+                for description in extension.value
+                if description.access_method == x509.OID_OCSP)
+        except (IOError, ValueError, x509.ExtensionNotFound, StopIteration):
             logger.info("Cannot extract OCSP URI from %s", cert_path)
             return None, None
 
@@ -93,6 +276,85 @@ class RevocationChecker(object):
             logger.info("Cannot process OCSP host from URL (%s) in cert at %s", url, cert_path)
             return None, None
 
+def _load_cert(cert_path):
+    """Load the first cert in the PEM file at cert_path."""
+    with open(cert_path, "rb") as f:
+        return x509.load_pem_x509_certificate(f.read(), default_backend())
+
+def _check_ocsp_response(response_ocsp, request_ocsp, issuer):
+    """Make sure an OCSP response answers the request and can be trusted.
+
+    :raises errors.Error: if the response doesn't answer the request or
+        isn't current
+    :raises cryptography.exceptions.InvalidSignature: if the response
+        wasn't signed by the issuer or a responder it delegated to
+
+    """
+    if response_ocsp.response_status != ocsp.OCSPResponseStatus.SUCCESSFUL:
+        raise errors.Error("response status is {0}".format(
+            response_ocsp.response_status))
+    if (response_ocsp.serial_number != request_ocsp.serial_number or
+            response_ocsp.issuer_key_hash != request_ocsp.issuer_key_hash or
+            response_ocsp.issuer_name_hash != request_ocsp.issuer_name_hash):
+        raise errors.Error("response is for a different certificate")
+
+    _check_ocsp_response_signature(response_ocsp, issuer)
+
+    # OCSP times are in UTC
+    now = datetime.datetime.utcnow()
+    if response_ocsp.this_update > now + _OCSP_SKEW:
+        raise errors.Error("thisUpdate is in the future")
+    if (response_ocsp.next_update is not None and
+            response_ocsp.next_update < now - _OCSP_SKEW):
+        raise errors.Error("nextUpdate is in the past")
+
+def _check_ocsp_response_signature(response_ocsp, issuer):
+    """Check an OCSP response was signed by the issuer or its delegate."""
+    if _is_responder(response_ocsp, issuer):
+        responder = issuer
+    else:
+        responders = [cert for cert in response_ocsp.certificates
+                      if _is_responder(response_ocsp, cert)]
+        if not responders:
+            raise errors.Error("responder certificate is missing")
+        responder = responders[0]
+        if responder.issuer != issuer.subject:
+            raise errors.Error("responder wasn't authorized by the issuer")
+        _check_signature(issuer, responder.signature,
+                         responder.tbs_certificate_bytes,
+                         responder.signature_hash_algorithm)
+        try:
+            usage = responder.extensions.get_extension_for_class(
+                x509.ExtendedKeyUsage).value
+        except x509.ExtensionNotFound:
+            usage = []
+        if x509.oid.ExtendedKeyUsageOID.OCSP_SIGNING not in usage:
+            raise errors.Error("responder isn't allowed to sign OCSP responses")
+
+    _check_signature(responder, response_ocsp.signature,
+                     response_ocsp.tbs_response_bytes,
+                     response_ocsp.signature_hash_algorithm)
+
+def _is_responder(response_ocsp, cert):
+    """Is cert the one the OCSP response says signed it?"""
+    if response_ocsp.responder_name is not None:
+        return response_ocsp.responder_name == cert.subject
+    return response_ocsp.responder_key_hash == x509.SubjectKeyIdentifier.from_public_key(
+        cert.public_key()).digest
+
+def _check_signature(cert, signature, data, hash_algorithm):
+    """Verify signature over data with the public key in cert."""
+    public_key = cert.public_key()
+    if isinstance(public_key, rsa.RSAPublicKey):
+        public_key.verify(signature, data, padding.PKCS1v15(), hash_algorithm)
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        public_key.verify(signature, data, ec.ECDSA(hash_algorithm))
+    elif isinstance(public_key, _EDDSA_PUBLIC_KEYS):
+        # EdDSA signs the data itself rather than a digest of it
+        public_key.verify(signature, data)
+    else:
+        public_key.verify(signature, data, hash_algorithm)
+
 def _translate_ocsp_query(cert_path, ocsp_output, ocsp_errors):
     """Parse openssl's weird output to work out what it means."""
 
@@ -117,4 +379,3 @@ def _translate_ocsp_query(cert_path, ocsp_output, ocsp_errors):
         logger.warn("Unable to properly parse OCSP output: %s\nstderr:%s",
                     ocsp_output, ocsp_errors)
         return False
-
@@ -37,7 +37,8 @@ class AuthenticatorTest(test_util.TempDirTestCase):
             temp_checkpoint_dir=os.path.join(
                                         self.tempdir, "temp_checkpoint_dir"),
             in_progress_dir=os.path.join(self.tempdir, "in_progess"),
-            tls_sni_01_port=5001)
+            checkpoint_store=False, keep_checkpoints=None,
+            checkpoint_max_age=None, tls_sni_01_port=5001)
 
         from certbot.plugins.manual import Authenticator
         self.auth = Authenticator(self.config, name='manual')
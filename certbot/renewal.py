@@ -12,6 +12,7 @@ import zope.component
 import OpenSSL
 
 from certbot import cli
+from certbot import configuration
 
 from certbot import crypto_util
 from certbot import errors
@@ -19,8 +20,15 @@ from certbot import interfaces
 from certbot import util
 from certbot import hooks
 from certbot import storage
+from certbot.plugins import common as plugins_common
 from certbot.plugins import disco as plugins_disco
 
+try:
+    from collections import OrderedDict
+except ImportError:  # pragma: no cover
+    # OrderedDict was added in Python 2.7
+    from ordereddict import OrderedDict  # pylint: disable=import-error
+
 logger = logging.getLogger(__name__)
 
 # These are the items which get pulled out of a renewal configuration
@@ -267,15 +275,53 @@ def should_renew(config, lineage):
     return False
 
 
+def _undue_lineage(config, renewal_file):
+    """Cheaply check whether a lineage can be skipped as not yet due.
+
+    This is done before the configuration is copied and restored from
+    the lineage's renewal parameters, so most lineages on a host that
+    are far from expiry never pay for that. The renewal parameters are
+    still parsed, on a shallow copy of the configuration, and anything
+    unusual is left for the full check in :func:`handle_renewal_request`
+    to report.
+
+    :param configuration.NamespaceConfig config: the renew configuration
+    :param str renewal_file: path to the lineage's renewal config file
+
+    :returns: the lineage if it isn't due for renewal, otherwise None
+    :rtype: `storage.RenewableCert` or NoneType
+
+    """
+    if config.renew_by_default or config.dry_run:
+        return None
+    try:
+        lineage = storage.RenewableCert(renewal_file, config)
+        renewalparams = lineage.configuration["renewalparams"]
+        if "authenticator" not in renewalparams:
+            return None
+        params_config = configuration.NamespaceConfig(
+            copy.copy(config.namespace))
+        restore_required_config_elements(params_config, renewalparams)
+        _restore_plugin_configs(params_config, renewalparams)
+        lineage.ensure_deployed()
+        if lineage.should_autorenew(interactive=True):
+            return None
+    except Exception:  # pylint: disable=broad-except
+        logger.debug("Quick renewal check of %s failed:\n%s",
+                     renewal_file, traceback.format_exc())
+        return None
+    logger.info("Cert not yet due for renewal")
+    return lineage
+
+
 def _avoid_invalidating_lineage(config, lineage, original_server):
     "Do not renew a valid cert with one from a staging server!"
     # Some lineages may have begun with --staging, but then had production certs
     # added to them
-    latest_cert = OpenSSL.crypto.load_certificate(
-        OpenSSL.crypto.FILETYPE_PEM, open(lineage.cert).read())
+    issuer = crypto_util.cert_summary(lineage.cert).issuer
     # all our test certs are from happy hacker fake CA, though maybe one day
     # we should test more methodically
-    now_valid = "fake" not in repr(latest_cert.get_issuer()).lower()
+    now_valid = "fake" not in issuer.lower()
 
     if util.is_staging(config.server):
         if not util.is_staging(original_server) or now_valid:
@@ -361,6 +407,146 @@ def _renew_describe_results(config, renew_successes, renew_failures,
     print("\n".join(out))
 
 
+def _installer_key(config, installer):
+    """Identify the server the installer of a lineage restarts.
+
+    Lineages renewed with different options of the installer plugin
+    (e.g. a different server root) are kept apart.
+
+    :param configuration.NamespaceConfig config: the lineage's configuration
+    :param installer: the lineage's installer
+
+    :returns: the installer name and its plugin options
+    :rtype: tuple
+
+    """
+    name = str(config.installer or installer.name)
+    prefix = plugins_common.dest_namespace(name)
+    options = sorted(
+        (dest, repr(value))
+        for dest, value in six.iteritems(vars(config.namespace))
+        if dest.startswith(prefix))
+    return name, tuple(options)
+
+
+def _restart_installers(restarts, renew_successes, renew_failures):
+    """Restart each installer once to use the renewed certificates.
+
+    If a server can't be restarted with the renewed certificates, the
+    lineages renewed for it are relinked to their prior version one at a
+    time, most recent first, until the server restarts. Only then are
+    those lineages rolled back and reported as failures; their deploy
+    hooks have already run with the renewed certificates. If the server
+    doesn't restart with any of the prior certificates either, the
+    failure isn't caused by the renewed certificates, so all of them
+    stay deployed and the failed restart is reported.
+
+    :param OrderedDict restarts: keys from :func:`_installer_key` mapped
+        to the installer and a list of (lineage, prior version) tuples
+    :param list renew_successes: fullchain paths of renewed lineages
+    :param list renew_failures: fullchain paths of failed lineages
+
+    """
+    notify = zope.component.getUtility(interfaces.IDisplay).notification
+    for (name, _), (installer, lineages) in six.iteritems(restarts):
+        deployed = list(lineages)
+        if not _restart(installer, name):
+            rolled_back = _relink_until_restarted(installer, name, deployed)
+            if rolled_back is None:
+                logger.error("Unable to restart %s, also with the prior "
+                             "certificates. The renewed certificates stay "
+                             "deployed and are used once %s is restarted.",
+                             name, name)
+                notify("Unable to reload the {0} server, so it doesn't use "
+                       "the renewed certificates yet".format(name),
+                       pause=False)
+                continue
+            for lineage, prior_version in rolled_back:
+                _roll_back(lineage, prior_version, renew_successes,
+                           renew_failures)
+
+        for lineage, _ in deployed:
+            notify("new certificate deployed with reload of {0} server; "
+                   "fullchain is {1}".format(name, lineage.fullchain),
+                   pause=False)
+
+
+def _restart(installer, name):
+    """Restart installer, logging any error.
+
+    Installers are plugins, so any exception is caught to still restart
+    the others and report the results.
+
+    :returns: whether installer was restarted
+    :rtype: bool
+
+    """
+    try:
+        installer.restart()
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Restarting %s failed: %s", name, e)
+        logger.debug("Traceback was:\n%s", traceback.format_exc())
+        return False
+    return True
+
+
+def _relink_until_restarted(installer, name, deployed):
+    """Relink the most recent lineages to their prior version until
+    installer restarts.
+
+    If installer doesn't restart with all of them relinked, they are
+    linked to their renewed version again.
+
+    :param list deployed: (lineage, prior version) tuples, lineages are
+        removed from it as they are relinked
+
+    :returns: the relinked (lineage, prior version) tuples, or None if
+        installer wasn't restarted
+    :rtype: list or NoneType
+
+    """
+    relinked = []
+    while deployed:
+        lineage, prior_version = deployed.pop()
+        relinked.append((lineage, prior_version,
+                         lineage.latest_common_version()))
+        try:
+            lineage.update_all_links_to(prior_version)
+        except (errors.Error, OSError) as e:
+            logger.error("Unable to relink %s to version %d: %s",
+                         lineage.fullchain, prior_version, e)
+            logger.debug("Traceback was:\n%s", traceback.format_exc())
+            continue
+        if _restart(installer, name):
+            return [(lineage, prior_version)
+                    for lineage, prior_version, _ in relinked]
+
+    for lineage, _, version in relinked:
+        try:
+            lineage.update_all_links_to(version)
+        except (errors.Error, OSError) as e:
+            logger.error("Unable to relink %s to version %d: %s",
+                         lineage.fullchain, version, e)
+            logger.debug("Traceback was:\n%s", traceback.format_exc())
+    return None
+
+
+def _roll_back(lineage, prior_version, renew_successes, renew_failures):
+    """Roll lineage back to prior_version and report it as a failure."""
+    renew_successes.remove(lineage.fullchain)
+    renew_failures.append(lineage.fullchain)
+    logger.warning("Rolling %s back to version %d. Its deploy hook already "
+                   "ran with the renewed certificate.", lineage.fullchain,
+                   prior_version)
+    try:
+        if lineage.latest_common_version() != prior_version:
+            lineage.roll_back_to(prior_version)
+    except (errors.Error, OSError) as e:
+        logger.error("Unable to roll %s back to version %d: %s",
+                     lineage.fullchain, prior_version, e)
+        logger.debug("Traceback was:\n%s", traceback.format_exc())
+
+
 def handle_renewal_request(config):
     """Examine each lineage; renew if due and report results"""
 
@@ -379,15 +565,24 @@ def handle_renewal_request(config):
     if config.certname:
         conf_files = [storage.renewal_file_for_certname(config, config.certname)]
     else:
-        conf_files = storage.renewal_conf_files(config)
+        conf_files = storage.iter_renewal_conf_files(config)
 
     renew_successes = []
     renew_failures = []
     renew_skipped = []
     parse_failures = []
+    # Installers to restart after renewing all lineages, mapped by
+    # _installer_key to the installer and the renewed lineages with their
+    # prior version
+    restarts = OrderedDict()
     for renewal_file in conf_files:
         disp = zope.component.getUtility(interfaces.IDisplay)
         disp.notification("Processing " + renewal_file, pause=False)
+        undue_lineage = _undue_lineage(config, renewal_file)
+        if undue_lineage is not None:
+            renew_skipped.append(undue_lineage.fullchain)
+            continue
+
         lineage_config = copy.deepcopy(config)
         lineagename = storage.lineagename_for_filename(renewal_file)
 
@@ -418,8 +613,14 @@ def handle_renewal_request(config):
                     # will just grab them from the certificate
                     # we already know it's time to renew based on should_renew
                     # and we have a lineage in renewal_candidate
-                    main.renew_cert(lineage_config, plugins, renewal_candidate)
+                    prior_version = renewal_candidate.latest_common_version()
+                    installer = main.renew_cert(
+                        lineage_config, plugins, renewal_candidate)
                     renew_successes.append(renewal_candidate.fullchain)
+                    if installer is not None:
+                        key = _installer_key(lineage_config, installer)
+                        restarts.setdefault(key, (installer, []))[1].append(
+                            (renewal_candidate, prior_version))
                 else:
                     renew_skipped.append(renewal_candidate.fullchain)
         except Exception as e:  # pylint: disable=broad-except
@@ -430,6 +631,8 @@ def handle_renewal_request(config):
             logger.debug("Traceback was:\n%s", traceback.format_exc())
             renew_failures.append(renewal_candidate.fullchain)
 
+    _restart_installers(restarts, renew_successes, renew_failures)
+
     # Describe all the results
     _renew_describe_results(config, renew_successes, renew_failures,
                             renew_skipped, parse_failures)
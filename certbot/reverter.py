@@ -1,9 +1,11 @@
 """Reverter class saves configuration checkpoints and allows for recovery."""
 import csv
-import glob
+import hashlib
 import logging
 import os
 import shutil
+import stat
+import tempfile
 import time
 import traceback
 
@@ -57,6 +59,17 @@ class Reverter(object):
 
     .. note:: Consider moving everything over to CSV format.
 
+    Finalized checkpoints are listed in an index kept next to
+    ``config.backup_dir``, so that finding the latest checkpoints doesn't
+    require scanning the backup directory. Checkpoints beyond
+    ``config.keep_checkpoints`` or older than ``config.checkpoint_max_age``
+    days are removed when a new checkpoint is finalized.
+
+    When ``config.checkpoint_store`` is set, the contents of saved files
+    are kept once per distinct version in ``config.checkpoint_store_dir``
+    and hardlinked into each checkpoint, so a file that did not change
+    between checkpoints is not copied again.
+
     :param config: Configuration.
     :type config: :class:`certbot.interfaces.IConfig`
 
@@ -68,6 +81,11 @@ class Reverter(object):
             config.backup_dir, constants.CONFIG_DIRS_MODE, os.geteuid(),
             self.config.strict_permissions)
 
+        if self.config.checkpoint_store:
+            util.make_or_verify_dir(
+                config.checkpoint_store_dir, constants.CONFIG_DIRS_MODE,
+                os.geteuid(), self.config.strict_permissions)
+
     def revert_temporary_config(self):
         """Reload users original configuration files after a temporary save.
 
@@ -107,8 +125,7 @@ class Reverter(object):
             logger.error("Rollback argument must be a positive integer")
             raise errors.ReverterError("Invalid Input")
 
-        backups = os.listdir(self.config.backup_dir)
-        backups.sort()
+        backups = self._checkpoints()
 
         if not backups:
             logger.warning(
@@ -127,6 +144,7 @@ class Reverter(object):
                 raise errors.ReverterError(
                     "Unable to load checkpoint during rollback")
             rollback -= 1
+        self._save_index(backups)
 
     def view_config_changes(self, for_logging=False, num=None):
         """Displays all saved checkpoints.
@@ -139,8 +157,7 @@ class Reverter(object):
         :raises .errors.ReverterError: If invalid directory structure.
 
         """
-        backups = os.listdir(self.config.backup_dir)
-        backups.sort(reverse=True)
+        backups = self._checkpoints()[::-1]
         if num:
             backups = backups[:num]
         if not backups:
@@ -224,6 +241,7 @@ class Reverter(object):
             os.path.join(cp_dir, "FILEPATHS"))
 
         idx = len(existing_filepaths)
+        existing_filepaths = set(existing_filepaths)
 
         for filename in save_files:
             # No need to copy/index already existing files
@@ -233,11 +251,11 @@ class Reverter(object):
                 # have the same filename
                 logger.debug("Creating backup of %s", filename)
                 try:
-                    shutil.copy2(filename, os.path.join(
+                    self._backup_file(filename, os.path.join(
                         cp_dir, os.path.basename(filename) + "_" + str(idx)))
                     op_fd.write(filename + os.linesep)
                 # http://stackoverflow.com/questions/4726260/effective-use-of-python-shutil-copy2
-                except IOError:
+                except (IOError, OSError):
                     op_fd.close()
                     logger.error(
                         "Unable to add file %s to checkpoint %s",
@@ -251,6 +269,75 @@ class Reverter(object):
         with open(os.path.join(cp_dir, "CHANGES_SINCE"), "a") as notes_fd:
             notes_fd.write(save_notes)
 
+    def _backup_file(self, filename, backup_path):
+        """Save a copy of filename at backup_path.
+
+        With the checkpoint store enabled, the copy is a hardlink to the
+        stored version of the file, which is only added to the store if
+        it isn't there already. A plain copy is made if the store can't
+        be linked from backup_path (e.g. it is on another filesystem).
+
+        :raises IOError: if unable to read filename or write backup_path
+
+        """
+        if not self.config.checkpoint_store:
+            shutil.copy2(filename, backup_path)
+            return
+
+        try:
+            os.link(self._store_file(filename), backup_path)
+        except (IOError, OSError) as error:
+            logger.debug("Unable to link %s from the checkpoint store: %s",
+                         filename, error)
+            shutil.copy2(filename, backup_path)
+
+    def _store_file(self, filename):
+        """Add filename to the checkpoint store.
+
+        Stored files are named by the SHA-256 of their contents and their
+        permission bits, which a hardlink shares with every checkpoint.
+
+        :returns: path of the stored version of filename
+        :rtype: str
+
+        """
+        store_dir = self.config.checkpoint_store_dir
+        stored_path = _stored_path(store_dir, filename)
+        if os.path.isfile(stored_path):
+            return stored_path
+
+        # Name the copy after what was actually copied, in case filename
+        # changed since it was hashed
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=store_dir)
+        os.close(tmp_fd)
+        try:
+            shutil.copy2(filename, tmp_path)
+            stored_path = _stored_path(store_dir, tmp_path)
+            os.rename(tmp_path, stored_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return stored_path
+
+    def _prune_store(self):
+        """Remove stored files no longer linked from any checkpoint."""
+        if not self.config.checkpoint_store:
+            return
+        store_dir = self.config.checkpoint_store_dir
+        try:
+            names = os.listdir(store_dir)
+        except OSError as error:
+            logger.debug("Unable to prune %s: %s", store_dir, error)
+            return
+        for name in names:
+            path = os.path.join(store_dir, name)
+            try:
+                # Skip copies still being added by _store_file
+                if not name.startswith(".") and os.stat(path).st_nlink == 1:
+                    os.remove(path)
+            except OSError as error:
+                logger.debug("Unable to prune %s: %s", path, error)
+
     def _read_and_append(self, filepath):  # pylint: disable=no-self-use
         """Reads the file lines and returns a file obj.
 
@@ -306,6 +393,8 @@ class Reverter(object):
             raise errors.ReverterError(
                 "Unable to remove directory: %s" % cp_dir)
 
+        self._prune_store()
+
     def _run_undo_commands(self, filepath):  # pylint: disable=no-self-use
         """Run all commands in a file."""
         # NOTE: csv module uses native strings. That is, bytes on Python 2 and
@@ -542,12 +631,12 @@ class Reverter(object):
 
         # rename the directory as a timestamp
         self._timestamp_progress_dir()
+        self._remove_expired_checkpoints()
 
-    def _checkpoint_timestamp(self):
+    def _checkpoint_timestamp(self, backups):
         "Determine the timestamp of the checkpoint, enforcing monotonicity."
         timestamp = str(time.time())
-        others = glob.glob(os.path.join(self.config.backup_dir, "[0-9]*"))
-        others = [os.path.basename(d) for d in others]
+        others = [bkup for bkup in backups if bkup[:1].isdigit()]
         others.append(timestamp)
         others.sort()
         if others[-1] != timestamp:
@@ -570,10 +659,12 @@ class Reverter(object):
         # collisions in the naming convention.
 
         for _ in six.moves.range(2):
-            timestamp = self._checkpoint_timestamp()
+            backups = self._checkpoints()
+            timestamp = self._checkpoint_timestamp(backups)
             final_dir = os.path.join(self.config.backup_dir, timestamp)
             try:
                 os.rename(self.config.in_progress_dir, final_dir)
+                self._save_index(sorted(backups + [timestamp]))
                 return
             except OSError:
                 logger.warning("Extreme, unexpected race condition, retrying (%s)", timestamp)
@@ -584,3 +675,122 @@ class Reverter(object):
             self.config.in_progress_dir, final_dir)
         raise errors.ReverterError(
             "Unable to finalize checkpoint renaming")
+
+    def _remove_expired_checkpoints(self):
+        """Remove checkpoints not kept by the retention policy.
+
+        The newest ``config.keep_checkpoints`` checkpoints are kept, as
+        long as they are not older than ``config.checkpoint_max_age``
+        days. Removed checkpoints can no longer be rolled back.
+
+        This is housekeeping, so checkpoints that can't be removed are
+        only logged and left for the next time.
+
+        """
+        keep = self.config.keep_checkpoints
+        max_age = self.config.checkpoint_max_age
+        if keep is None and max_age is None:
+            return
+
+        backups = self._checkpoints()
+        expired = set()
+        if keep is not None:
+            expired.update(backups[:max(len(backups) - keep, 0)])
+        if max_age is not None:
+            oldest = time.time() - max_age * 24 * 60 * 60
+            for bkup in backups:
+                finalized = _checkpoint_time(bkup)
+                if finalized is not None and finalized < oldest:
+                    expired.add(bkup)
+        if not expired:
+            return
+
+        removed = set()
+        for bkup in expired:
+            logger.info("Removing expired checkpoint %s", bkup)
+            try:
+                shutil.rmtree(os.path.join(self.config.backup_dir, bkup))
+            except OSError as error:
+                logger.warning("Unable to remove expired checkpoint %s: %s",
+                               bkup, error)
+            else:
+                removed.add(bkup)
+        self._save_index([bkup for bkup in backups if bkup not in removed])
+        self._prune_store()
+
+    def _checkpoints(self):
+        """List the names of finalized checkpoints, oldest first.
+
+        The list is read from the checkpoint index, unless the backup
+        directory changed since the index was written, in which case the
+        index is rebuilt from the directory listing.
+
+        :rtype: list
+
+        """
+        try:
+            with open(self._index_path()) as index_fd:
+                lines = index_fd.read().splitlines()
+            if lines and lines[0] == self._index_key():
+                return lines[1:]
+        except (IOError, OSError):
+            pass
+
+        backups = sorted(os.listdir(self.config.backup_dir))
+        self._save_index(backups)
+        return backups
+
+    def _save_index(self, backups):
+        """Write the checkpoint index.
+
+        :param list backups: checkpoint names currently in the backup
+            directory, oldest first
+
+        """
+        index_path = self._index_path()
+        tmp_path = None
+        try:
+            tmp_fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(index_path))
+            with os.fdopen(tmp_fd, "w") as index_fd:
+                index_fd.write(self._index_key() + "\n")
+                for bkup in backups:
+                    index_fd.write(bkup + "\n")
+            os.rename(tmp_path, index_path)
+        except (IOError, OSError) as error:
+            logger.debug("Unable to save checkpoint index %s: %s",
+                         index_path, error)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _index_path(self):
+        """Path of the checkpoint index."""
+        return os.path.normpath(self.config.backup_dir) + ".index"
+
+    def _index_key(self):
+        """Identify the current contents of the backup directory.
+
+        Creating or removing a checkpoint updates both the modification
+        time and (on most filesystems) the link count of the directory.
+
+        """
+        dir_stat = os.stat(self.config.backup_dir)
+        return "{0!r} {1}".format(dir_stat.st_mtime, dir_stat.st_nlink)
+
+
+def _checkpoint_time(bkup):
+    """Time a checkpoint was finalized, or None if it isn't a checkpoint."""
+    try:
+        return float(bkup)
+    except ValueError:
+        return None
+
+
+def _stored_path(store_dir, filename):
+    """Path of filename's contents and permissions in the checkpoint store."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file_fd:
+        for block in iter(lambda: file_fd.read(65536), b""):
+            digest.update(block)
+    mode = stat.S_IMODE(os.stat(filename).st_mode)
+    return os.path.join(store_dir, "{0}-{1:o}".format(digest.hexdigest(), mode))
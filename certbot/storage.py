@@ -1,4 +1,5 @@
 """Renewable certificates storage."""
+import calendar
 import datetime
 import glob
 import logging
@@ -18,6 +19,7 @@ from certbot import constants
 from certbot import crypto_util
 from certbot import errors
 from certbot import error_handler
+from certbot import ocsp
 from certbot import util
 
 from certbot.plugins import common as plugins_common
@@ -26,10 +28,47 @@ from certbot.plugins import disco as plugins_disco
 logger = logging.getLogger(__name__)
 
 ALL_FOUR = ("cert", "privkey", "chain", "fullchain")
+# Names of the files of each version of an item in the archive directory
+_VERSION_PATTERN = re.compile(
+    r"^({0})([0-9]+)\.pem$".format("|".join(ALL_FOUR)))
+# A term of the time intervals add_time_interval parses itself
+_INTERVAL_TERM = re.compile(
+    r"\s*([+-]?)\s*([0-9]+)\s*(second|minute|hour|day|week|month|year)s?(?![a-z0-9])\s*")
+_INTERVAL_SECONDS = {"second": 1, "minute": 60, "hour": 3600,
+                     "day": 86400, "week": 604800}
+_INTERVAL_MONTHS = {"month": 1, "year": 12}
+# Parsed time intervals, or None for those left to parsedatetime
+_INTERVALS = {}
+# RevocationChecker for each OCSP cache directory, shared by the lineages
+# checked in a run so that connections to OCSP responders are reused
+_REVOCATION_CHECKERS = {}
 README = "README"
 CURRENT_VERSION = util.get_strict_version(certbot.__version__)
 
 
+def _revocation_checker(cache_dir):
+    """Get the RevocationChecker shared by lineages caching in cache_dir."""
+    checker = _REVOCATION_CHECKERS.get(cache_dir)
+    if checker is None:
+        checker = ocsp.RevocationChecker(cache_dir=cache_dir)
+        _REVOCATION_CHECKERS[cache_dir] = checker
+    return checker
+
+
+def iter_renewal_conf_files(config):
+    """Iterate over the renewal configuration files.
+
+    Unlike :func:`renewal_conf_files`, no list of the paths is built,
+    so callers can handle each lineage as its path is returned.
+
+    :param certbot.interfaces.IConfig config: Configuration object
+
+    :returns: iterator over renewal configuration files
+    :rtype: iterator of `str`
+
+    """
+    return glob.iglob(os.path.join(config.renewal_configs_dir, "*.conf"))
+
 def renewal_conf_files(config):
     """Build a list of all renewal configuration files.
 
@@ -39,7 +78,7 @@ def renewal_conf_files(config):
     :rtype: `list` of `str`
 
     """
-    return glob.glob(os.path.join(config.renewal_configs_dir, "*.conf"))
+    return list(iter_renewal_conf_files(config))
 
 def renewal_file_for_certname(config, certname):
     """Return /path/to/certname.conf in the renewal conf directory"""
@@ -56,6 +95,51 @@ def config_with_defaults(config=None):
     return defaults_copy
 
 
+def _parse_interval(interval):
+    """Parse a simple time interval such as '30 days' or '1 year-1 day'.
+
+    Results are remembered, as the same few intervals are parsed for
+    every lineage.
+
+    :param str interval: stripped, lowercase time interval
+
+    :returns: the steps of the interval in the order they are added,
+        each a number of months or a timedelta, or None if the interval
+        isn't simple enough to be parsed here
+    :rtype: `list` or NoneType
+
+    """
+    if interval not in _INTERVALS:
+        steps = []
+        pos = 0
+        while pos < len(interval):
+            match = _INTERVAL_TERM.match(interval, pos)
+            if match is None:
+                _INTERVALS[interval] = None
+                return None
+            sign, number, unit = match.groups()
+            number = -int(number) if sign == "-" else int(number)
+            if unit in _INTERVAL_MONTHS:
+                steps.append(number * _INTERVAL_MONTHS[unit])
+            else:
+                delta = datetime.timedelta(
+                    seconds=number * _INTERVAL_SECONDS[unit])
+                if steps and isinstance(steps[-1], datetime.timedelta):
+                    delta += steps.pop()
+                steps.append(delta)
+            pos = match.end()
+        _INTERVALS[interval] = steps
+    return _INTERVALS[interval]
+
+
+def _add_months(when, months):
+    """Add months to when, clamping the day to the end of the month."""
+    year, month = divmod(when.month - 1 + months, 12)
+    year += when.year
+    day = min(when.day, calendar.monthrange(year, month + 1)[1])
+    return when.replace(year=year, month=month + 1, day=day)
+
+
 def add_time_interval(base_time, interval, textparser=parsedatetime.Calendar()):
     """Parse the time specified time interval, and add it to the base_time
 
@@ -65,6 +149,10 @@ def add_time_interval(base_time, interval, textparser=parsedatetime.Calendar()):
     hours'. If an integer is found with no associated unit, it is
     interpreted by default as a number of days.
 
+    Intervals made of whole numbers of seconds, minutes, hours, days,
+    weeks, months and years are handled without parsedatetime, which
+    is only used for anything more unusual.
+
     :param datetime.datetime base_time: The time to be added with the interval.
     :param str interval: The time interval to parse.
 
@@ -77,6 +165,23 @@ def add_time_interval(base_time, interval, textparser=parsedatetime.Calendar()):
     # try to use the same timezone, but fallback to UTC
     tzinfo = base_time.tzinfo or pytz.UTC
 
+    steps = _parse_interval(interval.strip().lower())
+    if steps is not None:
+        # Like parsedatetime, work on the local time to the second and
+        # then attach the timezone
+        localize = getattr(
+            tzinfo, "localize", lambda dt: dt.replace(tzinfo=tzinfo))
+        result = base_time.replace(tzinfo=None, microsecond=0)
+        try:
+            for step in steps:
+                if isinstance(step, datetime.timedelta):
+                    result += step
+                else:
+                    result = _add_months(result, step)
+            return localize(result)
+        except (OverflowError, ValueError):
+            logger.debug("Falling back to parsedatetime for %s", interval)
+
     return textparser.parseDT(interval, base_time, tzinfo=tzinfo)[0]
 
 
@@ -330,6 +435,23 @@ def delete_files(config, certname):
         logger.debug("Unable to remove %s", archive_path)
 
 
+def _version_of(kind, filename):
+    """Version of the kind of item stored in the archive file filename.
+
+    :param str kind: the lineage member item ("cert", "privkey",
+        "chain", or "fullchain")
+    :param str filename: base name of the file
+
+    :returns: the version or ``None`` if filename isn't a version of kind
+    :rtype: int
+
+    """
+    match = _VERSION_PATTERN.match(filename)
+    if match and match.group(1) == kind:
+        return int(match.group(2))
+    return None
+
+
 class RenewableCert(object):
     # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """Renewable certificate.
@@ -412,6 +534,9 @@ class RenewableCert(object):
         self.chain = self.configuration["chain"]
         self.fullchain = self.configuration["fullchain"]
         self.live_dir = os.path.dirname(self.cert)
+        # Archive directories mapped to their modification time and
+        # version table, see _version_table
+        self._versions = {}
 
         self._fix_symlinks()
         if update_symlinks:
@@ -539,8 +664,7 @@ class RenewableCert(object):
 
             # The link must point to a file that follows the archive
             # naming convention
-            pattern = re.compile(r"^{0}([0-9]+)\.pem$".format(kind))
-            if not pattern.match(os.path.basename(target)):
+            if _version_of(kind, os.path.basename(target)) is None:
                 logger.debug("%s does not follow the archive naming "
                              "convention.", target)
                 return False
@@ -647,18 +771,15 @@ class RenewableCert(object):
         """
         if kind not in ALL_FOUR:
             raise errors.CertStorageError("unknown kind of item")
-        pattern = re.compile(r"^{0}([0-9]+)\.pem$".format(kind))
         target = self.current_target(kind)
         if target is None or not os.path.exists(target):
             logger.debug("Current-version target for %s "
                          "does not exist at %s.", kind, target)
             target = ""
-        matches = pattern.match(os.path.basename(target))
-        if matches:
-            return int(matches.groups()[0])
-        else:
+        version = _version_of(kind, os.path.basename(target))
+        if version is None:
             logger.debug("No matches for target %s.", kind)
-            return None
+        return version
 
     def version(self, kind, version):
         """The filename that corresponds to the specified version and kind.
@@ -696,10 +817,37 @@ class RenewableCert(object):
         if kind not in ALL_FOUR:
             raise errors.CertStorageError("unknown kind of item")
         where = os.path.dirname(self.current_target(kind))
-        files = os.listdir(where)
-        pattern = re.compile(r"^{0}([0-9]+)\.pem$".format(kind))
-        matches = [pattern.match(f) for f in files]
-        return sorted([int(m.groups()[0]) for m in matches if m])
+        return list(self._version_table(where)[kind])
+
+    def _version_table(self, where):
+        """Versions of each kind of item in an archive directory.
+
+        The directory is only listed again once its mtime, link count or
+        size changed, or this lineage saved a successor or updated its
+        links. Comparing more than the mtime catches entries added within
+        the mtime's granularity on filesystems that update the others.
+
+        :param str where: the archive directory
+
+        :returns: the sorted version numbers of each kind of item
+        :rtype: `dict` mapping `str` to `list` of `int`
+
+        """
+        stat = os.stat(where)
+        key = (stat.st_mtime, stat.st_nlink, stat.st_size)
+        cached = self._versions.get(where)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        table = dict((kind, []) for kind in ALL_FOUR)
+        for filename in os.listdir(where):
+            match = _VERSION_PATTERN.match(filename)
+            if match:
+                table[match.group(1)].append(int(match.group(2)))
+        for versions in six.itervalues(table):
+            versions.sort()
+        self._versions[where] = (key, table)
+        return table
 
     def newest_available_version(self, kind):
         """Newest available version of the specified kind of item?
@@ -726,7 +874,7 @@ class RenewableCert(object):
         # TODO: this can raise a spurious AttributeError if the current
         #       link for any kind is missing (it should probably return None)
         versions = [self.available_versions(x) for x in ALL_FOUR]
-        return max(n for n in versions[0] if all(n in v for v in versions[1:]))
+        return max(set(versions[0]).intersection(*versions[1:]))
 
     def next_free_version(self):
         """Smallest version newer than all full or partial versions?
@@ -804,6 +952,7 @@ class RenewableCert(object):
         :param int version: the desired version
 
         """
+        self._versions = {}
         with error_handler.ErrorHandler(self._fix_symlinks):
             previous_links = self._previous_symlinks()
             for kind, link in previous_links:
@@ -815,6 +964,31 @@ class RenewableCert(object):
             for _, link in previous_links:
                 os.unlink(link)
 
+    def roll_back_to(self, version):
+        """Deploy a prior version and set aside the newer versions.
+
+        The newer versions are renamed in the archive so that they are
+        neither deployed again by :meth:`ensure_deployed` nor considered
+        when deciding whether the lineage is due for renewal. Files set
+        aside by an earlier rollback are kept.
+
+        :param int version: the desired version
+
+        """
+        self.update_all_links_to(version)
+        for kind in ALL_FOUR:
+            for newer in self.available_versions(kind):
+                if newer > version:
+                    path = self.version(kind, newer)
+                    aside = path + ".rolledback"
+                    count = 1
+                    while os.path.exists(aside):
+                        aside = "{0}.rolledback.{1}".format(path, count)
+                        count += 1
+                    logger.debug("Setting aside %s as %s", path, aside)
+                    os.rename(path, aside)
+        self._versions = {}
+
     def names(self, version=None):
         """What are the subject names of this certificate?
 
@@ -832,8 +1006,7 @@ class RenewableCert(object):
             target = self.version("cert", version)
         if target is None:
             raise errors.CertStorageError("could not find cert file")
-        with open(target) as f:
-            return crypto_util.get_names_from_cert(f.read())
+        return list(crypto_util.cert_summary(target).names)
 
     def autodeployment_is_enabled(self):
         """Is automatic deployment enabled for this cert?
@@ -875,26 +1048,41 @@ class RenewableCert(object):
         return False
 
     def ocsp_revoked(self, version=None):
-        # pylint: disable=no-self-use,unused-argument
         """Is the specified cert version revoked according to OCSP?
 
-        Also returns True if the cert version is declared as intended
-        to be revoked according to Let's Encrypt OCSP extensions.
         (If no version is specified, uses the current version.)
 
-        This method is not yet implemented and currently always returns
-        False.
+        OCSP responses are cached in the OCSP cache directory until
+        their nextUpdate, so this only queries the responder when the
+        cached status may be out of date. Without the cryptography
+        version needed to check and cache responses, OCSP isn't checked
+        at all, rather than running openssl for every lineage.
 
         :param int version: the desired version number
 
-        :returns: whether the certificate is or will be revoked
+        :returns: whether the certificate is revoked; False if its
+            status couldn't be determined
         :rtype: bool
 
         """
-        # XXX: This query and its associated network service aren't
-        # implemented yet, so we currently return False (indicating that the
-        # certificate is not revoked).
-        return False
+        if version is None:
+            cert_path = self.current_target("cert")
+            chain_path = self.current_target("chain")
+        else:
+            cert_path = self.version("cert", version)
+            chain_path = self.version("chain", version)
+        try:
+            checker = _revocation_checker(self.cli_config.ocsp_cache_dir)
+            if checker.use_openssl_binary:
+                logger.debug("Not checking OCSP for %s, responses can't "
+                             "be cached", cert_path)
+                return False
+            return checker.ocsp_revoked(cert_path, chain_path)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning("An error occurred determining the OCSP status "
+                           "of %s.", cert_path)
+            logger.debug("The error was: %s", error, exc_info=True)
+            return False
 
     def autorenewal_is_enabled(self):
         """Is automatic renewal enabled for this cert?
@@ -913,8 +1101,9 @@ class RenewableCert(object):
 
         This is a policy question and does not only depend on whether
         the cert is expired. (This considers whether autorenewal is
-        enabled, whether the cert is revoked, and whether the time
-        interval for autorenewal has been reached.)
+        enabled, whether the cert is revoked if --renew-revoked was
+        given, and whether the time interval for autorenewal has been
+        reached.)
 
         Note that this examines the numerically most recent cert version,
         not the currently deployed version.
@@ -931,8 +1120,10 @@ class RenewableCert(object):
         if interactive or self.autorenewal_is_enabled():
             # Consider whether to attempt to autorenew this cert now
 
-            # Renewals on the basis of revocation
-            if self.ocsp_revoked(self.latest_common_version()):
+            # Renewals on the basis of revocation. The OCSP check may need
+            # a network request, so it's only done on request.
+            if (self.cli_config.renew_revoked and
+                    self.ocsp_revoked(self.latest_common_version())):
                 logger.debug("Should renew, certificate is revoked.")
                 return True
 
@@ -1124,5 +1315,6 @@ class RenewableCert(object):
         self.configfile = update_configuration(
             self.lineagename, self.archive_dir, symlinks, cli_config)
         self.configuration = config_with_defaults(self.configfile)
+        self._versions = {}
 
         return target_version
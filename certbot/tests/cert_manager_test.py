@@ -1,13 +1,16 @@
 """Tests for certbot.cert_manager."""
 # pylint: disable=protected-access
+import datetime
 import os
 import re
 import shutil
 import tempfile
+import threading
 import unittest
 
 import configobj
 import mock
+import pytz
 
 from certbot import configuration
 from certbot import errors
@@ -122,6 +125,10 @@ class DeleteTest(storage_test.BaseRenewableCertTest):
 class CertificatesTest(BaseCertManagerTest):
     """Tests for certbot.cert_manager.certificates
     """
+    def setUp(self):
+        super(CertificatesTest, self).setUp()
+        self.config.certname = None
+
     def _certificates(self, *args, **kwargs):
         from certbot.cert_manager import certificates
         return certificates(*args, **kwargs)
@@ -156,6 +163,37 @@ class CertificatesTest(BaseCertManagerTest):
         self.assertTrue(mock_utility.called)
         self.assertTrue(mock_renewable_cert.called)
 
+    @mock.patch('certbot.crypto_util.verify_renewable_cert')
+    @test_util.patch_get_utility()
+    @mock.patch("certbot.storage.RenewableCert")
+    @mock.patch('certbot.cert_manager._report_human_readable')
+    def test_certificates_streamed(self, mock_report, mock_renewable_cert,
+                                   mock_utility, unused_verifier):
+        parsed = []
+        def report(unused_config, parsed_certs):
+            """Check each lineage is parsed as it's described"""
+            for cert in parsed_certs:
+                self.assertEqual(mock_renewable_cert.call_count, len(parsed) + 1)
+                parsed.append(cert)
+            return ""
+        mock_report.side_effect = report
+        self._certificates(self.config)
+        self.assertEqual(len(parsed), 2)
+        self.assertTrue(mock_utility.called)
+
+    @mock.patch('certbot.crypto_util.verify_renewable_cert')
+    @test_util.patch_get_utility()
+    @mock.patch("certbot.storage.RenewableCert")
+    @mock.patch('certbot.cert_manager._report_human_readable')
+    def test_certificates_certname_not_parsed(self, mock_report, mock_renewable_cert,
+                                              unused_utility, unused_verifier):
+        self.config.certname = "example.org"
+        mock_report.side_effect = lambda config, certs: str(list(certs))
+        self._certificates(self.config)
+        self.assertEqual(mock_renewable_cert.call_count, 1)
+        self.assertTrue(mock_renewable_cert.call_args[0][0].endswith(
+            "example.org.conf"))
+
     @mock.patch('certbot.cert_manager.logger')
     @test_util.patch_get_utility()
     def test_certificates_no_files(self, mock_utility, mock_logger):
@@ -177,7 +215,6 @@ class CertificatesTest(BaseCertManagerTest):
     def test_report_human_readable(self, mock_revoked):
         mock_revoked.return_value = None
         from certbot import cert_manager
-        import datetime, pytz
         expiry = pytz.UTC.fromutc(datetime.datetime.utcnow())
 
         cert = mock.MagicMock(lineagename="nameone")
@@ -240,11 +277,47 @@ class CertificatesTest(BaseCertManagerTest):
         self.assertEqual(len(re.findall("INVALID:", out)), 0)
 
 
+    @mock.patch('certbot.cert_manager.OCSP_CHECK_TIMEOUT', 0.1)
+    @mock.patch('certbot.cert_manager.OCSP_WORKERS', 2)
+    @mock.patch('certbot.cert_manager.ocsp.RevocationChecker.ocsp_revoked')
+    def test_report_human_readable_concurrent(self, mock_revoked):
+        from certbot import cert_manager
+        expiry = pytz.UTC.fromutc(datetime.datetime.utcnow()) + datetime.timedelta(days=30)
+        certs = []
+        for name in ("one", "slow", "revoked", "four", "five", "six"):
+            cert = mock.MagicMock(lineagename=name, cert=name, is_test_cert=False)
+            cert.target_expiry = expiry
+            cert.names.return_value = [name + ".org"]
+            certs.append(cert)
+
+        release = threading.Event()
+        def ocsp_revoked(cert_path, unused_chain_path):
+            """Block the slow check until the report is made"""
+            if cert_path == "slow":
+                release.wait()
+            return cert_path == "revoked"
+        mock_revoked.side_effect = ocsp_revoked
+
+        mock_config = mock.MagicMock(certname=None, domains=None)
+        try:
+            # pylint: disable=protected-access
+            out = cert_manager._report_human_readable(mock_config, iter(certs))
+        finally:
+            release.set()
+        self.assertEqual(re.findall("Certificate Name: (\\w+)", out),
+                         ["one", "slow", "revoked", "four", "five", "six"])
+        self.assertEqual(len(re.findall("INVALID: REVOKED", out)), 1)
+        self.assertEqual(len(re.findall("VALID: 29 days", out)), 4)
+        self.assertEqual(
+            len(re.findall("UNKNOWN: 29 days, OCSP check timed out", out)), 1)
+        self.assertEqual(mock_revoked.call_count, 6)
+
+
 class SearchLineagesTest(BaseCertManagerTest):
     """Tests for certbot.cert_manager._search_lineages."""
 
     @mock.patch('certbot.util.make_or_verify_dir')
-    @mock.patch('certbot.storage.renewal_conf_files')
+    @mock.patch('certbot.storage.iter_renewal_conf_files')
     @mock.patch('certbot.storage.RenewableCert')
     def test_cert_storage_error(self, mock_renewable_cert, mock_renewal_conf_files,
         mock_make_or_verify_dir):
@@ -376,6 +376,20 @@ class ParseTest(unittest.TestCase):  # pylint: disable=too-many-public-methods
         namespace = self.parse(["--max-log-backups", value])
         self.assertEqual(namespace.max_log_backups, int(value))
 
+    def test_keep_checkpoints_error(self):
+        with mock.patch('certbot.cli.sys.stderr'):
+            for value in ("foo", "0", "-1"):
+                self.assertRaises(
+                    SystemExit, self.parse, ["--keep-checkpoints", value])
+                self.assertRaises(
+                    SystemExit, self.parse, ["--checkpoint-max-age", value])
+
+    def test_keep_checkpoints_success(self):
+        namespace = self.parse(
+            ["--keep-checkpoints", "3", "--checkpoint-max-age", "30"])
+        self.assertEqual(namespace.keep_checkpoints, 3)
+        self.assertEqual(namespace.checkpoint_max_age, 30)
+
 
 class DefaultTest(unittest.TestCase):
     """Tests for certbot.cli._Default."""
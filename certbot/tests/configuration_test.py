@@ -40,10 +40,12 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
     def test_dynamic_dirs(self, constants):
         constants.ACCOUNTS_DIR = 'acc'
         constants.BACKUP_DIR = 'backups'
+        constants.CHECKPOINT_STORE_DIR = 'store'
         constants.CSR_DIR = 'csr'
 
         constants.IN_PROGRESS_DIR = '../p'
         constants.KEY_DIR = 'keys'
+        constants.OCSP_CACHE_DIR = 'ocsp'
         constants.TEMP_CHECKPOINT_DIR = 't'
 
         self.assertEqual(
@@ -51,12 +53,17 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
                 self.config.config_dir, 'acc/acme-server.org:443/new'))
         self.assertEqual(
                 self.config.backup_dir, os.path.join(self.config.work_dir, 'backups'))
+        self.assertEqual(
+                self.config.checkpoint_store_dir,
+                os.path.join(self.config.work_dir, 'store'))
         self.assertEqual(
                 self.config.csr_dir, os.path.join(self.config.config_dir, 'csr'))
         self.assertEqual(
                 self.config.in_progress_dir, os.path.join(self.config.work_dir, '../p'))
         self.assertEqual(
                 self.config.key_dir, os.path.join(self.config.config_dir, 'keys'))
+        self.assertEqual(
+                self.config.ocsp_cache_dir, os.path.join(self.config.work_dir, 'ocsp'))
         self.assertEqual(
                 self.config.temp_checkpoint_dir, os.path.join(self.config.work_dir, 't'))
 
@@ -89,9 +96,11 @@ class NamespaceConfigTest(test_util.ConfigTestCase):
                          os.path.join(os.getcwd(), logs_base))
         self.assertTrue(os.path.isabs(config.accounts_dir))
         self.assertTrue(os.path.isabs(config.backup_dir))
+        self.assertTrue(os.path.isabs(config.checkpoint_store_dir))
         self.assertTrue(os.path.isabs(config.csr_dir))
         self.assertTrue(os.path.isabs(config.in_progress_dir))
         self.assertTrue(os.path.isabs(config.key_dir))
+        self.assertTrue(os.path.isabs(config.ocsp_cache_dir))
         self.assertTrue(os.path.isabs(config.temp_checkpoint_dir))
 
     @mock.patch('certbot.configuration.constants')
@@ -347,6 +347,57 @@ class CertLoaderTest(unittest.TestCase):
             errors.Error, pyopenssl_load_certificate, bad_cert_data)
 
 
+class CertSummaryTest(test_util.TempDirTestCase):
+    """Tests for certbot.crypto_util.cert_summary"""
+
+    def setUp(self):
+        super(CertSummaryTest, self).setUp()
+        self.cert_path = os.path.join(self.tempdir, "cert.pem")
+        with open(self.cert_path, "wb") as f:
+            f.write(CERT)
+
+    @classmethod
+    def _call(cls, cert_path):
+        from certbot.crypto_util import cert_summary
+        return cert_summary(cert_path)
+
+    def test_summary(self):
+        summary = self._call(self.cert_path)
+        self.assertEqual(summary.not_before.isoformat(),
+                         '2014-12-11T22:34:45+00:00')
+        self.assertEqual(summary.not_after.isoformat(),
+                         '2014-12-18T22:34:45+00:00')
+        self.assertEqual(summary.names, ('example.com',))
+        self.assertEqual(summary.issuer,
+                         '/C=US/ST=Michigan/L=Ann Arbor/'
+                         'O=University of Michigan and the EFF/CN=example.com')
+        self.assertEqual(summary.key_type, 'RSA')
+        self.assertEqual(summary.serial, OpenSSL.crypto.load_certificate(
+            OpenSSL.crypto.FILETYPE_PEM, CERT).get_serial_number())
+
+    def test_cached_until_changed(self):
+        with mock.patch('certbot.crypto_util.OpenSSL.crypto.load_certificate',
+                        wraps=OpenSSL.crypto.load_certificate) as mock_load:
+            summary = self._call(self.cert_path)
+            self.assertTrue(self._call(self.cert_path) is summary)
+            self.assertEqual(mock_load.call_count, 1)
+
+            with open(self.cert_path, "wb") as f:
+                f.write(SAN_CERT)
+            self.assertTrue('example.com' in self._call(self.cert_path).names)
+            self.assertTrue(len(self._call(self.cert_path).names) > 1)
+            self.assertEqual(mock_load.call_count, 2)
+
+    @mock.patch('certbot.crypto_util._CERT_SUMMARIES_SIZE', 1)
+    def test_least_recently_used_dropped(self):
+        from certbot import crypto_util
+        self._call(self.cert_path)
+        self._call(CERT_PATH)
+        # pylint: disable=protected-access
+        self.assertEqual([key[0] for key in crypto_util._CERT_SUMMARIES],
+                         [CERT_PATH])
+
+
 class NotBeforeTest(unittest.TestCase):
     """Tests for certbot.crypto_util.notBefore"""
 
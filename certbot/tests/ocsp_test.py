@@ -1,11 +1,25 @@
 """Tests for ocsp.py"""
 # pylint: disable=protected-access
 
+import datetime
+import os
+import threading
 import unittest
 
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
 import mock
+import requests
 
 from certbot import errors
+import certbot.tests.util as test_util
+
+try:
+    from cryptography.x509 import ocsp as ocsp_lib  # pylint: disable=ungrouped-imports
+except ImportError:  # pragma: no cover
+    ocsp_lib = None
 
 out = """Missing = in header key=value
 ocsp: Use -help for summary.
@@ -23,7 +37,8 @@ class OCSPTest(unittest.TestCase):
                 mock_communicate.communicate.return_value = (None, out)
                 mock_popen.return_value = mock_communicate
                 mock_exists.return_value = True
-                self.checker = ocsp.RevocationChecker()
+                self.checker = ocsp.RevocationChecker(
+                    enforce_openssl_binary_usage=True)
 
     def tearDown(self):
         pass
@@ -38,18 +53,18 @@ class OCSPTest(unittest.TestCase):
         mock_exists.return_value = True
 
         from certbot import ocsp
-        checker = ocsp.RevocationChecker()
+        checker = ocsp.RevocationChecker(True)
         self.assertEqual(mock_popen.call_count, 1)
         self.assertEqual(checker.host_args("x"), ["Host=x"])
 
         mock_communicate.communicate.return_value = (None, out.partition("\n")[2])
-        checker = ocsp.RevocationChecker()
+        checker = ocsp.RevocationChecker(True)
         self.assertEqual(checker.host_args("x"), ["Host", "x"])
         self.assertEqual(checker.broken, False)
 
         mock_exists.return_value = False
         mock_popen.call_count = 0
-        checker = ocsp.RevocationChecker()
+        checker = ocsp.RevocationChecker(True)
         self.assertEqual(mock_popen.call_count, 0)
         self.assertEqual(mock_log.call_count, 1)
         self.assertEqual(checker.broken, True)
@@ -68,26 +83,12 @@ class OCSPTest(unittest.TestCase):
 
         mock_determine.return_value = ("http://x.co", "x.co")
         self.assertEqual(self.checker.ocsp_revoked("blah.pem", "chain.pem"), False)
+        self.assertTrue("-timeout" in mock_run.call_args[0][0])
         mock_run.side_effect = errors.SubprocessError("Unable to load certificate launcher")
         self.assertEqual(self.checker.ocsp_revoked("x", "y"), False)
         self.assertEqual(mock_run.call_count, 2)
 
 
-    @mock.patch('certbot.ocsp.logger.info')
-    @mock.patch('certbot.util.run_script')
-    def test_determine_ocsp_server(self, mock_run, mock_info):
-        uri = "http://ocsp.stg-int-x1.letsencrypt.org/"
-        host = "ocsp.stg-int-x1.letsencrypt.org"
-        mock_run.return_value = uri, ""
-        self.assertEqual(self.checker.determine_ocsp_server("beep"), (uri, host))
-        mock_run.return_value = "ftp:/" + host + "/", ""
-        self.assertEqual(self.checker.determine_ocsp_server("beep"), (None, None))
-        self.assertEqual(mock_info.call_count, 1)
-
-        c = "confusion"
-        mock_run.side_effect = errors.SubprocessError(c)
-        self.assertEqual(self.checker.determine_ocsp_server("beep"), (None, None))
-
     @mock.patch('certbot.ocsp.logger')
     @mock.patch('certbot.util.run_script')
     def test_translate_ocsp(self, mock_run, mock_log):
@@ -113,6 +114,288 @@ class OCSPTest(unittest.TestCase):
         self.assertEqual(mock_log.info.call_count, 1)
 
 
+def _make_cert(subject, key, issuer=None, issuer_key=None, ocsp_url=None,
+               ocsp_signing=False):
+    """Make a cert for subject, self signed unless issuer is given."""
+    issuer = issuer or subject
+    issuer_key = issuer_key or key
+    now = datetime.datetime.utcnow()
+    builder = x509.CertificateBuilder().subject_name(
+        x509.Name([x509.NameAttribute(x509.oid.NameOID.COMMON_NAME, subject)])
+    ).issuer_name(
+        x509.Name([x509.NameAttribute(x509.oid.NameOID.COMMON_NAME, issuer)])
+    ).public_key(key.public_key()).serial_number(
+        x509.random_serial_number()
+    ).not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(
+        now + datetime.timedelta(days=90))
+    if ocsp_url:
+        builder = builder.add_extension(x509.AuthorityInformationAccess([
+            x509.AccessDescription(x509.OID_OCSP,
+                                   x509.UniformResourceIdentifier(ocsp_url))]),
+                                        critical=False)
+    if ocsp_signing:
+        builder = builder.add_extension(x509.ExtendedKeyUsage(
+            [x509.oid.ExtendedKeyUsageOID.OCSP_SIGNING]), critical=False)
+    return builder.sign(issuer_key, hashes.SHA256(), default_backend())
+
+
+class OCSPResponderStandIn(object):
+    """Answers OCSP requests for certs issued by one CA.
+
+    Stands in for :meth:`requests.Session.post`.
+
+    """
+    def __init__(self, issuer, issuer_key):
+        self.issuer = issuer
+        self.responder = issuer
+        self.responder_key = issuer_key
+        self.status = {}
+        self.certs = {}
+        self.next_update = datetime.timedelta(days=7)
+        self.requests = []
+
+    def add_cert(self, cert, status):
+        """Answer for cert with status."""
+        self.certs[cert.serial_number] = cert
+        self.status[cert.serial_number] = status
+
+    def __call__(self, url, data, headers, timeout):
+        # pylint: disable=unused-argument
+        self.requests.append(url)
+        request = ocsp_lib.load_der_ocsp_request(data)
+        status = self.status[request.serial_number]
+        now = datetime.datetime.utcnow()
+        revoked = status == ocsp_lib.OCSPCertStatus.REVOKED
+        builder = ocsp_lib.OCSPResponseBuilder().add_response(
+            cert=self.certs[request.serial_number], issuer=self.issuer,
+            algorithm=hashes.SHA1(), cert_status=status,
+            this_update=now - datetime.timedelta(hours=1),
+            next_update=now + self.next_update,
+            revocation_time=now if revoked else None,
+            revocation_reason=None).responder_id(
+                ocsp_lib.OCSPResponderEncoding.HASH, self.responder)
+        if self.responder is not self.issuer:
+            builder = builder.certificates([self.responder])
+        response = builder.sign(self.responder_key, hashes.SHA256())
+        return mock.MagicMock(status_code=200, content=response.public_bytes(
+            serialization.Encoding.DER))
+
+
+@unittest.skipIf(ocsp_lib is None, "cryptography can't do OCSP")
+class OCSPCryptographyTest(test_util.TempDirTestCase):
+    """Tests for OCSP checks done with cryptography."""
+
+    _multiprocess_can_split_ = True
+
+    @classmethod
+    def setUpClass(cls):
+        cls.issuer_key = rsa.generate_private_key(65537, 1024, default_backend())
+        cls.issuer = _make_cert(u"Test CA", cls.issuer_key)
+        cls.cert_key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        cls.cert = _make_cert(u"example.com", cls.cert_key, u"Test CA",
+                              cls.issuer_key, ocsp_url=u"http://ocsp.test.org/")
+
+    def setUp(self):
+        super(OCSPCryptographyTest, self).setUp()
+        from certbot import ocsp
+        self.checker = ocsp.RevocationChecker()
+        self.responder = OCSPResponderStandIn(self.issuer, self.issuer_key)
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.GOOD)
+        self.checker.session = mock.MagicMock()
+        self.checker.session.post.side_effect = self.responder
+        self.cert_path = self._write("cert.pem", self.cert)
+        self.chain_path = self._write("chain.pem", self.issuer)
+
+    def _write(self, name, cert):
+        path = os.path.join(self.tempdir, name)
+        with open(path, "wb") as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        return path
+
+    def _revoked(self):
+        return self.checker.ocsp_revoked(self.cert_path, self.chain_path)
+
+    @mock.patch('certbot.util.exe_exists')
+    def test_init(self, mock_exists):
+        from certbot import ocsp
+        checker = ocsp.RevocationChecker()
+        self.assertFalse(checker.use_openssl_binary)
+        self.assertFalse(checker.broken)
+        self.assertTrue(isinstance(checker.session, requests.Session))
+        self.assertFalse(mock_exists.called)
+
+    def test_session_per_thread(self):
+        from certbot import ocsp
+        checker = ocsp.RevocationChecker()
+        session = checker.session
+        self.assertTrue(checker.session is session)
+        sessions = []
+        thread = threading.Thread(
+            target=lambda: sessions.append(checker.session))
+        thread.start()
+        thread.join()
+        self.assertTrue(isinstance(sessions[0], requests.Session))
+        self.assertFalse(sessions[0] is session)
+
+    def test_determine_ocsp_server(self):
+        self.assertEqual(self.checker.determine_ocsp_server(self.cert_path),
+                         ("http://ocsp.test.org/", "ocsp.test.org"))
+        self.assertEqual(self.checker.determine_ocsp_server(self.chain_path),
+                         (None, None))
+        self.assertEqual(self.checker.determine_ocsp_server(
+            os.path.join(self.tempdir, "missing.pem")), (None, None))
+
+        ftp_cert = _make_cert(u"example.com", self.cert_key, u"Test CA",
+                              self.issuer_key, ocsp_url=u"ftp:/ocsp.test.org/")
+        self.assertEqual(self.checker.determine_ocsp_server(
+            self._write("ftp.pem", ftp_cert)), (None, None))
+
+    def test_good(self):
+        self.assertFalse(self._revoked())
+        self.assertEqual(self.responder.requests, ["http://ocsp.test.org/"])
+
+    def test_revoked(self):
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.REVOKED)
+        self.assertTrue(self._revoked())
+
+    @mock.patch('certbot.ocsp.logger.info')
+    def test_unknown(self, mock_info):
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.UNKNOWN)
+        self.assertFalse(self._revoked())
+        self.assertTrue(mock_info.called)
+
+    def test_delegated_responder(self):
+        responder_key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        self.responder.responder_key = responder_key
+        self.responder.responder = _make_cert(
+            u"Test OCSP", responder_key, u"Test CA", self.issuer_key,
+            ocsp_signing=True)
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.REVOKED)
+        self.assertTrue(self._revoked())
+
+        # Not allowed to sign OCSP responses
+        self.responder.responder = _make_cert(
+            u"Test OCSP", responder_key, u"Test CA", self.issuer_key)
+        self.assertFalse(self._revoked())
+
+        # Not issued by the issuer
+        self.responder.responder = _make_cert(
+            u"Test OCSP", responder_key, ocsp_signing=True)
+        self.assertFalse(self._revoked())
+
+    def test_bad_signature(self):
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.REVOKED)
+        def tampered(*args, **kwargs):
+            """Flip a bit of the signature, which ends the response."""
+            response = self.responder(*args, **kwargs)
+            content = bytearray(response.content)
+            content[-1] ^= 1
+            response.content = bytes(content)
+            return response
+        self.checker.session.post.side_effect = tampered
+        self.assertFalse(self._revoked())
+
+    def test_eddsa_signature(self):
+        from certbot import ocsp
+        class EdDSAPublicKey(object):
+            """Stand-in for an Ed25519 or Ed448 public key."""
+            verify = mock.MagicMock()
+        cert = mock.MagicMock()
+        cert.public_key.return_value = EdDSAPublicKey()
+        with mock.patch('certbot.ocsp._EDDSA_PUBLIC_KEYS', (EdDSAPublicKey,)):
+            ocsp._check_signature(cert, b'signature', b'data', None)
+        EdDSAPublicKey.verify.assert_called_once_with(b'signature', b'data')
+
+    def test_stale_response(self):
+        self.responder.next_update = -datetime.timedelta(days=1)
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.REVOKED)
+        self.assertFalse(self._revoked())
+
+    def test_wrong_cert(self):
+        other = _make_cert(u"example.org", self.cert_key, u"Test CA",
+                           self.issuer_key, ocsp_url=u"http://ocsp.test.org/")
+        self.responder.add_cert(other, ocsp_lib.OCSPCertStatus.REVOKED)
+        original = self.responder.__call__
+        def answer_for_other(url, data, headers, timeout):
+            """Answer about other instead of the requested cert."""
+            request = ocsp_lib.OCSPRequestBuilder().add_certificate(
+                other, self.issuer, hashes.SHA1()).build()
+            return original(url, request.public_bytes(serialization.Encoding.DER),
+                            headers, timeout)
+        self.checker.session.post.side_effect = answer_for_other
+        self.assertFalse(self._revoked())
+
+    def test_responder_errors(self):
+        self.checker.session.post.side_effect = requests.exceptions.ConnectionError
+        self.assertFalse(self._revoked())
+
+        self.checker.session.post.side_effect = None
+        self.checker.session.post.return_value = mock.MagicMock(status_code=500)
+        self.assertFalse(self._revoked())
+
+        self.checker.session.post.return_value = mock.MagicMock(
+            status_code=200, content=b"tentacles")
+        self.assertFalse(self._revoked())
+
+        self.checker.session.post.return_value = mock.MagicMock(
+            status_code=200, content=ocsp_lib.OCSPResponseBuilder.build_unsuccessful(
+                ocsp_lib.OCSPResponseStatus.TRY_LATER).public_bytes(
+                    serialization.Encoding.DER))
+        self.assertFalse(self._revoked())
+
+    def test_cached(self):
+        self.checker.cache_dir = os.path.join(self.tempdir, "ocsp")
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.REVOKED)
+        self.assertTrue(self._revoked())
+        self.assertEqual(len(os.listdir(self.checker.cache_dir)), 1)
+        self.assertTrue(self._revoked())
+        self.assertEqual(len(self.responder.requests), 1)
+
+        # A checker in a later run uses the cached response too
+        from certbot import ocsp
+        checker = ocsp.RevocationChecker(cache_dir=self.checker.cache_dir)
+        checker.session = self.checker.session
+        self.assertTrue(checker.ocsp_revoked(self.cert_path, self.chain_path))
+        self.assertEqual(len(self.responder.requests), 1)
+
+    def test_cache_expired(self):
+        self.checker.cache_dir = os.path.join(self.tempdir, "ocsp")
+        # Still allowed for clock skew, but not worth caching
+        self.responder.next_update = -datetime.timedelta(minutes=1)
+        self.assertFalse(self._revoked())
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.REVOKED)
+        self.assertTrue(self._revoked())
+        self.assertEqual(len(self.responder.requests), 2)
+
+    def test_cache_corrupt(self):
+        self.checker.cache_dir = os.path.join(self.tempdir, "ocsp")
+        self.assertFalse(self._revoked())
+        for name in os.listdir(self.checker.cache_dir):
+            with open(os.path.join(self.checker.cache_dir, name), "wb") as f:
+                f.write(b"tentacles")
+        self.responder.add_cert(self.cert, ocsp_lib.OCSPCertStatus.REVOKED)
+        self.assertTrue(self._revoked())
+        self.assertEqual(len(self.responder.requests), 2)
+
+    def test_cache_unwritable(self):
+        self.checker.cache_dir = os.path.join(self.tempdir, "file")
+        open(self.checker.cache_dir, "w").close()
+        self.assertFalse(self._revoked())
+        self.assertFalse(self._revoked())
+        self.assertEqual(len(self.responder.requests), 2)
+
+    def test_not_cached_by_default(self):
+        self.assertFalse(self._revoked())
+        self.assertFalse(self._revoked())
+        self.assertEqual(len(self.responder.requests), 2)
+        self.assertEqual(sorted(os.listdir(self.tempdir)), ["cert.pem", "chain.pem"])
+
+    def test_missing_chain(self):
+        self.chain_path = os.path.join(self.tempdir, "missing.pem")
+        self.assertFalse(self._revoked())
+        self.assertFalse(self.checker.session.post.called)
+
+
 # pylint: disable=line-too-long
 openssl_confused = ("", """
 /etc/letsencrypt/live/example.org/cert.pem: good
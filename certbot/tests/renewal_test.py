@@ -1,4 +1,6 @@
 """Tests for certbot.renewal"""
+import argparse
+
 import mock
 import unittest
 
@@ -32,6 +34,63 @@ class RenewalTest(test_util.ConfigTestCase):
         self.assertEqual(config.webroot_path, ['/var/www/'])
 
 
+class UndueLineageTest(test_util.ConfigTestCase):
+    """Tests for certbot.renewal._undue_lineage."""
+    def setUp(self):
+        super(UndueLineageTest, self).setUp()
+        self.rc_path = test_util.make_lineage(
+            self.config.config_dir, 'sample-renewal.conf')
+        self.config.renew_by_default = False
+        self.config.dry_run = False
+
+    def _call(self):
+        from certbot.renewal import _undue_lineage
+        return _undue_lineage(self.config, self.rc_path)
+
+    @mock.patch('certbot.renewal.cli.argparse_type')
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    @mock.patch('certbot.storage.RenewableCert.should_autorenew')
+    def test_not_due(self, mock_should_autorenew, mock_set_by_cli,
+                     mock_argparse_type):
+        mock_should_autorenew.return_value = False
+        mock_set_by_cli.return_value = False
+        mock_argparse_type.return_value = str
+        lineage = self._call()
+        self.assertEqual(lineage.lineagename, "sample-renewal")
+        mock_should_autorenew.assert_called_once_with(interactive=True)
+
+    @mock.patch('certbot.storage.RenewableCert.should_autorenew')
+    def test_due(self, mock_should_autorenew):
+        mock_should_autorenew.return_value = True
+        self.assertTrue(self._call() is None)
+
+    @mock.patch('certbot.storage.RenewableCert.should_autorenew')
+    def test_forced(self, mock_should_autorenew):
+        self.config.dry_run = True
+        self.assertTrue(self._call() is None)
+        self.config.dry_run = False
+        self.config.renew_by_default = True
+        self.assertTrue(self._call() is None)
+        self.assertFalse(mock_should_autorenew.called)
+
+    def test_broken(self):
+        self.rc_path += ".missing"
+        self.assertTrue(self._call() is None)
+
+    @mock.patch('certbot.renewal.cli.set_by_cli')
+    @mock.patch('certbot.storage.RenewableCert.should_autorenew')
+    def test_bad_renewalparams(self, mock_should_autorenew, mock_set_by_cli):
+        mock_should_autorenew.return_value = False
+        mock_set_by_cli.return_value = False
+        with open(self.rc_path) as f:
+            contents = f.read()
+        with open(self.rc_path, 'w') as f:
+            f.write(contents.replace('rsa_key_size = 2048',
+                                     'rsa_key_size = huge'))
+        self.assertTrue(self._call() is None)
+        self.assertFalse(mock_should_autorenew.called)
+
+
 class RestoreRequiredConfigElementsTest(test_util.ConfigTestCase):
     """Tests for certbot.renewal.restore_required_config_elements."""
     def setUp(self):
@@ -91,5 +150,141 @@ class RestoreRequiredConfigElementsTest(test_util.ConfigTestCase):
         self.assertRaises(
             errors.Error, self._call, self.config, renewalparams)
 
+
+class RestartInstallersTest(unittest.TestCase):
+    """Tests for certbot.renewal._restart_installers."""
+
+    def setUp(self):
+        self.installer = mock.MagicMock()
+        self.installer.name = "apache"
+        self.lineages = []
+        for i in range(3):
+            lineage = mock.MagicMock(fullchain="fullchain{0}".format(i))
+            lineage.latest_common_version.return_value = 2
+            self.lineages.append(lineage)
+        self.successes = [lineage.fullchain for lineage in self.lineages]
+        self.failures = []
+
+        patcher = mock.patch("certbot.renewal.zope.component.getUtility")
+        self.mock_notify = patcher.start().return_value.notification
+        self.addCleanup(patcher.stop)
+
+    def _call(self):
+        # pylint: disable=protected-access
+        from certbot.renewal import _restart_installers
+        restarts = {("apache", ()): (
+            self.installer, [(lineage, 1) for lineage in self.lineages])}
+        _restart_installers(restarts, self.successes, self.failures)
+
+    def _notified(self):
+        return [call[0][0].split()[-1]
+                for call in self.mock_notify.call_args_list]
+
+    def test_restart_once(self):
+        self._call()
+        self.assertEqual(self.installer.restart.call_count, 1)
+        self.assertEqual(len(self.successes), 3)
+        self.assertEqual(self.failures, [])
+        self.assertEqual(self._notified(), self.successes)
+
+    def test_rollback_until_restarted(self):
+        self.installer.restart.side_effect = [
+            errors.PluginError, errors.PluginError, None]
+        self._call()
+
+        self.assertEqual(self.installer.restart.call_count, 3)
+        self.assertEqual(self.successes, ["fullchain0"])
+        self.assertEqual(self.failures, ["fullchain2", "fullchain1"])
+        self.lineages[2].update_all_links_to.assert_called_once_with(1)
+        self.lineages[2].roll_back_to.assert_called_once_with(1)
+        self.lineages[1].roll_back_to.assert_called_once_with(1)
+        self.assertFalse(self.lineages[0].update_all_links_to.called)
+        self.assertFalse(self.lineages[0].roll_back_to.called)
+        self.assertEqual(self._notified(), ["fullchain0"])
+
+    def test_restart_fails_regardless(self):
+        self.installer.restart.side_effect = errors.PluginError
+        self._call()
+        self.assertEqual(self.installer.restart.call_count, 4)
+        self.assertEqual(len(self.successes), 3)
+        self.assertEqual(self.failures, [])
+        for lineage in self.lineages:
+            self.assertFalse(lineage.roll_back_to.called)
+            self.assertEqual(lineage.update_all_links_to.call_args_list,
+                             [mock.call(1), mock.call(2)])
+        self.assertEqual(self.mock_notify.call_count, 1)
+        self.assertTrue("apache" in self.mock_notify.call_args[0][0])
+
+    def test_restart_unexpected_error(self):
+        # pylint: disable=protected-access
+        from certbot.renewal import OrderedDict, _restart_installers
+        second = mock.MagicMock()
+        second.restart.side_effect = OSError
+        lineage = mock.MagicMock(fullchain="fullchain3")
+        lineage.latest_common_version.return_value = 2
+        self.successes.append(lineage.fullchain)
+        restarts = OrderedDict()
+        restarts[("nginx", ())] = (second, [(lineage, 1)])
+        restarts[("apache", ())] = (
+            self.installer, [(lineage, 1) for lineage in self.lineages])
+        _restart_installers(restarts, self.successes, self.failures)
+
+        self.assertEqual(second.restart.call_count, 2)
+        self.assertEqual(self.installer.restart.call_count, 1)
+        self.assertEqual(len(self.successes), 4)
+        self.assertEqual(self._notified()[-3:], self.successes[:3])
+
+    def test_relink_error(self):
+        self.installer.restart.side_effect = [errors.PluginError, None]
+        self.lineages[2].update_all_links_to.side_effect = OSError
+        self._call()
+
+        self.assertEqual(self.installer.restart.call_count, 2)
+        self.assertEqual(self.successes, ["fullchain0"])
+        self.assertEqual(self.failures, ["fullchain2", "fullchain1"])
+        self.assertEqual(self._notified(), ["fullchain0"])
+
+    def test_rollback_error(self):
+        self.installer.restart.side_effect = [errors.PluginError, None]
+        self.lineages[2].roll_back_to.side_effect = OSError
+        self._call()
+
+        self.assertEqual(self.installer.restart.call_count, 2)
+        self.assertEqual(self.successes, ["fullchain0", "fullchain1"])
+        self.assertEqual(self.failures, ["fullchain2"])
+        self.assertEqual(self._notified(), ["fullchain0", "fullchain1"])
+
+    def test_dry_run_not_rolled_back(self):
+        self.installer.restart.side_effect = [errors.PluginError, None]
+        for lineage in self.lineages:
+            lineage.latest_common_version.return_value = 1
+        self._call()
+        self.assertFalse(self.lineages[2].roll_back_to.called)
+        self.assertEqual(self.failures, ["fullchain2"])
+
+
+class InstallerKeyTest(unittest.TestCase):
+    """Tests for certbot.renewal._installer_key."""
+
+    def _call(self, **kwargs):
+        # pylint: disable=protected-access
+        from certbot.renewal import _installer_key
+        config = configuration.NamespaceConfig(argparse.Namespace(
+            config_dir="/etc/letsencrypt", work_dir="/var/lib/letsencrypt",
+            logs_dir="/var/log/letsencrypt", http01_port=80,
+            tls_sni_01_port=443, installer="nginx", domains=[], **kwargs))
+        return _installer_key(config, mock.MagicMock())
+
+    def test_same_options(self):
+        self.assertEqual(
+            self._call(nginx_server_root="/etc/nginx", rsa_key_size=2048),
+            self._call(nginx_server_root="/etc/nginx", rsa_key_size=4096))
+
+    def test_different_options(self):
+        self.assertNotEqual(
+            self._call(nginx_server_root="/etc/nginx"),
+            self._call(nginx_server_root="/opt/nginx"))
+
+
 if __name__ == "__main__":
     unittest.main()  # pragma: no cover
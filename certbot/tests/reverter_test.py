@@ -24,6 +24,9 @@ class ReverterCheckpointLocalTest(test_util.ConfigTestCase):
         # Disable spurious errors... we are trying to test for them
         logging.disable(logging.CRITICAL)
 
+        self.config.checkpoint_store = False
+        self.config.keep_checkpoints = None
+        self.config.checkpoint_max_age = None
         self.reverter = Reverter(self.config)
 
         tup = setup_test_files()
@@ -286,6 +289,9 @@ class TestFullCheckpointsReverter(test_util.ConfigTestCase):
         # Disable spurious errors...
         logging.disable(logging.CRITICAL)
 
+        self.config.checkpoint_store = False
+        self.config.keep_checkpoints = None
+        self.config.checkpoint_max_age = None
         self.reverter = Reverter(self.config)
 
         tup = setup_test_files()
@@ -410,6 +416,60 @@ class TestFullCheckpointsReverter(test_util.ConfigTestCase):
         self.assertTrue("Second Checkpoint" in config_changes)
         self.assertTrue("Third Checkpoint" in config_changes)
 
+    def test_rollback_uses_index(self):
+        self._setup_three_checkpoints()
+
+        with mock.patch("certbot.reverter.os.listdir",
+                        wraps=os.listdir) as mock_listdir:
+            self.reverter.rollback_checkpoints(1)
+            changes = self.reverter.view_config_changes(
+                for_logging=True, num=1)
+        self.assertFalse(
+            mock.call(self.config.backup_dir) in mock_listdir.call_args_list)
+        self.assertTrue("Second Checkpoint" in changes)
+        self.assertEqual(len(os.listdir(self.config.backup_dir)), 2)
+
+    def test_index_corrupt(self):
+        self._setup_three_checkpoints()
+        update_file(self.config.backup_dir + ".index", "garbage")
+
+        self.reverter.rollback_checkpoints(3)
+        self.assertEqual(read_in(self.config1), "directive-dir1")
+        self.assertEqual(read_in(self.config2), "directive-dir2")
+
+    def test_keep_checkpoints(self):
+        self.config.keep_checkpoints = 2
+        self._setup_three_checkpoints()
+
+        self.assertEqual(len(os.listdir(self.config.backup_dir)), 2)
+        self.reverter.rollback_checkpoints(3)
+        # The first checkpoint was removed, so config1 keeps its update
+        self.assertEqual(read_in(self.config1), "update config1")
+        self.assertEqual(read_in(self.config2), "directive-dir2")
+
+    def test_checkpoint_max_age(self):
+        self.config.checkpoint_max_age = 1
+        os.makedirs(os.path.join(self.config.backup_dir, "1000.0"))
+        self.reverter.add_to_checkpoint(self.sets[0], "save")
+        self.reverter.finalize_checkpoint("Checkpoint")
+
+        backups = os.listdir(self.config.backup_dir)
+        self.assertEqual(len(backups), 1)
+        self.assertNotEqual(backups[0], "1000.0")
+
+    @mock.patch("certbot.reverter.shutil.rmtree")
+    def test_remove_expired_checkpoints_failure(self, mock_rmtree):
+        mock_rmtree.side_effect = OSError
+        self.config.keep_checkpoints = 1
+        self._setup_three_checkpoints()
+
+        self.assertEqual(len(os.listdir(self.config.backup_dir)), 3)
+        # The index still lists the checkpoints that weren't removed
+        with mock.patch("certbot.reverter.os.listdir") as mock_listdir:
+            changes = self.reverter.view_config_changes(for_logging=True)
+        self.assertFalse(mock_listdir.called)
+        self.assertTrue("First Checkpoint" in changes)
+
     def _setup_three_checkpoints(self):
         """Generate some finalized checkpoints."""
         # Checkpoint1 - config1
@@ -439,6 +499,108 @@ class TestFullCheckpointsReverter(test_util.ConfigTestCase):
         return config3
 
 
+class CheckpointStoreTest(test_util.ConfigTestCase):
+    """Tests for checkpoints using the checkpoint store."""
+    def setUp(self):
+        super(CheckpointStoreTest, self).setUp()
+        from certbot.reverter import Reverter
+        logging.disable(logging.CRITICAL)
+
+        self.config.checkpoint_store = True
+        self.config.keep_checkpoints = None
+        self.config.checkpoint_max_age = None
+        self.reverter = Reverter(self.config)
+
+        tup = setup_test_files()
+        self.config1, self.config2, self.dir1, self.dir2, self.sets = tup
+
+    def tearDown(self):
+        shutil.rmtree(self.config.work_dir)
+        shutil.rmtree(self.dir1)
+        shutil.rmtree(self.dir2)
+
+        logging.disable(logging.NOTSET)
+
+    def _checkpoint_copy(self, cp_dir):
+        return os.path.join(cp_dir, "config.txt_0")
+
+    def _finalized_copy(self):
+        cp_dir, = os.listdir(self.config.backup_dir)
+        return self._checkpoint_copy(
+            os.path.join(self.config.backup_dir, cp_dir))
+
+    def test_unchanged_file_stored_once(self):
+        self.reverter.add_to_checkpoint(self.sets[0], "first save")
+        self.reverter.finalize_checkpoint("First Checkpoint")
+        self.reverter.add_to_checkpoint(self.sets[0], "second save")
+
+        second = self._checkpoint_copy(self.config.in_progress_dir)
+        self.assertEqual(len(os.listdir(self.config.checkpoint_store_dir)), 1)
+        self.assertTrue(os.path.samefile(self._finalized_copy(), second))
+        self.assertEqual(read_in(second), "directive-dir1")
+
+    def test_changed_file_stored_again(self):
+        self.reverter.add_to_checkpoint(self.sets[0], "first save")
+        self.reverter.finalize_checkpoint("First Checkpoint")
+        update_file(self.config1, "update config1")
+        self.reverter.add_to_checkpoint(self.sets[0], "second save")
+
+        self.assertEqual(len(os.listdir(self.config.checkpoint_store_dir)), 2)
+        self.assertEqual(read_in(self._finalized_copy()), "directive-dir1")
+        self.assertEqual(read_in(self._checkpoint_copy(
+            self.config.in_progress_dir)), "update config1")
+
+    def test_mode_stored_separately(self):
+        update_file(self.config2, "directive-dir1")
+        os.chmod(self.config1, 0o600)
+        os.chmod(self.config2, 0o644)
+        self.reverter.add_to_checkpoint(self.sets[2], "save")
+
+        self.assertEqual(len(os.listdir(self.config.checkpoint_store_dir)), 2)
+
+    def test_rollback(self):
+        self.reverter.add_to_checkpoint(self.sets[2], "save")
+        self.reverter.finalize_checkpoint("Checkpoint")
+        update_file(self.config1, "update config1")
+        update_file(self.config2, "update config2")
+
+        self.reverter.rollback_checkpoints(1)
+
+        self.assertEqual(read_in(self.config1), "directive-dir1")
+        self.assertEqual(read_in(self.config2), "directive-dir2")
+        self.assertFalse(os.path.samefile(
+            self.config1, self.config2))
+        # Nothing refers to the stored copies anymore
+        self.assertEqual(os.listdir(self.config.checkpoint_store_dir), [])
+
+    def test_prune_keeps_linked(self):
+        self.reverter.add_to_temp_checkpoint(self.sets[0], "save")
+        self.reverter.add_to_checkpoint(self.sets[1], "save")
+        self.reverter.revert_temporary_config()
+
+        stored = os.listdir(self.config.checkpoint_store_dir)
+        self.assertEqual(len(stored), 1)
+        self.assertTrue(os.path.samefile(
+            os.path.join(self.config.checkpoint_store_dir, stored[0]),
+            self._checkpoint_copy(self.config.in_progress_dir)))
+
+    @mock.patch("certbot.reverter.os.link")
+    def test_link_fails(self, mock_link):
+        mock_link.side_effect = OSError
+        self.reverter.add_to_checkpoint(self.sets[0], "save")
+
+        self.assertEqual(read_in(self._checkpoint_copy(
+            self.config.in_progress_dir)), "directive-dir1")
+
+    @mock.patch("certbot.reverter.shutil.copy2")
+    def test_store_fails(self, mock_copy2):
+        mock_copy2.side_effect = IOError
+        self.assertRaises(
+            errors.ReverterError, self.reverter.add_to_checkpoint,
+            self.sets[0], "save")
+        self.assertEqual(os.listdir(self.config.checkpoint_store_dir), [])
+
+
 def setup_test_files():
     """Setup sample configuration files."""
     dir1 = tempfile.mkdtemp("dir1")
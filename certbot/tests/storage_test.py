@@ -255,6 +255,37 @@ class RenewableCertTests(BaseRenewableCertTest):
         self.assertEqual(self.test_rc.latest_common_version(), 17)
         self.assertEqual(self.test_rc.next_free_version(), 18)
 
+    def test_available_versions_listed_once(self):
+        for ver in six.moves.range(1, 4):
+            for kind in ALL_FOUR:
+                self._write_out_kind(kind, ver)
+        with mock.patch("certbot.storage.os.listdir",
+                        wraps=os.listdir) as mock_listdir:
+            self.assertEqual(self.test_rc.latest_common_version(), 3)
+            self.assertEqual(self.test_rc.next_free_version(), 4)
+            self.assertFalse(self.test_rc.has_pending_deployment())
+            self.assertEqual(mock_listdir.call_count, 1)
+
+            self.test_rc.update_all_links_to(2)
+            self.assertEqual(self.test_rc.available_versions("cert"),
+                             [1, 2, 3])
+            self.assertEqual(mock_listdir.call_count, 2)
+
+    def test_available_versions_relisted(self):
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+        stat = os.stat(self.test_rc.archive_dir)
+        with mock.patch("certbot.storage.os.stat") as mock_stat:
+            mock_stat.return_value = stat
+            self.assertEqual(self.test_rc.available_versions("cert"), [1])
+            self._write_out_kind("cert", 2)
+            self.assertEqual(self.test_rc.available_versions("cert"), [1])
+
+            mock_stat.return_value = mock.MagicMock(
+                st_mtime=stat.st_mtime, st_nlink=stat.st_nlink + 1,
+                st_size=stat.st_size)
+            self.assertEqual(self.test_rc.available_versions("cert"), [1, 2])
+
     @mock.patch("certbot.storage.logger")
     def test_ensure_deployed(self, mock_logger):
         mock_update = self.test_rc.update_all_links_to = mock.Mock()
@@ -344,6 +375,30 @@ class RenewableCertTests(BaseRenewableCertTest):
         for kind in ALL_FOUR:
             self.assertEqual(self.test_rc.current_version(kind), 11)
 
+    def test_roll_back_to(self):
+        for ver in six.moves.range(1, 4):
+            for kind in ALL_FOUR:
+                self._write_out_kind(kind, ver)
+        self.test_rc.roll_back_to(1)
+
+        for kind in ALL_FOUR:
+            self.assertEqual(self.test_rc.current_version(kind), 1)
+            self.assertEqual(self.test_rc.available_versions(kind), [1])
+            self.assertTrue(os.path.exists(
+                self.test_rc.version(kind, 3) + ".rolledback"))
+        self.assertFalse(self.test_rc.has_pending_deployment())
+        self.assertTrue(self.test_rc.ensure_deployed())
+
+        # The version is reused, earlier rolled back files are kept
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 2)
+        self.test_rc.roll_back_to(1)
+        for kind in ALL_FOUR:
+            self.assertTrue(os.path.exists(
+                self.test_rc.version(kind, 2) + ".rolledback"))
+            self.assertTrue(os.path.exists(
+                self.test_rc.version(kind, 2) + ".rolledback.1"))
+
     def test_has_pending_deployment(self):
         for ver in six.moves.range(1, 6):
             for kind in ALL_FOUR:
@@ -467,7 +522,16 @@ class RenewableCertTests(BaseRenewableCertTest):
             self._write_out_kind(kind, 12)
         # Mandatory renewal on the basis of OCSP revocation
         mock_ocsp.return_value = True
+        self.config.renew_revoked = True
         self.assertTrue(self.test_rc.should_autorenew())
+        # OCSP is only checked with --renew-revoked
+        mock_ocsp.reset_mock()
+        self.config.renew_revoked = False
+        with mock.patch("certbot.storage.crypto_util.notAfter") as mock_na:
+            mock_na.return_value = pytz.UTC.fromutc(
+                datetime.datetime.utcnow() + datetime.timedelta(days=90))
+            self.assertFalse(self.test_rc.should_autorenew())
+        self.assertFalse(mock_ocsp.called)
         mock_ocsp.return_value = False
 
     @mock.patch("certbot.storage.relevant_values")
@@ -671,9 +735,43 @@ class RenewableCertTests(BaseRenewableCertTest):
             errors.CertStorageError,
             self.test_rc._update_link_to, "elephant", 17)
 
-    def test_ocsp_revoked(self):
-        # XXX: This is currently hardcoded to False due to a lack of an
-        #      OCSP server to test against.
+    @mock.patch.dict("certbot.storage._REVOCATION_CHECKERS")
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_ocsp_revoked(self, mock_checker):
+        for kind in ALL_FOUR:
+            self._write_out_kind(kind, 1)
+            self._write_out_kind(kind, 2)
+        self.test_rc.update_all_links_to(1)
+        checker = mock_checker.return_value
+        checker.use_openssl_binary = False
+        checker.ocsp_revoked.return_value = True
+        self.assertTrue(self.test_rc.ocsp_revoked())
+        mock_checker.assert_called_once_with(
+            cache_dir=self.config.ocsp_cache_dir)
+        checker.ocsp_revoked.assert_called_with(
+            self.test_rc.version("cert", 1), self.test_rc.version("chain", 1))
+
+        self.test_rc.ocsp_revoked(2)
+        checker.ocsp_revoked.assert_called_with(
+            self.test_rc.version("cert", 2), self.test_rc.version("chain", 2))
+
+        checker.ocsp_revoked.side_effect = ValueError
+        self.assertFalse(self.test_rc.ocsp_revoked())
+        # The checker is shared by all of these checks
+        self.assertEqual(mock_checker.call_count, 1)
+
+    @mock.patch.dict("certbot.storage._REVOCATION_CHECKERS")
+    @mock.patch("certbot.storage.ocsp.RevocationChecker")
+    def test_ocsp_revoked_openssl_binary(self, mock_checker):
+        mock_checker.return_value.use_openssl_binary = True
+        self.assertFalse(self.test_rc.ocsp_revoked())
+        self.assertFalse(mock_checker.return_value.ocsp_revoked.called)
+
+    @mock.patch.dict("certbot.storage._REVOCATION_CHECKERS")
+    def test_ocsp_revoked_no_responder(self):
+        # The test certs don't name an OCSP responder
+        self._write_out_kind("cert", 1, test_util.load_vector("cert.pem"))
+        self._write_out_kind("chain", 1, test_util.load_vector("cert.pem"))
         self.assertFalse(self.test_rc.ocsp_revoked())
 
     def test_add_time_interval(self):
@@ -718,6 +816,27 @@ class RenewableCertTests(BaseRenewableCertTest):
             self.assertEqual(storage.add_time_interval(base_time, interval),
                              excepted)
 
+    def test_add_time_interval_parsed_once(self):
+        from certbot import storage
+        base_time = pytz.UTC.fromutc(datetime.datetime(2017, 1, 31, 5, 7, 3))
+        textparser = mock.MagicMock()
+        self.assertEqual(
+            storage.add_time_interval(base_time, " 1 Month-1 day ", textparser),
+            pytz.UTC.fromutc(datetime.datetime(2017, 2, 27, 5, 7, 3)))
+        self.assertEqual(
+            storage.add_time_interval(base_time, "1 day 1 month", textparser),
+            pytz.UTC.fromutc(datetime.datetime(2017, 3, 1, 5, 7, 3)))
+        self.assertFalse(textparser.parseDT.called)
+        self.assertEqual(storage._INTERVALS["1 month-1 day"],  # pylint: disable=protected-access
+                         [1, datetime.timedelta(days=-1)])
+
+        textparser.parseDT.return_value = (base_time, 1)
+        self.assertEqual(
+            storage.add_time_interval(base_time, "1 fortnight", textparser),
+            base_time)
+        textparser.parseDT.assert_called_once_with(
+            "1 fortnight", base_time, tzinfo=pytz.UTC)
+
     def test_is_test_cert(self):
         self.test_rc.configuration["renewalparams"] = {}
         rp = self.test_rc.configuration["renewalparams"]
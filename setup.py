@@ -31,9 +31,6 @@ changes = read_file(os.path.join(here, 'CHANGES.rst'))
 version = meta['version']
 
 # Please update tox.ini when modifying dependency version requirements
-# This package relies on requests, however, it isn't specified here to avoid
-# masking the more specific request requirements in acme. See
-# https://github.com/pypa/pip/issues/988 for more info.
 install_requires = [
     'acme=={0}'.format(version),
     # We technically need ConfigArgParse 0.10.0 for Python 2.6 support, but
@@ -47,6 +44,9 @@ install_requires = [
     'PyOpenSSL',
     'pyrfc3339',
     'pytz',
+    # Used directly for OCSP requests. Keep this in sync with acme's
+    # requirement, see https://github.com/pypa/pip/issues/988.
+    'requests[security]>=2.4.1',
     # For pkg_resources. >=1.0 so pip resolves it to a version cryptography
     # will tolerate; see #2599:
     'setuptools>=1.0',